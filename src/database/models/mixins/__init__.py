@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from .json_serializable import JSONSerializable
+from .mysql_claim_token import MysqlClaimTokenMixin
 from .mysql_coordinates import MysqlCoordinatesMixin
 from .mysql_exception import MysqlExceptionMixin
 from .mysql_primary_key import MysqlPrimaryKeyMixin
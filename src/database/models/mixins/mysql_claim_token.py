@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import Column
+from sqlalchemy.dialects.mysql import CHAR
+
+
+class MysqlClaimTokenMixin:
+    claim_token = Column("claim_token", CHAR(32), index=True, unique=False, nullable=True)
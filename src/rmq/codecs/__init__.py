@@ -0,0 +1,9 @@
+from .codec_registry import CodecRegistry, get_default_codec_registry, set_default_codec_registry
+from .gzip_compressor import GzipCompressor
+from .json_codec import JsonCodec
+from .message_batch import BATCH_MESSAGE_TYPE, is_message_batch, pack_message_batch, unpack_message_batch
+from .message_codec import MessageCodec
+from .message_compressor import MessageCompressor
+from .msgpack_codec import MsgpackCodec
+from .orjson_codec import OrjsonCodec
+from .zstd_compressor import ZstdCompressor
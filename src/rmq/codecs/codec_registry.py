@@ -0,0 +1,148 @@
+import logging
+
+import pika
+from scrapy.settings import BaseSettings
+
+from .gzip_compressor import GzipCompressor
+from .json_codec import JsonCodec
+from .message_batch import unpack_message_batch
+from .message_codec import MessageCodec
+from .message_compressor import MessageCompressor
+from .msgpack_codec import MsgpackCodec
+from .orjson_codec import OrjsonCodec
+from .zstd_compressor import ZstdCompressor
+
+logger = logging.getLogger(__name__)
+
+
+class CodecRegistry:
+    """Codecs and compressors keyed by AMQP content_type/content_encoding.
+
+    Publishers encode with codec (and compressor for bodies above threshold) configured for the target queue and set
+    content_type/content_encoding properties. Consumers decode by message properties, so queues can be migrated to
+    another codec without coordinated deploys. Messages without content_type are decoded as JSON.
+    Content type is decoded by codec configured in settings (default or queue codec) if it has the content type,
+    otherwise by the first registered available codec, so installing orjson does not change JSON decoding.
+    """
+
+    DEFAULT_CODEC = JsonCodec.name
+    DEFAULT_COMPRESSION_THRESHOLD = 4096
+
+    def __init__(
+        self,
+        default_codec: str = DEFAULT_CODEC,
+        default_compression: str | None = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        queue_codecs: dict | None = None,
+    ):
+        self._codecs = {}
+        self._codecs_by_content_type = {}
+        self._compressors = {}
+        for codec in (JsonCodec(), OrjsonCodec(), MsgpackCodec()):
+            self.register_codec(codec)
+        for compressor in (GzipCompressor(), ZstdCompressor()):
+            self.register_compressor(compressor)
+
+        self.compression_threshold = compression_threshold
+        self._default_config = self._build_queue_config(default_codec, default_compression)
+        # queue name -> (codec, compressor or None)
+        self._queue_configs = {}
+        for queue_name, queue_codec in (queue_codecs or {}).items():
+            if isinstance(queue_codec, str):
+                queue_codec = {"codec": queue_codec}
+            self._queue_configs[queue_name] = self._build_queue_config(
+                queue_codec.get("codec", default_codec), queue_codec.get("compression", default_compression)
+            )
+        for codec, _ in (self._default_config, *self._queue_configs.values()):
+            self._codecs_by_content_type[codec.content_type] = codec
+
+    @classmethod
+    def from_settings(cls, settings: BaseSettings):
+        return cls(
+            default_codec=settings.get("RMQ_MESSAGE_CODEC") or cls.DEFAULT_CODEC,
+            default_compression=settings.get("RMQ_MESSAGE_COMPRESSION") or None,
+            compression_threshold=settings.getint(
+                "RMQ_MESSAGE_COMPRESSION_THRESHOLD", cls.DEFAULT_COMPRESSION_THRESHOLD
+            ),
+            queue_codecs=settings.getdict("RMQ_QUEUE_CODECS"),
+        )
+
+    def register_codec(self, codec: MessageCodec):
+        """Registers codec by name. Unavailable codecs (optional package is not installed) are skipped"""
+        if not codec.is_available():
+            return
+        self._codecs[codec.name] = codec
+        # the first registered available codec decodes content type unless another one is configured
+        self._codecs_by_content_type.setdefault(codec.content_type, codec)
+
+    def register_compressor(self, compressor: MessageCompressor):
+        if not compressor.is_available():
+            return
+        self._compressors[compressor.content_encoding] = compressor
+
+    def _build_queue_config(self, codec_name, compression):
+        codec = self._codecs.get(codec_name)
+        if codec is None:
+            logger.warning(f"Message codec {codec_name} is not available, {self.DEFAULT_CODEC} is used instead")
+            codec = self._codecs[self.DEFAULT_CODEC]
+        compressor = None
+        if compression:
+            compressor = self._compressors.get(compression)
+            if compressor is None:
+                logger.warning(f"Message compression {compression} is not available, messages are not compressed")
+        return codec, compressor
+
+    def encode(self, data, queue_name: str | None = None) -> tuple[bytes, str, str | None]:
+        """Returns encoded body, content_type and content_encoding (None if body is not compressed)"""
+        codec, compressor = self._queue_configs.get(queue_name, self._default_config)
+        body = codec.encode(data)
+        if compressor is not None and len(body) >= self.compression_threshold:
+            return compressor.compress(body), codec.content_type, compressor.content_encoding
+        return body, codec.content_type, None
+
+    def encode_message(self, data, queue_name: str | None = None, properties: pika.BasicProperties | None = None):
+        """Returns encoded body and properties (persistent by default) with content_type/content_encoding set"""
+        body, content_type, content_encoding = self.encode(data, queue_name)
+        if properties is None:
+            properties = pika.BasicProperties(delivery_mode=2)
+        properties.content_type = content_type
+        properties.content_encoding = content_encoding
+        return body, properties
+
+    def decode(self, body: bytes, content_type: str | None = None, content_encoding: str | None = None):
+        if content_encoding:
+            compressor = self._compressors.get(content_encoding)
+            if compressor is None:
+                raise ValueError(f"Unsupported message content encoding: {content_encoding}")
+            body = compressor.decompress(body)
+        codec = self._codecs_by_content_type.get(content_type or JsonCodec.content_type)
+        if codec is None:
+            raise ValueError(f"Unsupported message content type: {content_type}")
+        return codec.decode(body)
+
+    def decode_message(self, body: bytes, properties: pika.BasicProperties | None = None):
+        if properties is None:
+            return self.decode(body)
+        return self.decode(body, properties.content_type, properties.content_encoding)
+
+    def decode_messages(self, body: bytes, properties: pika.BasicProperties | None = None) -> list:
+        """Returns list of decoded messages, batch envelopes (see pack_message_batch) are unpacked"""
+        return unpack_message_batch(self.decode_message(body, properties), properties)
+
+
+_default_registry = None
+
+
+def get_default_codec_registry() -> CodecRegistry:
+    """Registry which decodes consumed tasks, it is configured from settings by RPCTaskConsumer
+    (see set_default_codec_registry) and has default settings otherwise
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = CodecRegistry()
+    return _default_registry
+
+
+def set_default_codec_registry(registry: CodecRegistry | None):
+    global _default_registry
+    _default_registry = registry
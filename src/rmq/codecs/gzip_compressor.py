@@ -0,0 +1,16 @@
+import gzip
+
+from .message_compressor import MessageCompressor
+
+
+class GzipCompressor(MessageCompressor):
+    content_encoding = "gzip"
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, body: bytes) -> bytes:
+        return gzip.compress(body, compresslevel=self.level)
+
+    def decompress(self, body: bytes) -> bytes:
+        return gzip.decompress(body)
@@ -0,0 +1,14 @@
+import json
+
+from .message_codec import MessageCodec
+
+
+class JsonCodec(MessageCodec):
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, data) -> bytes:
+        return json.dumps(data).encode("utf-8")
+
+    def decode(self, body: bytes):
+        return json.loads(body)
@@ -0,0 +1,24 @@
+import pika
+
+# AMQP "type" property of envelope messages which carry several messages in a single body
+BATCH_MESSAGE_TYPE = "rmq.batch"
+BATCH_SIZE_HEADER = "x-batch-size"
+
+
+def pack_message_batch(messages: list) -> tuple[dict, pika.BasicProperties]:
+    """Returns envelope data (to be encoded by codec) and properties which mark message as batch"""
+    properties = pika.BasicProperties(
+        delivery_mode=2, type=BATCH_MESSAGE_TYPE, headers={BATCH_SIZE_HEADER: len(messages)}
+    )
+    return {"messages": messages}, properties
+
+
+def is_message_batch(properties: pika.BasicProperties | None) -> bool:
+    return properties is not None and properties.type == BATCH_MESSAGE_TYPE
+
+
+def unpack_message_batch(data, properties: pika.BasicProperties | None = None) -> list:
+    """Returns list of messages of decoded envelope or list with the single message if it is not a batch"""
+    if is_message_batch(properties):
+        return list(data["messages"])
+    return [data]
@@ -0,0 +1,16 @@
+class MessageCodec:
+    """Serializes message bodies. content_type is stored in AMQP message properties, so consumers decode by it"""
+
+    name = None
+    content_type = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Codecs backed by optional packages return False if package is not installed"""
+        return True
+
+    def encode(self, data) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, body: bytes):
+        raise NotImplementedError
@@ -0,0 +1,15 @@
+class MessageCompressor:
+    """Compresses encoded message bodies. content_encoding is stored in AMQP message properties"""
+
+    content_encoding = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Compressors backed by optional packages return False if package is not installed"""
+        return True
+
+    def compress(self, body: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, body: bytes) -> bytes:
+        raise NotImplementedError
@@ -0,0 +1,21 @@
+from .message_codec import MessageCodec
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class MsgpackCodec(MessageCodec):
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return msgpack is not None
+
+    def encode(self, data) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, body: bytes):
+        return msgpack.unpackb(body, raw=False)
@@ -0,0 +1,23 @@
+from .message_codec import MessageCodec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonCodec(MessageCodec):
+    """Wire compatible with JsonCodec (same content_type), but several times faster on large bodies"""
+
+    name = "orjson"
+    content_type = "application/json"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return orjson is not None
+
+    def encode(self, data) -> bytes:
+        return orjson.dumps(data)
+
+    def decode(self, body: bytes):
+        return orjson.loads(body)
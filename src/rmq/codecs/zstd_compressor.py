@@ -0,0 +1,30 @@
+from .message_compressor import MessageCompressor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ZstdCompressor(MessageCompressor):
+    content_encoding = "zstd"
+
+    def __init__(self, level=3):
+        self.level = level
+        self._compressor = None
+        self._decompressor = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return zstandard is not None
+
+    def compress(self, body: bytes) -> bytes:
+        if self._compressor is None:
+            self._compressor = zstandard.ZstdCompressor(level=self.level)
+        return self._compressor.compress(body)
+
+    def decompress(self, body: bytes) -> bytes:
+        if self._decompressor is None:
+            self._decompressor = zstandard.ZstdDecompressor()
+        # frames written by ZstdCompressor.compress() contain content size
+        return self._decompressor.decompress(body)
@@ -13,12 +13,12 @@ from scrapy.utils.project import get_project_settings
 from sqlalchemy.dialects import mysql
 from sqlalchemy.sql import ClauseElement
 from twisted.enterprise import adbapi
-from twisted.internet import reactor
+from twisted.internet import reactor, task
 
-from rmq.connections import PikaSelectConnection
-from rmq.utils import RMQConstants, RMQDefaultOptions
+from rmq.codecs import CodecRegistry
+from rmq.utils import RMQConstants, RMQDefaultOptions, load_connection_class
 from rmq.utils.decorators import call_once
-from rmq.utils.sql_expressions import compile_expression
+from rmq.utils.sql_expressions import compile_expression, compiled_statement_cache
 
 
 class Consumer(ScrapyCommand):
@@ -47,6 +47,8 @@ class Consumer(ScrapyCommand):
 
         self.queue_name = None
 
+        self.connection_class = load_connection_class(self.project_settings)
+        self.codec_registry = CodecRegistry.from_settings(self.project_settings)
         self.rmq_connection = None
         self._can_interact = False
         self._can_get_next_message = False
@@ -54,6 +56,7 @@ class Consumer(ScrapyCommand):
         self.db_connection_pool = None
 
         self.check_interact_ready_delay = Consumer._DEFAULT_CHECK_INTERACT_READY_DELAY
+        self._stats_logger = None
 
     def set_logger(self, name: str = "COMMAND", level: str = "DEBUG"):
         self.logger = logging.getLogger(name=name)
@@ -131,6 +134,7 @@ class Consumer(ScrapyCommand):
         self.mode = opts.mode
 
         self.init_db_connection_pool()
+        self.init_stats_logging()
 
         parameters = pika.ConnectionParameters(
             host=self.project_settings.get("RABBITMQ_HOST"),
@@ -142,28 +146,49 @@ class Consumer(ScrapyCommand):
             ),
             heartbeat=RMQDefaultOptions.CONNECTION_HEARTBEAT.value,
         )
-        reactor.callInThread(self.connect, parameters, self.queue_name)  # type: ignore[attr-defined]
+        if self.connection_class.RUNS_IN_SEPARATE_THREAD:
+            reactor.callInThread(self.connect, parameters, self.queue_name)  # type: ignore[attr-defined]
+        else:
+            self.connect(parameters, self.queue_name)
+
+    def init_stats_logging(self):
+        interval = self.project_settings.getfloat("RMQ_COMMAND_STATS_INTERVAL", 60)
+        if interval > 0:
+            self._stats_logger = task.LoopingCall(self.log_stats)
+            self._stats_logger.start(interval, now=False)
+        reactor.addSystemEventTrigger("before", "shutdown", self.log_stats)  # type: ignore[attr-defined]
+
+    def get_stats(self) -> dict:
+        return {"compiled_statement_cache": compiled_statement_cache.get_stats()}
+
+    def log_stats(self):
+        self.logger.info(f"Consumer stats: {json.dumps(self.get_stats())}")
 
     def on_basic_get_message(self, message):
         delivery_tag = message.get("method").delivery_tag
         ack_cb = nack_cb = None
-        if isinstance(self.rmq_connection.connection, pika.SelectConnection):
+        if isinstance(self.rmq_connection.connection, pika.connection.Connection):
             ack_cb = call_once(
                 functools.partial(
-                    self.rmq_connection.connection.ioloop.add_callback_threadsafe,
-                    functools.partial(self.rmq_connection.acknowledge_message, delivery_tag=delivery_tag),
+                    self.rmq_connection.call_threadsafe,
+                    self.rmq_connection.acknowledge_message,
+                    delivery_tag=delivery_tag,
                 )
             )
             nack_cb = call_once(
                 functools.partial(
-                    self.rmq_connection.connection.ioloop.add_callback_threadsafe,
-                    functools.partial(self.rmq_connection.negative_acknowledge_message, delivery_tag=delivery_tag),
+                    self.rmq_connection.call_threadsafe,
+                    self.rmq_connection.negative_acknowledge_message,
+                    delivery_tag=delivery_tag,
                 )
             )
 
-        message_body = json.loads(message["body"])
-
-        d = self.db_connection_pool.runInteraction(self.process_message, message_body)
+        # batch envelopes (e.g. batched task replies) are unpacked and processed in a single transaction
+        message_bodies = self.codec_registry.decode_messages(message["body"], message["properties"])
+        if len(message_bodies) == 1:
+            d = self.db_connection_pool.runInteraction(self.process_message, message_bodies[0])
+        else:
+            d = self.db_connection_pool.runInteraction(self.process_messages, message_bodies)
         d.addCallback(
             self.on_message_processed,
             ack_callback=ack_cb,
@@ -190,6 +215,13 @@ class Consumer(ScrapyCommand):
             transaction.execute(stmt)
         return True
 
+    def process_messages(self, transaction, message_bodies):
+        """Processes messages of batch envelope with self.process_message.
+        Batch message is acked only if all its messages are processed successfully
+        """
+        results = [self.process_message(transaction, message_body) for message_body in message_bodies]
+        return all(results)
+
     def build_message_store_stmt(self, message_body):
         """If processing message task requires several queries to db or single query has extreme difficulty
         then this self.process_message method could be overridden.
@@ -255,13 +287,18 @@ class Consumer(ScrapyCommand):
         self._can_get_next_message = can_interact
 
     def connect(self, parameters, queue_name):
-        c = PikaSelectConnection(
+        c = self.connection_class(
             parameters,
             queue_name,
             owner=self,
             options={
                 "enable_delivery_confirmations": False,
                 "prefetch_count": self.prefetch_count,
+                "ack_batching": self.project_settings.getbool("RMQ_ACK_BATCHING_ENABLED", False),
+                "ack_max_delay": self.project_settings.getfloat("RMQ_ACK_MAX_DELAY", 0.5),
+                "resilient": self.project_settings.getbool("RMQ_RESILIENT_CONNECTION_ENABLED", False),
+                "reconnect_backoff_initial": self.project_settings.getfloat("RMQ_RECONNECT_BACKOFF_INITIAL", 1),
+                "reconnect_backoff_max": self.project_settings.getfloat("RMQ_RECONNECT_BACKOFF_MAX", 60),
             },
             is_consumer=True,
         )
@@ -2,6 +2,8 @@ import datetime
 import functools
 import json
 import logging
+import time
+import uuid
 from argparse import Namespace
 from enum import Enum
 
@@ -11,13 +13,22 @@ from MySQLdb.cursors import DictCursor
 from scrapy.commands import ScrapyCommand
 from scrapy.utils.log import configure_logging
 from scrapy.utils.project import get_project_settings
-from sqlalchemy.sql import ClauseElement
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.sql import ClauseElement, operators, visitors
+from sqlalchemy.sql.dml import Update
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
 from twisted.enterprise import adbapi
-from twisted.internet import reactor, defer
+from twisted.internet import reactor, defer, task
 
-from rmq.connections import PikaSelectConnection
-from rmq.utils import RMQConstants, RMQDefaultOptions, TaskStatusCodes
-from rmq.utils.sql_expressions import compile_expression
+from rmq.codecs import CodecRegistry
+from rmq.utils import (
+    QueueDepthController,
+    RMQConstants,
+    RMQDefaultOptions,
+    TaskStatusCodes,
+    load_connection_class,
+)
+from rmq.utils.sql_expressions import compile_expression, compiled_statement_cache
 
 
 class Producer(ScrapyCommand):
@@ -41,6 +52,9 @@ class Producer(ScrapyCommand):
         ]
         self.mode = Producer.CommandModes.DEFAULT.value
         self.chunk_size = Producer._DEFAULT_CHUNK_SIZE
+        # chunk size of the next iteration, calculated by queue depth controller (up to self.chunk_size)
+        self.next_chunk_size = self.chunk_size
+        self.queue_depth_controller = None
 
         self.delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
         self.msg_body_meta_key = RMQConstants.MSG_BODY_META_KEY.value
@@ -48,12 +62,32 @@ class Producer(ScrapyCommand):
         self.task_queue_name = None
         self.reply_to_queue_name = None
 
+        # declarative model of task table, required by default statements of claim mode
+        self.task_model = None
+        # claim mode (RMQ_PRODUCER_CLAIM_ENABLED): chunk is locked, marked IN_QUEUE and stamped with claim token
+        # in one transaction, so several producers could consume one task table
+        self.claim_enabled = self.project_settings.getbool("RMQ_PRODUCER_CLAIM_ENABLED", False)
+        # messages without broker confirm after timeout are considered not published
+        self.confirm_timeout = self.project_settings.getfloat("RMQ_PRODUCER_CONFIRM_TIMEOUT", 60)
+        # keyset pagination cursor of claim mode: (priority, id) of the last claimed task
+        self._claim_cursor = None
+        # claim token of the last claimed chunk (chunks are claimed and published one at a time)
+        self.claim_token = None
+
+        self.connection_class = load_connection_class(self.project_settings)
+        self.codec_registry = CodecRegistry.from_settings(self.project_settings)
         self.rmq_connection = None
         self._can_interact = False
 
+        # do not pull new chunks from db while connection reports backpressure
+        self._backpressure_paused = False
+        self._backpressure_paused_since = None
+        self.blocked_seconds = 0.0
+
         self.db_connection_pool = None
 
         self.check_interact_ready_delay = Producer._DEFAULT_CHECK_INTERACT_READY_DELAY
+        self._stats_logger = None
 
     def set_logger(self, name: str = "COMMAND", level: str = "DEBUG"):
         self.logger = logging.getLogger(name=name)
@@ -92,7 +126,7 @@ class Producer(ScrapyCommand):
             type=int,
             default=Producer._DEFAULT_CHUNK_SIZE,
             dest="chunk_size",
-            help="Number of tasks to produce at one iteration",
+            help="Max number of tasks to produce at one iteration",
         )
         parser.add_argument(
             "-d",
@@ -141,7 +175,10 @@ class Producer(ScrapyCommand):
         self.init_replies_queue_name(opts)
         self.mode = opts.mode
         self.chunk_size = opts.chunk_size
+        self.next_chunk_size = self.chunk_size
         self.default_delay_timeout = opts.delay
+        self.init_queue_depth_controller()
+        self.init_stats_logging()
 
         self.init_db_connection_pool()
 
@@ -155,43 +192,85 @@ class Producer(ScrapyCommand):
             ),
             heartbeat=RMQDefaultOptions.CONNECTION_HEARTBEAT.value,
         )
-        reactor.callInThread(self.connect, parameters, self.task_queue_name)  # type: ignore[attr-defined]
+        if self.connection_class.RUNS_IN_SEPARATE_THREAD:
+            reactor.callInThread(self.connect, parameters, self.task_queue_name)  # type: ignore[attr-defined]
+        else:
+            self.connect(parameters, self.task_queue_name)
         reactor.callLater(self.check_interact_ready_delay, self.produce_tasks)  # type: ignore[attr-defined]
 
+    def init_queue_depth_controller(self):
+        self.queue_depth_controller = QueueDepthController(
+            target_depth=self.project_settings.getint("RMQ_PRODUCER_TARGET_QUEUE_DEPTH", 5000),
+            max_chunk_size=self.chunk_size,
+            min_interval=self.project_settings.getfloat("RMQ_PRODUCER_MIN_POLL_INTERVAL", 1),
+            max_interval=self.project_settings.getfloat("RMQ_PRODUCER_MAX_POLL_INTERVAL", 300),
+        )
+        return self.queue_depth_controller
+
+    def init_stats_logging(self):
+        interval = self.project_settings.getfloat("RMQ_COMMAND_STATS_INTERVAL", 60)
+        if interval > 0:
+            self._stats_logger = task.LoopingCall(self.log_stats)
+            self._stats_logger.start(interval, now=False)
+        reactor.addSystemEventTrigger("before", "shutdown", self.log_stats)  # type: ignore[attr-defined]
+
+    def get_stats(self) -> dict:
+        stats = {"blocked_seconds": round(self.blocked_seconds, 1)}
+        if self.queue_depth_controller is not None:
+            stats["queue_depth_controller"] = self.queue_depth_controller.get_stats()
+        stats["compiled_statement_cache"] = compiled_statement_cache.get_stats()
+        return stats
+
+    def log_stats(self):
+        self.logger.info(f"Producer stats: {json.dumps(self.get_stats())}")
+
     def produce_tasks(self, is_message_count_validated=False):
         if self._can_interact is False:
             """Wait until connection is ready to interaction"""
             reactor.callLater(self.check_interact_ready_delay, self.produce_tasks)  # type: ignore[attr-defined]
             return
 
+        if self._backpressure_paused:
+            """Wait until broker unblocks connection and outbound buffers are drained"""
+            reactor.callLater(  # type: ignore[attr-defined]
+                self.check_interact_ready_delay, self.produce_tasks, is_message_count_validated
+            )
+            return
+
         """check current queue ready messages count (queue size)"""
         if is_message_count_validated is False:
-            cb = functools.partial(
+            self.rmq_connection.call_threadsafe(
                 self.rmq_connection.get_ready_messages_count,
                 self.task_queue_name,
                 functools.partial(reactor.callFromThread, self.validate_queue_message_count),  # type: ignore[attr-defined]
             )
-            self.rmq_connection.connection.ioloop.add_callback_threadsafe(cb)
             return
 
         """get chunk of records from db which represents tasks and produce to queue"""
-        d = self.db_connection_pool.runInteraction(self.get_tasks_interaction, self.chunk_size)
+        if self.claim_enabled:
+            d = self.db_connection_pool.runInteraction(self.claim_tasks_interaction, self.next_chunk_size)
+        else:
+            d = self.db_connection_pool.runInteraction(self.get_tasks_interaction, self.next_chunk_size)
         d.addCallback(self.process_tasks).addErrback(self.on_get_tasks_error)
 
     def validate_queue_message_count(self, message_count=None):
-        delay_timeout = self._delay(message_count)
-        reactor.callLater(delay_timeout, self.produce_tasks, True)  # type: ignore[attr-defined]
-
-    def _delay(self, current_count=None) -> int:
-        if current_count is None:
-            return self.default_delay_timeout
-        return {
-            0 <= current_count < 5000: 0,
-            5000 <= current_count < 15000: 15,
-            15000 <= current_count < 30000: 300,
-            30000 <= current_count < 100000: 3600,
-            100000 <= current_count: 43200,
-        }[True]
+        if message_count is None:
+            self.next_chunk_size = self.chunk_size
+            reactor.callLater(self.default_delay_timeout, self.produce_tasks, True)  # type: ignore[attr-defined]
+            return
+        controller = self.queue_depth_controller
+        chunk_size, interval = controller.update(message_count)
+        drain_rate = f"{controller.drain_rate:.1f}/s" if controller.drain_rate is not None else "unknown"
+        self.logger.info(
+            f"Queue depth: {message_count} (target: {controller.target_depth}, drain rate: {drain_rate}), "
+            f"producing {chunk_size} tasks in {interval:.1f} seconds"
+        )
+        if not chunk_size:
+            # queue is above target, sample it again when consumers drain the excess
+            reactor.callLater(interval, self.produce_tasks)  # type: ignore[attr-defined]
+            return
+        self.next_chunk_size = chunk_size
+        reactor.callLater(interval, self.produce_tasks, True)  # type: ignore[attr-defined]
 
     def get_tasks_interaction(self, transaction, chunk_size=None):
         """If building task requires several queries to db or single query has extreme difficulty
@@ -210,6 +289,48 @@ class Producer(ScrapyCommand):
             return transaction.fetchone()
         return transaction.fetchall()
 
+    def claim_tasks_interaction(self, transaction, chunk_size=None):
+        """Selects chunk of tasks with row locks skipping rows locked by other producers, marks them IN_QUEUE
+        with unique claim token in the same transaction and returns them.
+        Chunks are paginated by keyset (self._claim_cursor), pagination starts over when the end of table is reached.
+        Tasks which are claimed but never published (producer crashed after commit) could be found by claim token
+        """
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        rows = self._fetch_claim_chunk(transaction, chunk_size, self._claim_cursor)
+        if not rows and self._claim_cursor is not None:
+            self._claim_cursor = None
+            rows = self._fetch_claim_chunk(transaction, chunk_size, None)
+        if not rows:
+            return []
+        rows = list(rows)
+        if len(rows) < chunk_size:
+            self._claim_cursor = None
+        else:
+            self._claim_cursor = self.get_claim_cursor(rows[-1])
+
+        claim_token = uuid.uuid4().hex
+        stmt = self.build_task_claim_update_stmt(rows, claim_token)
+        if isinstance(stmt, ClauseElement):
+            transaction.execute(*compile_expression(stmt))
+        else:
+            transaction.execute(stmt)
+        self.claim_token = claim_token
+        return rows
+
+    def _fetch_claim_chunk(self, transaction, chunk_size, cursor):
+        stmt = self.build_task_claim_query_stmt(chunk_size, cursor)
+        if isinstance(stmt, ClauseElement):
+            # parameter passing method describes here: https://peps.python.org/pep-0249/#id20
+            transaction.execute(*compile_expression(stmt))
+        else:
+            transaction.execute(stmt)
+        return transaction.fetchall()
+
+    def get_claim_cursor(self, db_task):
+        """Returns keyset pagination cursor of claim mode from the last task of chunk"""
+        return db_task.get("priority", None), db_task["id"]
+
     def on_get_tasks_error(self, failure):
         self.logger.error("failure: {}".format(failure))
         if failure.check(NotImplementedError):
@@ -236,6 +357,14 @@ class Producer(ScrapyCommand):
         else:
             transaction.execute(stmt)
 
+    def bulk_update_tasks_interaction(self, transaction, stmt):
+        """Executes statement built with self.build_bulk_task_update_stmt"""
+        if isinstance(stmt, ClauseElement):
+            # parameter passing method describes here: https://peps.python.org/pep-0249/#id20
+            transaction.execute(*compile_expression(stmt))
+        else:
+            transaction.execute(stmt)
+
     def build_task_query_stmt(self, chunk_size):
         """This method must returns sqlalchemy Executable or string that represents valid raw SQL select query
 
@@ -246,6 +375,66 @@ class Producer(ScrapyCommand):
         """
         raise NotImplementedError
 
+    def build_task_claim_query_stmt(self, chunk_size, cursor=None):
+        """This method returns sqlalchemy Executable or string that represents valid raw SQL select query of claim mode,
+        query must lock selected rows skipping locked ones (FOR UPDATE SKIP LOCKED).
+        Default implementation selects not processed tasks of self.task_model ordered by priority (if model has
+        priority column of MysqlPriorityAttemptMixin, higher first) and id after cursor (priority, id)
+        """
+        if self.task_model is None:
+            raise NotImplementedError("task_model must be set or build_task_claim_query_stmt must be overridden")
+        model = self.task_model
+        priority = getattr(model, "priority", None)
+        stmt = select(model.__table__).where(model.status == TaskStatusCodes.NOT_PROCESSED.value)
+        if priority is None:
+            if cursor is not None:
+                stmt = stmt.where(model.id > cursor[1])
+            stmt = stmt.order_by(model.id.asc())
+        else:
+            if cursor is not None:
+                last_priority, last_id = cursor
+                if last_priority is None:
+                    # NULL priorities are the last ones in descending order of MySQL
+                    stmt = stmt.where(and_(priority.is_(None), model.id > last_id))
+                else:
+                    stmt = stmt.where(
+                        or_(
+                            priority < last_priority,
+                            and_(priority == last_priority, model.id > last_id),
+                            priority.is_(None),
+                        )
+                    )
+            stmt = stmt.order_by(priority.desc(), model.id.asc())
+        return stmt.limit(chunk_size).with_for_update(skip_locked=True)
+
+    def build_task_claim_update_stmt(self, db_tasks, claim_token):
+        """This method returns sqlalchemy Executable or string that represents valid raw SQL update query
+        which marks claimed tasks IN_QUEUE. Claim token is stored if self.task_model has claim_token column
+        of MysqlClaimTokenMixin
+        """
+        if self.task_model is None:
+            raise NotImplementedError("task_model must be set or build_task_claim_update_stmt must be overridden")
+        model = self.task_model
+        values = {model.status: TaskStatusCodes.IN_QUEUE.value}
+        if getattr(model, "claim_token", None) is not None:
+            values[model.claim_token] = claim_token
+        return update(model).where(model.id.in_([db_task["id"] for db_task in db_tasks])).values(values)
+
+    def build_task_claim_release_stmt(self, db_tasks, claim_token):
+        """This method returns sqlalchemy Executable or string that represents valid raw SQL update query
+        which returns claimed tasks (which messages are not confirmed by broker) to NOT_PROCESSED.
+        Claim token is checked and cleared if self.task_model has claim_token column of MysqlClaimTokenMixin
+        """
+        if self.task_model is None:
+            raise NotImplementedError("task_model must be set or build_task_claim_release_stmt must be overridden")
+        model = self.task_model
+        stmt = update(model).where(model.id.in_([db_task["id"] for db_task in db_tasks]))
+        values = {model.status: TaskStatusCodes.NOT_PROCESSED.value}
+        if getattr(model, "claim_token", None) is not None:
+            stmt = stmt.where(model.claim_token == claim_token)
+            values[model.claim_token] = None
+        return stmt.values(values)
+
     def build_message_body(self, db_task):
         return dict(db_task)
 
@@ -256,24 +445,130 @@ class Producer(ScrapyCommand):
         """
         raise NotImplementedError
 
+    def build_bulk_task_update_stmt(self, db_tasks, status):
+        """This method returns sqlalchemy Executable or string that represents valid raw SQL update query
+        of all tasks of chunk, or None if tasks must be updated one by one with self.update_task_interaction
+
+        Default implementation derives statement from self.build_task_update_stmt:
+        where clause `DBModel.id == db_task['id']` is replaced with `DBModel.id IN (...)` of all tasks.
+        Statement is derived only if statements of all tasks are equal except the key value,
+        so per task values (e.g. attempt + 1) fall back to updating tasks one by one.
+        Override this method to update such tasks with one statement (e.g. with CASE expression):
+
+        return update(DBModel).where(DBModel.id.in_([db_task['id'] for db_task in db_tasks])).values({'status': status})
+        """
+        if type(self).update_task_interaction is not Producer.update_task_interaction:
+            # custom per task interaction could not be merged into single statement
+            return None
+        stmt = None
+        key_column = None
+        shape = None
+        for db_task in db_tasks:
+            task_stmt = self.build_task_update_stmt(db_task, status)
+            where_clause = self._get_key_where_clause(task_stmt, db_task)
+            if where_clause is None:
+                return None
+            if stmt is None:
+                stmt, key_column = task_stmt, where_clause.left
+            elif where_clause.left is not key_column:
+                return None
+            # statement without key value must be the same for all tasks
+            task_shape = compile_expression(
+                visitors.replacement_traverse(
+                    task_stmt, {}, lambda element, **_kw: key_column.is_(None) if element is where_clause else None
+                )
+            )
+            if shape is None:
+                shape = task_shape
+            elif task_shape != shape:
+                return None
+        if stmt is None:
+            return None
+        where_clause = stmt.whereclause
+        in_clause = key_column.in_([db_task[key_column.key] for db_task in db_tasks])
+        return visitors.replacement_traverse(
+            stmt, {}, lambda element, **_kw: in_clause if element is where_clause else None
+        )
+
+    @staticmethod
+    def _get_key_where_clause(stmt, db_task):
+        """Returns `column == value` where clause of update statement if value is the key of task, otherwise None"""
+        if not isinstance(stmt, Update):
+            return None
+        where_clause = stmt.whereclause
+        if (
+            not isinstance(where_clause, BinaryExpression)
+            or where_clause.operator is not operators.eq
+            or not isinstance(where_clause.right, BindParameter)
+            or getattr(where_clause.left, "key", None) is None
+        ):
+            return None
+        key = where_clause.left.key
+        if key not in db_task or where_clause.right.value != db_task[key]:
+            return None
+        return where_clause
+
     def process_tasks(self, rows):
         if rows is None or not len(rows):
-            delay = self._delay(None)
+            delay = self.default_delay_timeout
             self.logger.info(f"DB is empty. waiting for {delay} seconds...")
             reactor.callLater(delay, self.produce_tasks, True)
             return
-        if self.chunk_size == 1 and not isinstance(rows, list) and not isinstance(rows, tuple):
+        if not isinstance(rows, list) and not isinstance(rows, tuple):
+            # single row is fetched with chunk size 1
             rows = [rows]
-        deferred_interactions = []
+        # whole chunk is published without waiting, statuses are updated when all confirms are collected
+        confirmations = []
         for row in rows:
             msg_body = self.build_message_body(row)
-            self._send_message(msg_body)
+            confirmation = self._send_message(msg_body)
+            confirmation.addTimeout(self.confirm_timeout, reactor, onTimeoutCancel=lambda _result, _timeout: False)
+            confirmations.append(confirmation)
+        claim_token = self.claim_token if self.claim_enabled else None
+        d = defer.gatherResults(confirmations)
+        d.addCallback(self._on_tasks_confirmed, rows, claim_token)
+        d.addErrback(self._on_task_update_error).addCallback(self._on_task_update_completed)
+
+    def _on_tasks_confirmed(self, confirmations, rows, claim_token=None):
+        confirmed_rows = [row for row, is_confirmed in zip(rows, confirmations) if is_confirmed]
+        if self.queue_depth_controller is not None:
+            self.queue_depth_controller.record_published(len(confirmed_rows))
+        unconfirmed_rows = [row for row, is_confirmed in zip(rows, confirmations) if not is_confirmed]
+        if unconfirmed_rows:
+            self.logger.warning(f"{len(unconfirmed_rows)} of {len(rows)} tasks are not confirmed by broker")
+
+        deferred_updates = []
+        if self.claim_enabled:
+            # tasks are already marked IN_QUEUE by claim_tasks_interaction
+            if unconfirmed_rows:
+                release_stmt = self.build_task_claim_release_stmt(unconfirmed_rows, claim_token)
+                d = self.db_connection_pool.runInteraction(self.bulk_update_tasks_interaction, release_stmt)
+                deferred_updates.append(d.addErrback(self._on_task_update_error))
+        elif confirmed_rows:
+            deferred_updates.append(self.update_tasks_status(confirmed_rows, TaskStatusCodes.IN_QUEUE.value))
+        d = defer.DeferredList(deferred_updates, consumeErrors=True)
+        if not confirmed_rows:
+            # broker does not accept messages, next chunk is delayed
+            d.addCallback(lambda _: task.deferLater(reactor, self.check_interact_ready_delay, lambda: None))
+        return d
+
+    def update_tasks_status(self, rows, status) -> defer.Deferred:
+        """Updates status of tasks with one statement (self.build_bulk_task_update_stmt) if possible,
+        otherwise with self.update_task_interaction per task
+        """
+        bulk_update_stmt = self.build_bulk_task_update_stmt(rows, status)
+        if bulk_update_stmt is not None:
+            # whole chunk is updated with one statement in one transaction
+            d = self.db_connection_pool.runInteraction(self.bulk_update_tasks_interaction, bulk_update_stmt)
+            return d.addErrback(self._on_task_update_error)
+
+        deferred_interactions = []
+        for row in rows:
             deferred_update_task_interaction = self.db_connection_pool.runInteraction(
-                self.update_task_interaction, row, TaskStatusCodes.IN_QUEUE.value
+                self.update_task_interaction, row, status
             )
             deferred_interactions.append(deferred_update_task_interaction)
-        deferred_list = defer.DeferredList(deferred_interactions, consumeErrors=True)
-        deferred_list.addCallback(self._on_task_update_completed).addErrback(self._on_task_update_error)
+        return defer.DeferredList(deferred_interactions, consumeErrors=True)
 
     def _on_task_update_completed(self, _result=None):
         if self.mode == Producer.CommandModes.ACTION.value:
@@ -285,19 +580,37 @@ class Producer(ScrapyCommand):
         self.logger.error("failure: {}".format(failure))
         failure.trap(Exception)
 
-    def _send_message(self, msg_body):
+    def _send_message(self, msg_body) -> defer.Deferred:
+        """Schedules message publishing.
+
+        Returns deferred which is fired on reactor thread with True when message is confirmed by broker
+        and with False when it is nacked or was not published
+        """
         if not isinstance(msg_body, dict):
             raise ValueError("Built message body is not a dictionary")
         msg_body = self._convert_unserializable_values(msg_body)
-        cb = functools.partial(
+        message, properties = self.codec_registry.encode_message(
+            msg_body,
+            self.task_queue_name,
+            pika.BasicProperties(delivery_mode=2, reply_to=self.reply_to_queue_name),
+        )
+        confirmation = defer.Deferred()
+        self.rmq_connection.call_threadsafe(
             self.rmq_connection.publish_message,
-            message=json.dumps(msg_body),
+            message=message,
             queue_name=self.task_queue_name,
-            properties=pika.BasicProperties(
-                content_type="application/json", delivery_mode=2, reply_to=self.reply_to_queue_name
+            properties=properties,
+            confirm_callback=functools.partial(
+                reactor.callFromThread, self._fire_confirmation, confirmation  # type: ignore[attr-defined]
             ),
         )
-        self.rmq_connection.connection.ioloop.add_callback_threadsafe(cb)
+        return confirmation
+
+    @staticmethod
+    def _fire_confirmation(confirmation, is_confirmed):
+        # confirmation could be already fired by timeout
+        if not confirmation.called:
+            confirmation.callback(is_confirmed)
 
     def _convert_unserializable_values(self, data):
         for key, val in data.items():
@@ -316,14 +629,34 @@ class Producer(ScrapyCommand):
     def set_can_interact(self, can_interact):
         self._can_interact = can_interact
 
+    def on_backpressure_changed(self, paused):
+        self._backpressure_paused = paused
+        if paused:
+            self.logger.warning("Broker backpressure, producing is paused")
+            self._backpressure_paused_since = time.monotonic()
+        elif self._backpressure_paused_since is not None:
+            paused_seconds = time.monotonic() - self._backpressure_paused_since
+            self.blocked_seconds += paused_seconds
+            self._backpressure_paused_since = None
+            self.logger.info(
+                f"Broker backpressure released after {paused_seconds:.1f} seconds "
+                f"(total blocked: {self.blocked_seconds:.1f} seconds)"
+            )
+
     def connect(self, parameters, queue_name):
-        c = PikaSelectConnection(
+        c = self.connection_class(
             parameters,
             queue_name,
             owner=self,
             options={
                 "enable_delivery_confirmations": True,
                 "prefetch_count": 1,
+                "outbound_buffer_high_watermark": self.project_settings.getint(
+                    "RMQ_OUTBOUND_BUFFER_HIGH_WATERMARK", 8 * 1024 * 1024
+                ),
+                "outbound_buffer_low_watermark": self.project_settings.getint(
+                    "RMQ_OUTBOUND_BUFFER_LOW_WATERMARK", 2 * 1024 * 1024
+                ),
             },
             is_consumer=False,
         )
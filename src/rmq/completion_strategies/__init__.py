@@ -0,0 +1,7 @@
+from .ack_on_first_durable_result_strategy import AckOnFirstDurableResultStrategy
+from .completion_events import CompletionEvents
+from .completion_strategy import CompletionStrategy
+from .completion_strategy_registry import get_completion_strategy, register_completion_strategy
+from .requests_based_strategy import RequestsBasedStrategy
+from .strong_items_based_strategy import StrongItemsBasedStrategy
+from .weak_items_based_strategy import WeakItemsBasedStrategy
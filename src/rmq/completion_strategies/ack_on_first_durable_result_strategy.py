@@ -0,0 +1,42 @@
+from rmq.utils import Task, TaskStatusCodes
+
+from .completion_events import CompletionEvents
+from .completion_strategy import CompletionStrategy
+
+
+class AckOnFirstDurableResultStrategy(CompletionStrategy):
+    """For spiders which produce single result per task.
+
+    Task is completed as soon as broker confirms publishing of its first item, so prefetch slot is released without
+    waiting for the rest of item pipelines and outstanding requests (they are cancelled). Tasks without published
+    item are completed when all requests got responses and all scheduled items are processed.
+    Requires RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED, otherwise item is reported as published once it is sent.
+    """
+
+    name = "ack_on_first_durable_result"
+    completion_events = frozenset(
+        {
+            CompletionEvents.RESPONSE,
+            CompletionEvents.REQUEST_CANCELLED,
+            CompletionEvents.SPIDER_ERROR,
+            CompletionEvents.TASK_STOPPED,
+            CompletionEvents.ITEM_DROPPED,
+            CompletionEvents.ITEM_ERROR,
+            CompletionEvents.ITEM_PUBLISHED,
+        }
+    )
+    cancels_outstanding_work = True
+    ignores_unknown_task_items = True
+    requires_publish_confirms = True
+
+    def is_completed(self, task: Task) -> bool:
+        if task.published_items > 0:
+            return True
+        return task.is_requests_completed() and task.scheduled_items == task.total_items()
+
+    def resolve_status(self, task: Task):
+        if task.published_items > 0:
+            return TaskStatusCodes.SUCCESS
+        if task.scheduled_items > 0:
+            return self.resolve_items_status(task)
+        return self.resolve_requests_status(task)
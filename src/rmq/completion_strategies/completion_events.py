@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class CompletionEvents(Enum):
+    RESPONSE = "response"
+    REQUEST_CANCELLED = "request_cancelled"
+    SPIDER_ERROR = "spider_error"
+    TASK_STOPPED = "task_stopped"
+    ITEM_SCRAPED = "item_scraped"
+    ITEM_DROPPED = "item_dropped"
+    ITEM_ERROR = "item_error"
+    ITEM_PUBLISHED = "item_published"
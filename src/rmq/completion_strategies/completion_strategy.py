@@ -0,0 +1,54 @@
+from rmq.utils import Task, TaskStatusCodes
+
+
+class CompletionStrategy:
+    """Decides when consumed task is completed (replied and acked) and which status it gets.
+
+    on_event is invoked by RPCTaskConsumer with task event and checks only counters of the task, so it is O(1).
+    Events not listed in completion_events can not complete task and are skipped without checks.
+    """
+
+    name = None
+    completion_events = frozenset()
+    # outstanding requests of task completed by this strategy are purged and its late events are ignored
+    cancels_outstanding_work = False
+    # items of unknown (already completed) tasks are ignored instead of being reported as error
+    ignores_unknown_task_items = False
+    # strategy relies on broker publisher confirms of items (RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED)
+    requires_publish_confirms = False
+
+    def on_event(self, task: Task, event) -> bool:
+        """Returns True if task is completed. Status of completed task is resolved (error status is kept)"""
+        if event is not None and event not in self.completion_events:
+            return False
+        if not self.is_completed(task):
+            return False
+        if task.status != TaskStatusCodes.ERROR:
+            task.status = self.resolve_status(task)
+        return True
+
+    def is_completed(self, task: Task) -> bool:
+        raise NotImplementedError
+
+    def resolve_status(self, task: Task):
+        raise NotImplementedError
+
+    @staticmethod
+    def resolve_requests_status(task: Task):
+        if (
+            task.success_responses == 0
+            and task.scheduled_requests > 0
+            and task.scheduled_requests == task.failed_responses
+        ):
+            return TaskStatusCodes.HARDWARE_ERROR
+        if task.scheduled_requests > 0 and task.failed_responses == 0 and task.cancelled_requests == 0:
+            return TaskStatusCodes.SUCCESS
+        return TaskStatusCodes.PARTIAL_SUCCESS
+
+    @staticmethod
+    def resolve_items_status(task: Task):
+        if task.scraped_items == 0 and task.scheduled_items > 0 and task.scheduled_items == task.error_items:
+            return TaskStatusCodes.HARDWARE_ERROR
+        if task.scheduled_items > 0 and (task.error_items + task.dropped_items) == 0:
+            return TaskStatusCodes.SUCCESS
+        return TaskStatusCodes.PARTIAL_SUCCESS
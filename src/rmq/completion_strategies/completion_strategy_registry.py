@@ -0,0 +1,36 @@
+from .ack_on_first_durable_result_strategy import AckOnFirstDurableResultStrategy
+from .completion_strategy import CompletionStrategy
+from .requests_based_strategy import RequestsBasedStrategy
+from .strong_items_based_strategy import StrongItemsBasedStrategy
+from .weak_items_based_strategy import WeakItemsBasedStrategy
+
+_strategies = {}
+
+
+def register_completion_strategy(strategy_class: type[CompletionStrategy]):
+    """Registers strategy class by its name. Could be used as class decorator"""
+    if not strategy_class.name:
+        raise ValueError(f"Completion strategy {strategy_class.__name__} has no name")
+    _strategies[strategy_class.name] = strategy_class
+    return strategy_class
+
+
+def get_completion_strategy(strategy) -> CompletionStrategy:
+    """Returns strategy instance by registered name (strategy instances and classes are accepted as is)"""
+    if isinstance(strategy, CompletionStrategy):
+        return strategy
+    if isinstance(strategy, type) and issubclass(strategy, CompletionStrategy):
+        return strategy()
+    try:
+        return _strategies[strategy]()
+    except KeyError:
+        raise ValueError(f"Unknown completion strategy: {strategy}")
+
+
+for _strategy_class in (
+    RequestsBasedStrategy,
+    WeakItemsBasedStrategy,
+    StrongItemsBasedStrategy,
+    AckOnFirstDurableResultStrategy,
+):
+    register_completion_strategy(_strategy_class)
@@ -0,0 +1,24 @@
+from rmq.utils import Task
+
+from .completion_events import CompletionEvents
+from .completion_strategy import CompletionStrategy
+
+
+class RequestsBasedStrategy(CompletionStrategy):
+    """Task is completed when all its requests got responses (or were cancelled)"""
+
+    name = "requests_based"
+    completion_events = frozenset(
+        {
+            CompletionEvents.RESPONSE,
+            CompletionEvents.REQUEST_CANCELLED,
+            CompletionEvents.SPIDER_ERROR,
+            CompletionEvents.TASK_STOPPED,
+        }
+    )
+
+    def is_completed(self, task: Task) -> bool:
+        return task.is_requests_completed()
+
+    def resolve_status(self, task: Task):
+        return self.resolve_requests_status(task)
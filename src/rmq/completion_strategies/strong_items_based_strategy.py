@@ -0,0 +1,27 @@
+from rmq.utils import Task
+
+from .completion_events import CompletionEvents
+from .completion_strategy import CompletionStrategy
+
+
+class StrongItemsBasedStrategy(CompletionStrategy):
+    """Task is completed when all its scheduled items are processed and all its requests got responses"""
+
+    name = "strong_items_based"
+    completion_events = frozenset(
+        {
+            CompletionEvents.RESPONSE,
+            CompletionEvents.REQUEST_CANCELLED,
+            CompletionEvents.SPIDER_ERROR,
+            CompletionEvents.TASK_STOPPED,
+            CompletionEvents.ITEM_SCRAPED,
+            CompletionEvents.ITEM_DROPPED,
+            CompletionEvents.ITEM_ERROR,
+        }
+    )
+
+    def is_completed(self, task: Task) -> bool:
+        return task.is_items_completed() and task.is_requests_completed()
+
+    def resolve_status(self, task: Task):
+        return self.resolve_items_status(task)
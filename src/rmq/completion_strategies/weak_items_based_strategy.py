@@ -0,0 +1,28 @@
+from rmq.utils import Task
+
+from .completion_events import CompletionEvents
+from .completion_strategy import CompletionStrategy
+
+
+class WeakItemsBasedStrategy(CompletionStrategy):
+    """Task is completed when all its scheduled items are processed by pipelines, requests are not tracked.
+
+    Completion is checked only when callback/errback is completed: with synchronous pipelines item is scraped before
+    callback yields the next one, so scheduled and scraped items counters are equal after every item.
+    """
+
+    name = "weak_items_based"
+    completion_events = frozenset(
+        {
+            CompletionEvents.RESPONSE,
+            CompletionEvents.SPIDER_ERROR,
+            CompletionEvents.TASK_STOPPED,
+        }
+    )
+    ignores_unknown_task_items = True
+
+    def is_completed(self, task: Task) -> bool:
+        return task.is_items_completed()
+
+    def resolve_status(self, task: Task):
+        return self.resolve_items_status(task)
@@ -1 +1,3 @@
 from .pika_select_connection import PikaSelectConnection
+from .pika_asyncio_connection import PikaAsyncioConnection
+from .pika_connection_manager import PikaConnectionManager
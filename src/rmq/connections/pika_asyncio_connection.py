@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from pika.adapters.asyncio_connection import AsyncioConnection
+from scrapy.utils.reactor import is_asyncio_reactor_installed
+from twisted.internet import reactor
+
+from rmq.connections.pika_select_connection import PikaSelectConnection
+from rmq.utils.decorators import log_current_thread
+
+logger = logging.getLogger(__name__)
+
+
+class PikaAsyncioConnection(PikaSelectConnection):
+    """Connection with the same owner contract as PikaSelectConnection which runs on the asyncio loop
+    of twisted AsyncioSelectorReactor instead of separate pika ioloop thread.
+
+    Owner handlers, acks and publishes are plain same-thread calls, run() does not block and returns
+    right after connection is initiated.
+    """
+
+    RUNS_IN_SEPARATE_THREAD = False
+
+    def __init__(self, *args, **kwargs):
+        super(PikaAsyncioConnection, self).__init__(*args, **kwargs)
+        self._loop = None
+
+    @log_current_thread
+    def connect(self):
+        logger.info("Connecting to rabbitmq (asyncio)")
+        return AsyncioConnection(
+            self.parameters,
+            on_open_callback=self.on_connection_open,
+            on_open_error_callback=self.on_connection_open_error,
+            on_close_callback=self.on_connection_closed,
+            custom_ioloop=self._loop,
+        )
+
+    @log_current_thread
+    def run(self):
+        if not is_asyncio_reactor_installed():
+            raise RuntimeError(
+                f"{self.__class__.__name__} requires twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+            )
+        self._loop = getattr(reactor, "_asyncioEventloop", None) or asyncio.get_event_loop()
+        self._next_connection_cycle()
+
+    def _next_connection_cycle(self):
+        if self._should_run():
+            self._open_connection()
+        else:
+            logger.info("Stopped")
+
+    def _stop_ioloop(self):
+        # ioloop is shared with reactor and must never be stopped, finish connection cycle instead
+        self._loop.call_soon(self._next_connection_cycle)
+
+    def _call_in_reactor_thread(self, callback, *args):
+        callback(*args)
+
+    def call_threadsafe(self, callback, *args, **kwargs):
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is not None and running_loop is self._loop:
+            callback(*args, **kwargs)
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: callback(*args, **kwargs))
+        else:
+            logger.warning(f"Connection is not started. Dropping command {callback}")
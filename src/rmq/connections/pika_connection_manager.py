@@ -0,0 +1,188 @@
+import functools
+import logging
+import threading
+
+import pika
+from pika.exceptions import ConnectionWrongStateError
+from twisted.internet import reactor
+
+from rmq.utils import RMQDefaultOptions
+from rmq.utils.decorators import log_current_thread
+
+logger = logging.getLogger(__name__)
+
+
+class PikaConnectionManager:
+    """Per-process AMQP connection shared by several channel owners.
+
+    Each PikaSelectConnection created with connection_manager argument is attached as a named channel. Channels keep
+    their own queue, prefetch/QoS and confirm mode, while TCP connection, heartbeat, ioloop thread and reconnect loop
+    are shared. Manager is started by the first attached channel and closes the connection when the last one detaches.
+    """
+
+    _MAX_CONNECT_ATTEMPTS = 3
+    _RECONNECT_TIMEOUT = 5
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Returns process-wide manager for RABBITMQ_* settings (creates it if required)"""
+        parameters = pika.ConnectionParameters(
+            host=settings.get("RABBITMQ_HOST"),
+            port=int(settings.get("RABBITMQ_PORT")),
+            virtual_host=settings.get("RABBITMQ_VIRTUAL_HOST"),
+            credentials=pika.credentials.PlainCredentials(
+                username=settings.get("RABBITMQ_USERNAME"),
+                password=settings.get("RABBITMQ_PASSWORD"),
+            ),
+            heartbeat=RMQDefaultOptions.CONNECTION_HEARTBEAT.value,
+        )
+        key = (
+            parameters.host,
+            parameters.port,
+            parameters.virtual_host,
+            parameters.credentials.username,
+        )
+        with cls._instances_lock:
+            manager = cls._instances.get(key)
+            # manager which closes connection after its last channel is detached can not be reused
+            if manager is None or manager.is_stopping or manager.is_stopped:
+                manager = cls(parameters)
+                cls._instances[key] = manager
+            return manager
+
+    @classmethod
+    def for_owner(cls, settings, connection_class):
+        """Returns shared manager if RMQ_SHARED_CONNECTION_ENABLED is set and connection class supports it"""
+        if not settings.getbool("RMQ_SHARED_CONNECTION_ENABLED", False):
+            return None
+        if not getattr(connection_class, "RUNS_IN_SEPARATE_THREAD", False):
+            logger.warning(f"{connection_class.__name__} can not share connection. Dedicated connection is used")
+            return None
+        return cls.from_settings(settings)
+
+    def __init__(self, parameters: pika.ConnectionParameters):
+        self.parameters = parameters
+        self.connection = None
+
+        self._channels = {}
+        # names of channels opened on current connection, attach can race with on_connection_open
+        self._opened_channels = set()
+        self._lock = threading.Lock()
+
+        self._running = False
+        self._stopping = False
+        self.is_stopped = False
+        self._current_connect_attempts_count = 0
+
+    @property
+    def is_stopping(self):
+        return self._stopping
+
+    def attach(self, name, channel_connection):
+        """Registers channel owner connection and opens its channel as soon as shared connection is open"""
+        with self._lock:
+            if name in self._channels:
+                raise ValueError(f"Channel {name} is already attached")
+            self._channels[name] = channel_connection
+            should_start = not self._running
+            self._running = True
+        logger.info(f"Channel {name} attached to shared connection")
+        if should_start:
+            reactor.callInThread(self.run)
+        elif self.connection is not None:
+            self.connection.ioloop.add_callback_threadsafe(
+                functools.partial(self._open_attached_channel, name, channel_connection)
+            )
+
+    def detach(self, name):
+        """Unregisters channel owner connection. Shared connection is closed after the last channel is detached"""
+        with self._lock:
+            self._channels.pop(name, None)
+            self._opened_channels.discard(name)
+            should_stop = not self._channels
+            if should_stop:
+                self._stopping = True
+        logger.info(f"Channel {name} detached from shared connection")
+        if should_stop:
+            self.close_connection()
+
+    def channels(self):
+        with self._lock:
+            return list(self._channels.values())
+
+    def _channel_items(self):
+        with self._lock:
+            return list(self._channels.items())
+
+    @log_current_thread
+    def connect(self):
+        logger.info("Connecting to rabbitmq (shared connection)")
+        return pika.SelectConnection(
+            self.parameters,
+            on_open_callback=self.on_connection_open,
+            on_open_error_callback=self.on_connection_open_error,
+            on_close_callback=self.on_connection_closed,
+        )
+
+    @log_current_thread
+    def run(self):
+        while self._current_connect_attempts_count < self._MAX_CONNECT_ATTEMPTS and not self._stopping:
+            self.connection = None
+            self.connection = self.connect()
+            self.connection.ioloop.start()
+        self.is_stopped = True
+        logger.info("Shared connection stopped")
+
+    def on_connection_open(self, connection):
+        logger.info("Shared connection opened")
+        self._current_connect_attempts_count = 0
+        with self._lock:
+            self._opened_channels.clear()
+        for name, channel_connection in self._channel_items():
+            self._open_attached_channel(name, channel_connection)
+
+    def _open_attached_channel(self, name, channel_connection):
+        if self.connection is None or not self.connection.is_open:
+            return
+        with self._lock:
+            # channel is already opened or detached meanwhile
+            if name in self._opened_channels or self._channels.get(name) is not channel_connection:
+                return
+            self._opened_channels.add(name)
+        channel_connection.connection = self.connection
+        channel_connection.on_connection_open(self.connection)
+
+    def on_connection_open_error(self, connection, err):
+        self._current_connect_attempts_count += 1
+        if self._current_connect_attempts_count < self._MAX_CONNECT_ATTEMPTS:
+            logger.warning(f"Shared connection open failed, reopening in {self._RECONNECT_TIMEOUT} seconds: {err}")
+            self.connection.ioloop.call_later(self._RECONNECT_TIMEOUT, self.connection.ioloop.stop)
+        else:
+            logger.error("Shared connection open max attempts count exceeded")
+            for channel_connection in self.channels():
+                channel_connection.on_connection_open_error(connection, err)
+            self.connection.ioloop.stop()
+
+    def on_connection_closed(self, connection, reason):
+        with self._lock:
+            self._opened_channels.clear()
+        for channel_connection in self.channels():
+            channel_connection.on_connection_closed(connection, reason)
+        if self._stopping:
+            self.connection.ioloop.stop()
+        else:
+            logger.warning(f"Shared connection closed, reopening in {self._RECONNECT_TIMEOUT} seconds: {reason}")
+            self.connection.ioloop.call_later(self._RECONNECT_TIMEOUT, self.connection.ioloop.stop)
+
+    def close_connection(self):
+        if self.connection is None:
+            return
+        logger.info("Closing shared connection")
+        try:
+            self.connection.close()
+        except ConnectionWrongStateError as cwse:
+            logger.error(repr(cwse))
+            self.connection.ioloop.stop()
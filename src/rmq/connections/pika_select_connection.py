@@ -1,25 +1,54 @@
 import functools
 import logging
-from datetime import datetime
-from typing import List
+import time
 
 import pika
 from pika.exceptions import ChannelWrongStateError, ConnectionWrongStateError
 from twisted.internet import reactor, threads
 
+from rmq.utils import AcknowledgementBatcher, CommandBuffer, DeliveryConfirmationTracker
 from rmq.utils.decorators import log_current_thread
 
 logger = logging.getLogger(__name__)
 
 
 class PikaSelectConnection:
+    # owners start blocking run() in separate (twisted thread pool) thread
+    RUNS_IN_SEPARATE_THREAD = True
+
     _MAX_CONNECT_ATTEMPTS = 3
     _MAX_GRACEFUL_STOP_ATTEMPTS = 60
     _RECONNECT_TIMEOUT = 5
     _EMPTY_QUEUE_DELAY = 5
     _CHECK_DELIVERY_CONFIRMATION_DELAY = 1
-
-    _DEFAULT_OPTIONS = {"enable_delivery_confirmations": True, "prefetch_count": 1}
+    # delivery tags passed to owner carry channel generation in high bits, so tags of reopened channel never collide
+    _DELIVERY_TAG_BITS = 32
+    # and namespace (option) above generation, so tags of several channels of the same owner never collide
+    _DELIVERY_TAG_GENERATION_BITS = 16
+    _BACKPRESSURE_CHECK_INTERVAL = 0.2
+
+    _DEFAULT_OPTIONS = {
+        "enable_delivery_confirmations": True,
+        "prefetch_count": 1,
+        # channel wide (global) prefetch limit applied on top of consumer prefetch, can be changed at runtime
+        "channel_prefetch_count": None,
+        # collect acks/nacks of consumed messages and send them as multiple=True frames
+        "ack_batching": False,
+        # max seconds settled delivery tag can wait in batch before it is sent individually
+        "ack_max_delay": 0.5,
+        # reconnect (reopen channel) with exponential backoff instead of graceful shutdown of the owner
+        "resilient": False,
+        "reconnect_backoff_initial": 1,
+        "reconnect_backoff_max": 60,
+        # outbound backpressure: owner is paused when transport write buffer (bytes) or buffered commands count
+        # exceed high watermark and resumed when both drop below low watermark (or broker sent Connection.Blocked)
+        "outbound_buffer_high_watermark": 8 * 1024 * 1024,
+        "outbound_buffer_low_watermark": 2 * 1024 * 1024,
+        "command_buffer_high_watermark": 10000,
+        "command_buffer_low_watermark": 1000,
+        # high bits of delivery tags passed to owner (owner consumes several queues with separate channels)
+        "delivery_tag_namespace": 0,
+    }
 
     def __init__(
         self,
@@ -28,6 +57,8 @@ class PikaSelectConnection:
         owner,
         options=None,
         is_consumer=False,
+        connection_manager=None,
+        channel_name=None,
     ):
         super(PikaSelectConnection, self).__init__()
         # owner of current instance
@@ -44,6 +75,10 @@ class PikaSelectConnection:
         # is current connection should start consuming on ioloop run state
         self.is_consumer = is_consumer
 
+        # shared connection (PikaConnectionManager) to open channel on instead of dedicated connection
+        self.connection_manager = connection_manager
+        self.channel_name = channel_name or queue_name
+
         # state of ability to interact with connection/channel/queue
         self.can_interact = False
 
@@ -56,18 +91,44 @@ class PikaSelectConnection:
         self._current_connect_attempts_count = 0
         self._current_graceful_stop_attempts_count = 0
 
-        self._message_number = 0
-        self._deliveries: List[int] = []
-        self._acked = 0
-        self._nacked = 0
+        # publisher confirms of current channel
+        self._confirms = DeliveryConfirmationTracker()
+        self._delivery_confirmations_enabled = False
 
         self._consumer_tag = None
         self._consuming = False
+        self._channel_opened_count = 0
+        self._channel_reopen_attempts_count = 0
+        self._channel_prefetch_count = self.options.get("channel_prefetch_count")
 
-        self.__ignore_ack_after = None
+        # delivered (encoded) delivery tags of current channel which are not acked/nacked yet
+        self._unsettled_delivery_tags = set()
+
+        # queues declared on the current channel and messages waiting for their queue declaration
+        self._declared_queues = set()
+        self._pending_declare_messages = {}
 
         self.shutdown_event_handler = None
 
+        # acks/nacks of consumed messages of current channel
+        self._ack_batcher = AcknowledgementBatcher(self._basic_ack, self._basic_nack)
+        self._ack_contiguous_flush_scheduled = False
+        self._ack_flush_timer = None
+
+        # commands scheduled from other threads (reactor) and drained by ioloop in batches
+        self._command_buffer = CommandBuffer(self._wakeup_ioloop)
+
+        # broker flow control (Connection.Blocked) and outbound buffers backpressure
+        self.is_blocked = False
+        self.backpressure_paused = False
+        self._blocked_since = None
+        self._paused_since = None
+        self._blocked_seconds = 0.0
+        self._paused_seconds = 0.0
+        self._blocked_count = 0
+        self._paused_count = 0
+        self._backpressure_check_timer = None
+
     @log_current_thread
     def connect(self):
         logger.info("Connecting to rabbitmq")
@@ -78,9 +139,75 @@ class PikaSelectConnection:
             on_close_callback=self.on_connection_closed,
         )
 
+    def call_threadsafe(self, callback, *args, **kwargs):
+        """Schedules callback execution on connection ioloop thread. Safe to call from any thread.
+
+        Commands are buffered and executed in one batch per ioloop wakeup instead of one wakeup per command
+        """
+        self._command_buffer.push(callback, *args, **kwargs)
+
+    def _wakeup_ioloop(self, drain):
+        connection = self.connection
+        if connection is None:
+            logger.warning(f"Connection is not created. Dropping {len(self._command_buffer)} buffered command(s)")
+            self._drop_buffered_commands()
+            return
+        try:
+            connection.ioloop.add_callback_threadsafe(drain)
+        except Exception as e:
+            logger.warning(
+                f"Unable to wake up ioloop: {e!r}. Dropping {len(self._command_buffer)} buffered command(s)"
+            )
+            self._drop_buffered_commands()
+
+    def _drop_buffered_commands(self):
+        """Drops buffered commands, confirm callbacks of dropped messages (publish_message) are invoked with False"""
+        for command, _args, kwargs in self._command_buffer.clear():
+            confirm_callback = kwargs.get("confirm_callback")
+            if confirm_callback is None:
+                continue
+            try:
+                confirm_callback(False)
+            except Exception as e:
+                logger.exception(f"Confirm callback of dropped command {command} failed: {e!r}")
+
+    def get_stats(self) -> dict:
+        stats = {f"commands/{key}": value for key, value in self._command_buffer.get_stats().items()}
+        stats["confirms/published"] = self._confirms.published
+        stats["confirms/acked"] = self._confirms.acked
+        stats["confirms/nacked"] = self._confirms.nacked
+        stats["confirms/outstanding"] = self.outstanding_confirms_count
+        stats["acks/messages_settled"] = self._ack_batcher.messages_settled
+        stats["acks/frames_sent"] = self._ack_batcher.frames_sent
+        now = time.monotonic()
+        stats["backpressure/blocked_count"] = self._blocked_count
+        stats["backpressure/blocked_seconds"] = self._blocked_seconds + (
+            now - self._blocked_since if self._blocked_since is not None else 0.0
+        )
+        stats["backpressure/paused_count"] = self._paused_count
+        stats["backpressure/paused_seconds"] = self._paused_seconds + (
+            now - self._paused_since if self._paused_since is not None else 0.0
+        )
+        return stats
+
+    def _call_in_reactor_thread(self, callback, *args):
+        reactor.callFromThread(callback, *args)
+
+    def _stop_ioloop(self):
+        """Finishes current connection ioloop run. run() reconnects or exits depending on connection state"""
+        if self.connection_manager is not None:
+            # shared ioloop is owned by manager, channel only leaves it when stopped
+            if self._stopping:
+                self.connection_manager.detach(self.channel_name)
+            return
+        self.connection.ioloop.stop()
+
     def on_connection_open(self, _unused_connection):
         logger.info("Connection opened")
         self._current_connect_attempts_count = 0
+        self.connection.add_on_connection_blocked_callback(self.on_connection_blocked)
+        self.connection.add_on_connection_unblocked_callback(self.on_connection_unblocked)
+        self._schedule_backpressure_check()
         self.__owner_update_connection_handle()
         self.open_channel()
 
@@ -88,39 +215,54 @@ class PikaSelectConnection:
     def __owner_update_connection_handle(self):
         set_connection_handle = getattr(self.owner, "set_connection_handle", None)
         if callable(set_connection_handle):
-            reactor.callFromThread(self.owner.set_connection_handle, self)
+            self._call_in_reactor_thread(self.owner.set_connection_handle, self)
 
     def __owner_update_can_interact_value(self):
         owner_set_can_interact = getattr(self.owner, "set_can_interact", None)
         if callable(owner_set_can_interact):
-            reactor.callFromThread(self.owner.set_can_interact, self.can_interact)
+            self._call_in_reactor_thread(self.owner.set_can_interact, self.can_interact)
+
+    def __owner_call_on_channel_reopened_handler(self):
+        owner_on_channel_reopened = getattr(self.owner, "on_channel_reopened", None)
+        if callable(owner_on_channel_reopened):
+            self._call_in_reactor_thread(self.owner.on_channel_reopened)
+
+    def __owner_call_on_deliveries_invalidated_handler(self, delivery_tags):
+        owner_on_deliveries_invalidated = getattr(self.owner, "on_deliveries_invalidated", None)
+        if callable(owner_on_deliveries_invalidated):
+            self._call_in_reactor_thread(self.owner.on_deliveries_invalidated, delivery_tags)
+
+    def __owner_call_on_backpressure_changed_handler(self, paused):
+        owner_on_backpressure_changed = getattr(self.owner, "on_backpressure_changed", None)
+        if callable(owner_on_backpressure_changed):
+            self._call_in_reactor_thread(self.owner.on_backpressure_changed, paused)
 
     def __owner_schedule_graceful_shutdown(self):
         raise_close_spider = getattr(self.owner, "raise_close_spider", None)
         if callable(raise_close_spider):
-            reactor.callFromThread(self.owner.raise_close_spider)
+            self._call_in_reactor_thread(self.owner.raise_close_spider)
 
     @log_current_thread
     def __owner_call_on_msg_consumed_handler(self, msg_object):
         owner_on_message_consumed = getattr(self.owner, "on_message_consumed", None)
         if callable(owner_on_message_consumed):
-            reactor.callFromThread(self.owner.on_message_consumed, msg_object)
+            self._call_in_reactor_thread(self.owner.on_message_consumed, msg_object)
 
     @log_current_thread
     def __owner_call_on_basic_get_msg_handler(self, msg_object):
         owner_on_basic_get_message = getattr(self.owner, "on_basic_get_message", None)
         if callable(owner_on_basic_get_message):
-            reactor.callFromThread(self.owner.on_basic_get_message, msg_object)
+            self._call_in_reactor_thread(self.owner.on_basic_get_message, msg_object)
 
     def __owner_call_on_basic_get_empty_handler(self):
         owner_on_basic_get_empty = getattr(self.owner, "on_basic_get_empty", None)
         if callable(owner_on_basic_get_empty):
-            reactor.callFromThread(self.owner.on_basic_get_empty)
+            self._call_in_reactor_thread(self.owner.on_basic_get_empty)
 
     def _init_graceful_shutdown(self, with_stop=False):
-        # Note: skipping ack/nack for all events after channel closed event received. Schedule graceful
+        # Note: acks/nacks of deliveries of closed channel are skipped. Schedule graceful
         # shutdown of spider. Restart spider must be handled externally (pm2/docker swarm)
-        self.__ignore_ack_after = datetime.now().microsecond
+        self._invalidate_deliveries()
         self.__owner_schedule_graceful_shutdown()
         if with_stop:
             self.stop()
@@ -129,8 +271,14 @@ class PikaSelectConnection:
         self.can_interact = False
         self.__owner_update_can_interact_value()
 
+        if self.connection_manager is not None:
+            # manager reports open error only after its own attempts are exceeded
+            logger.error("Shared connection can not be opened. Shutting down")
+            self._init_graceful_shutdown(True)
+            return
+
         self._current_connect_attempts_count += 1
-        if self._current_connect_attempts_count < self._MAX_CONNECT_ATTEMPTS:
+        if self._is_resilient() or self._current_connect_attempts_count < self._MAX_CONNECT_ATTEMPTS:
             self.reconnect(err)
         else:
             logger.error("Connection open max attempts count exceeded. Shutting down")
@@ -138,21 +286,123 @@ class PikaSelectConnection:
 
     @log_current_thread
     def reconnect(self, reason):
-        logger.warning(f"Connection open failed, reopening in {self._RECONNECT_TIMEOUT} seconds: {reason}")
-        self.connection.ioloop.call_later(self._RECONNECT_TIMEOUT, self.connection.ioloop.stop)
+        if self._is_resilient():
+            delay = self._get_backoff_delay(self._current_connect_attempts_count)
+        else:
+            delay = self._RECONNECT_TIMEOUT
+        logger.warning(f"Connection open failed, reopening in {delay} seconds: {reason}")
+        self.connection.ioloop.call_later(delay, self._stop_ioloop)
+
+    def _is_resilient(self):
+        return self.options.get("resilient", self._DEFAULT_OPTIONS["resilient"])
+
+    def _get_backoff_delay(self, attempt):
+        """Exponential backoff delay (seconds) of reconnect/reopen attempt number (starting from 1)"""
+        initial = self.options.get("reconnect_backoff_initial", self._DEFAULT_OPTIONS["reconnect_backoff_initial"])
+        maximum = self.options.get("reconnect_backoff_max", self._DEFAULT_OPTIONS["reconnect_backoff_max"])
+        return min(initial * 2 ** max(attempt - 1, 0), maximum)
 
     def on_connection_closed(self, _unused_connection, reason):
         self._channel = None
         self.can_interact = False
         self.__owner_update_can_interact_value()
+        # blocked state and write buffer belong to the closed connection
+        self._set_blocked(False)
+        self._backpressure_check_timer = None
+        self._update_backpressure()
 
         if self._stopping:
-            self.connection.ioloop.stop()
+            self._stop_ioloop()
+        elif self._is_resilient():
+            self._invalidate_deliveries()
+            self._current_connect_attempts_count += 1
+            self.reconnect(reason)
         else:
             self.can_interact = False
             self.__owner_update_can_interact_value()
             self._init_graceful_shutdown()
 
+    def on_connection_blocked(self, _unused_connection, method_frame):
+        logger.warning(f"Connection blocked by broker: {getattr(method_frame.method, 'reason', None)}")
+        self._set_blocked(True)
+        self._update_backpressure()
+
+    def on_connection_unblocked(self, _unused_connection, _unused_method_frame):
+        logger.info("Connection unblocked by broker")
+        self._set_blocked(False)
+        self._update_backpressure()
+
+    def _set_blocked(self, is_blocked):
+        if is_blocked == self.is_blocked:
+            return
+        self.is_blocked = is_blocked
+        if is_blocked:
+            self._blocked_count += 1
+            self._blocked_since = time.monotonic()
+        elif self._blocked_since is not None:
+            self._blocked_seconds += time.monotonic() - self._blocked_since
+            self._blocked_since = None
+
+    def get_outbound_buffer_size(self) -> int:
+        """Bytes written to connection but not sent to socket yet"""
+        transport = getattr(self.connection, "_transport", None)
+        get_write_buffer_size = getattr(transport, "get_write_buffer_size", None)
+        if not callable(get_write_buffer_size):
+            return 0
+        return get_write_buffer_size()
+
+    def _schedule_backpressure_check(self):
+        if self._backpressure_check_timer is None:
+            self._backpressure_check_timer = self.connection.ioloop.call_later(
+                self._BACKPRESSURE_CHECK_INTERVAL, functools.partial(self._check_backpressure, self.connection)
+            )
+
+    def _check_backpressure(self, connection):
+        if connection is not self.connection:
+            # timer of previous connection
+            return
+        self._backpressure_check_timer = None
+        if self.connection is None or not self.connection.is_open:
+            return
+        self._update_backpressure()
+        self._schedule_backpressure_check()
+
+    def _update_backpressure(self):
+        """Recalculates backpressure state (with hysteresis) and notifies owner on change"""
+        outbound_buffer_size = self.get_outbound_buffer_size()
+        command_buffer_size = len(self._command_buffer) + sum(
+            len(pending_messages) for pending_messages in self._pending_declare_messages.values()
+        )
+        if self.is_blocked:
+            paused = True
+        elif self.backpressure_paused:
+            paused = outbound_buffer_size > self._get_option("outbound_buffer_low_watermark") or (
+                command_buffer_size > self._get_option("command_buffer_low_watermark")
+            )
+        else:
+            paused = outbound_buffer_size > self._get_option("outbound_buffer_high_watermark") or (
+                command_buffer_size > self._get_option("command_buffer_high_watermark")
+            )
+        if paused == self.backpressure_paused:
+            return
+        self.backpressure_paused = paused
+        if paused:
+            logger.warning(
+                f"Backpressure on: blocked={self.is_blocked}, outbound buffer={outbound_buffer_size} bytes, "
+                f"buffered commands={command_buffer_size}"
+            )
+            self._paused_count += 1
+            self._paused_since = time.monotonic()
+        else:
+            logger.info("Backpressure off")
+            if self._paused_since is not None:
+                self._paused_seconds += time.monotonic() - self._paused_since
+                self._paused_since = None
+        self.__owner_call_on_backpressure_changed_handler(paused)
+
+    def _get_option(self, name):
+        return self.options.get(name, self._DEFAULT_OPTIONS[name])
+
     def open_channel(self):
         logger.info("Creating a new channel")
         self.connection.channel(on_open_callback=self.on_channel_open)
@@ -163,19 +413,46 @@ class PikaSelectConnection:
         self._channel = channel
         self._channel.add_on_close_callback(self.on_channel_closed)
         self._channel.add_callback(self.on_basic_get_empty, [pika.spec.Basic.GetEmpty], one_shot=False)
-        self.__ignore_ack_after = None
+        self._reset_declared_queues()
+        self._reset_ack_batcher()
+        self._channel_opened_count += 1
+        if self._channel_opened_count > 1:
+            self.__owner_call_on_channel_reopened_handler()
         self.setup_queue(self.queue_name)
 
     def on_channel_closed(self, channel, reason):
         logger.warning("Channel {} was closed: {}".format(channel, reason))
         self._channel = None
+        self._reset_declared_queues()
+        self._reset_confirms()
+        self._reset_ack_batcher()
         if self._stopping:
             self.close_connection()
+        elif self._is_resilient():
+            self.can_interact = False
+            self.__owner_update_can_interact_value()
+            self._invalidate_deliveries()
+            self._schedule_channel_reopen(reason)
         else:
             self.can_interact = False
             self.__owner_update_can_interact_value()
             self._init_graceful_shutdown()
 
+    def _schedule_channel_reopen(self, reason):
+        if self.connection is None or not self.connection.is_open:
+            # connection is closing as well, channel is reopened after reconnect
+            return
+        self._channel_reopen_attempts_count += 1
+        delay = self._get_backoff_delay(self._channel_reopen_attempts_count)
+        logger.warning(f"Reopening channel in {delay} seconds: {reason}")
+        self.connection.ioloop.call_later(delay, self._reopen_channel)
+
+    def _reopen_channel(self):
+        if self._stopping or self._channel is not None:
+            return
+        if self.connection is not None and self.connection.is_open:
+            self.open_channel()
+
     def setup_queue(self, queue_name):
         """If queue require some specific properties at declaration subclass of this class should be created and
         this method should be overridden"""
@@ -184,16 +461,37 @@ class PikaSelectConnection:
 
     def on_queue_declare_ok(self, _unused_frame):
         logger.info("Queue declared")
+        self._declared_queues.add(self.queue_name)
         self.set_qos()
 
     def set_qos(self):
+        callback = self.start_interacting
+        if self._channel_prefetch_count:
+            callback = self._set_channel_qos
         self._channel.basic_qos(
             prefetch_count=self.options["prefetch_count"] or self._DEFAULT_OPTIONS["prefetch_count"],
-            callback=self.start_interacting,
+            callback=callback,
         )
 
+    def _set_channel_qos(self, _unused_frame):
+        self._channel.basic_qos(
+            prefetch_count=self._channel_prefetch_count, global_qos=True, callback=self.start_interacting
+        )
+
+    def set_channel_prefetch_count(self, prefetch_count):
+        """Changes channel wide prefetch limit at runtime. Unlike consumer prefetch (applied to new consumers only)
+        it is applied to the running consumer immediately and restored after channel reopen"""
+        self._channel_prefetch_count = prefetch_count
+        if self._channel is not None and self._channel.is_open:
+            self._channel.basic_qos(prefetch_count=prefetch_count, global_qos=True)
+
+    @property
+    def channel_prefetch_count(self):
+        return self._channel_prefetch_count
+
     def start_interacting(self, _unused_frame):
         logger.info("Issuing consumer related RPC commands")
+        self._channel_reopen_attempts_count = 0
         if self.options.get("enable_delivery_confirmations", self._DEFAULT_OPTIONS["enable_delivery_confirmations"]):
             self.enable_delivery_confirmations()
         self.can_interact = True
@@ -213,10 +511,7 @@ class PikaSelectConnection:
             if self.connection.is_open:
                 self.connection.ioloop.call_later(self._EMPTY_QUEUE_DELAY, functools.partial(self.open_channel))
             else:
-                # Note: skipping ack/nack for all events after channel closed event received. Schedule graceful
-                # shutdown of spider. Restart spider must be handled externally (pm2/docker swarm)
-                self.__ignore_ack_after = datetime.now().microsecond
-                self.__owner_schedule_graceful_shutdown()
+                self._init_graceful_shutdown()
 
     @log_current_thread
     def stop_consuming(self):
@@ -236,6 +531,7 @@ class PikaSelectConnection:
     def enable_delivery_confirmations(self):
         logger.info("Issuing Confirm.Select RPC command")
         self._channel.confirm_delivery(self.on_delivery_confirmation)
+        self._delivery_confirmations_enabled = True
 
     def on_delivery_confirmation(self, method_frame):
         confirmation_type = method_frame.method.NAME.split(".")[1].lower()
@@ -244,17 +540,27 @@ class PikaSelectConnection:
         #         confirmation_type, method_frame.method.delivery_tag
         #     )
         # )
-        if confirmation_type == "ack":
-            self._acked += 1
-        elif confirmation_type == "nack":
-            self._nacked += 1
-        self._deliveries.remove(method_frame.method.delivery_tag)
+        self._confirms.confirm(
+            method_frame.method.delivery_tag,
+            multiple=method_frame.method.multiple,
+            is_ack=confirmation_type == "ack",
+        )
         # logger.debug(
         #     "Published {} messages, {} have yet to be confirmed, {} were acked and {} were nacked".format(
-        #         self._message_number, len(self._deliveries), self._acked, self._nacked
+        #         self._confirms.published, self.outstanding_confirms_count, self._confirms.acked, self._confirms.nacked
         #     )
         # )
 
+    @property
+    def outstanding_confirms_count(self) -> int:
+        """Number of published messages which are not confirmed (acked or nacked) by broker yet"""
+        return self._confirms.outstanding_count
+
+    def _reset_confirms(self):
+        """Delivery tags of publisher confirms are channel scoped. Unconfirmed messages are resolved as nacked"""
+        self._delivery_confirmations_enabled = False
+        self._confirms.reset()
+
     def get_ready_messages_count(self, queue_name=None, callback=None):
         if queue_name is None:
             queue_name = self.queue_name
@@ -266,33 +572,65 @@ class PikaSelectConnection:
         if callback is not None:
             callback(message_count=message_count)
 
-    def publish_message(self, message, queue_name: str | None = None, properties: pika.BasicProperties = None):
+    def publish_message(
+        self,
+        message,
+        queue_name: str | None = None,
+        properties: pika.BasicProperties = None,
+        confirm_callback=None,
+    ):
+        """Publishes message to queue (declares queue once per channel if required).
+
+        confirm_callback is invoked from ioloop thread with True when message is confirmed by broker and with False
+        when it is nacked or can not be published. If delivery confirmations are disabled on the channel it is invoked
+        with True right after publishing.
+        """
         if self._channel is None or not self._channel.is_open:
+            if confirm_callback is not None:
+                confirm_callback(False)
             return
         if queue_name is None:
             queue_name = self.queue_name
         if properties is None:
             properties = pika.BasicProperties(content_type="application/json", delivery_mode=2)
 
-        if queue_name == self.queue_name:
-            self._channel.basic_publish("", queue_name, message, properties)
-            self._message_number += 1
-            self._deliveries.append(self._message_number)
-            # logger.debug("Published message # {}".format(self._message_number))
+        if queue_name == self.queue_name or queue_name in self._declared_queues:
+            self._basic_publish(message, queue_name, properties, confirm_callback)
+        elif queue_name in self._pending_declare_messages:
+            # declaration is already in flight, message will be flushed in order after Queue.DeclareOk
+            self._pending_declare_messages[queue_name].append((message, properties, confirm_callback))
         else:
-            cb = functools.partial(
-                self.publish_to_ensured_queue,
-                message=message,
-                queue_name=queue_name,
-                properties=properties,
-            )
+            self._pending_declare_messages[queue_name] = [(message, properties, confirm_callback)]
+            cb = functools.partial(self.publish_to_ensured_queue, queue_name=queue_name)
             self._channel.queue_declare(queue=queue_name, callback=cb, durable=True)
 
-    def publish_to_ensured_queue(self, _unused_frame, message, queue_name, properties):
+    def publish_to_ensured_queue(self, _unused_frame, queue_name):
+        self._declared_queues.add(queue_name)
+        pending_messages = self._pending_declare_messages.pop(queue_name, [])
+        for message, properties, confirm_callback in pending_messages:
+            if self._channel is None or not self._channel.is_open:
+                if confirm_callback is not None:
+                    confirm_callback(False)
+                continue
+            self._basic_publish(message, queue_name, properties, confirm_callback)
+
+    def _basic_publish(self, message, queue_name, properties, confirm_callback=None):
         self._channel.basic_publish("", queue_name, message, properties)
-        self._message_number += 1
-        self._deliveries.append(self._message_number)
-        # logger.debug("Published message # {}".format(self._message_number))
+        if self._delivery_confirmations_enabled:
+            self._confirms.register(confirm_callback)
+        elif confirm_callback is not None:
+            confirm_callback(True)
+        # logger.debug("Published message # {}".format(self._confirms.published))
+
+    def _reset_declared_queues(self):
+        """Declared queues are valid only for the channel lifetime, so registry is reset on channel (re)open/close"""
+        pending_declare_messages = self._pending_declare_messages
+        self._declared_queues = set()
+        self._pending_declare_messages = {}
+        for pending_messages in pending_declare_messages.values():
+            for _message, _properties, confirm_callback in pending_messages:
+                if confirm_callback is not None:
+                    confirm_callback(False)
 
     def get_message(self):
         if self._channel is None or not self._channel.is_open:
@@ -300,6 +638,7 @@ class PikaSelectConnection:
         self._channel.basic_get(self.queue_name, self.on_basic_get_message, auto_ack=False)
 
     def on_basic_get_message(self, channel, method, properties, body):
+        self._track_delivery(method)
         msg_object = {"channel": channel, "method": method, "properties": properties, "body": body}
         self.__owner_call_on_basic_get_msg_handler(msg_object)
 
@@ -312,58 +651,146 @@ class PikaSelectConnection:
 
     @log_current_thread
     def on_message(self, channel, method, properties, body):
+        self._track_delivery(method)
         msg_object = {"channel": channel, "method": method, "properties": properties, "body": body}
         self.__owner_call_on_msg_consumed_handler(msg_object)
 
+    def _track_delivery(self, method):
+        """Replaces channel scoped delivery tag with generation encoded one and remembers it as unsettled"""
+        generation = max(self._channel_opened_count - 1, 0) & ((1 << self._DELIVERY_TAG_GENERATION_BITS) - 1)
+        namespace = self._get_option("delivery_tag_namespace")
+        method.delivery_tag = (
+            (namespace << (self._DELIVERY_TAG_BITS + self._DELIVERY_TAG_GENERATION_BITS))
+            | (generation << self._DELIVERY_TAG_BITS)
+            | method.delivery_tag
+        )
+        self._unsettled_delivery_tags.add(method.delivery_tag)
+
+    def _settle_delivery(self, delivery_tag):
+        """Returns channel scoped delivery tag or None if delivery is stale (channel was closed) or already settled"""
+        try:
+            self._unsettled_delivery_tags.remove(delivery_tag)
+        except KeyError:
+            return None
+        return delivery_tag & ((1 << self._DELIVERY_TAG_BITS) - 1)
+
+    def _invalidate_deliveries(self):
+        """Unsettled deliveries of closed channel are requeued by broker and can not be acked/nacked anymore"""
+        if not self._unsettled_delivery_tags:
+            return
+        delivery_tags = sorted(self._unsettled_delivery_tags)
+        self._unsettled_delivery_tags = set()
+        logger.warning(f"{len(delivery_tags)} unsettled delivery(ies) invalidated by channel close")
+        self.__owner_call_on_deliveries_invalidated_handler(delivery_tags)
+
     @log_current_thread
     def acknowledge_message(self, delivery_tag):
-        if self.__ignore_ack_after:
-            logger.info(
-                f"Skip acknowledgement. Reason: ignore ack after is set. " f"Ignore ts:{self.__ignore_ack_after} ms"
-            )
+        channel_delivery_tag = self._settle_delivery(delivery_tag)
+        if channel_delivery_tag is None:
+            logger.info(f"Skip acknowledgement. Reason: delivery tag {delivery_tag} is stale or already settled")
             return
+        delivery_tag = channel_delivery_tag
 
-        if self._channel is not None and self._channel.is_open:
-            self._channel.basic_ack(delivery_tag)
+        if self._is_ack_batching_enabled():
+            self._ack_batcher.ack(delivery_tag)
+            self._schedule_ack_flush()
+        else:
+            self._basic_ack(delivery_tag)
 
-    def negative_acknowledge_message(self, delivery_tag):
-        if self.__ignore_ack_after:
+    def negative_acknowledge_message(self, delivery_tag, requeue=True):
+        channel_delivery_tag = self._settle_delivery(delivery_tag)
+        if channel_delivery_tag is None:
             logger.info(
-                f"Skip acknowledgement. Reason: ignore nack after is set. " f"Ignore ts:{self.__ignore_ack_after} ms"
+                f"Skip negative acknowledgement. Reason: delivery tag {delivery_tag} is stale or already settled"
             )
             return
+        delivery_tag = channel_delivery_tag
+
+        if self._is_ack_batching_enabled():
+            self._ack_batcher.nack(delivery_tag, requeue=requeue)
+            self._schedule_ack_flush()
+        else:
+            self._basic_nack(delivery_tag, requeue=requeue)
+
+    def _basic_ack(self, delivery_tag, multiple=False):
+        if self._channel is not None and self._channel.is_open:
+            self._channel.basic_ack(delivery_tag, multiple=multiple)
+
+    def _basic_nack(self, delivery_tag, multiple=False, requeue=True):
         if self._channel is not None and self._channel.is_open:
-            self._channel.basic_nack(delivery_tag)
+            self._channel.basic_nack(delivery_tag, multiple=multiple, requeue=requeue)
+
+    def _is_ack_batching_enabled(self):
+        return self.options.get("ack_batching", self._DEFAULT_OPTIONS["ack_batching"])
+
+    def _schedule_ack_flush(self):
+        """Contiguous tags are flushed once per ioloop iteration, out-of-order ones after ack_max_delay"""
+        if not self._ack_contiguous_flush_scheduled:
+            self._ack_contiguous_flush_scheduled = True
+            self.connection.ioloop.call_later(0, self._flush_contiguous_acks)
+        if self._ack_flush_timer is None and self._ack_batcher.pending_count:
+            self._ack_flush_timer = self.connection.ioloop.call_later(
+                self.options.get("ack_max_delay", self._DEFAULT_OPTIONS["ack_max_delay"]), self._flush_acks
+            )
+
+    def _flush_contiguous_acks(self):
+        self._ack_contiguous_flush_scheduled = False
+        self._ack_batcher.flush_contiguous()
+
+    def _flush_acks(self):
+        self._ack_flush_timer = None
+        self._ack_batcher.flush()
+
+    def _reset_ack_batcher(self):
+        """Consumer delivery tags are channel scoped, settled but not sent tags can not be acked on a new channel"""
+        if self._ack_batcher.pending_count:
+            logger.warning(f"Dropping {self._ack_batcher.pending_count} not sent ack/nack(s) of closed channel")
+        self._ack_batcher.reset()
+        self._ack_contiguous_flush_scheduled = False
+        self._ack_flush_timer = None
 
     @log_current_thread
     def run(self):
-        while self._current_connect_attempts_count < self._MAX_CONNECT_ATTEMPTS and not self._stopping:
-            self.connection = None
-            self._deliveries = []
-            self._acked = 0
-            self._nacked = 0
-            self._message_number = 0
-
-            self.connection = self.connect()
-
-            if self.shutdown_event_handler is not None:
-                try:
-                    reactor.removeSystemEventTrigger(self.shutdown_event_handler)
-                except (KeyError, ValueError, TypeError):
-                    pass
-                self.shutdown_event_handler = None
-            if reactor.running:
-                cb = functools.partial(self.connection.ioloop.add_callback_threadsafe, self.stop_from_reactor_event)
-                self.shutdown_event_handler = reactor.addSystemEventTrigger("before", "shutdown", cb)
-
+        if self.connection_manager is not None:
+            # channel is opened by manager when shared connection is open, run() does not block
+            self._register_shutdown_trigger()
+            self.connection_manager.attach(self.channel_name, self)
+            return
+        while self._should_run():
+            self._open_connection()
             self.connection.ioloop.start()
         logger.info("Stopped")
 
+    def _should_run(self):
+        if self._stopping:
+            return False
+        return self._is_resilient() or self._current_connect_attempts_count < self._MAX_CONNECT_ATTEMPTS
+
+    def _open_connection(self):
+        self.connection = None
+        self._reset_confirms()
+        # commands buffered for the previous connection are not valid anymore
+        self._drop_buffered_commands()
+
+        self.connection = self.connect()
+        self._register_shutdown_trigger()
+
+    def _register_shutdown_trigger(self):
+        if self.shutdown_event_handler is not None:
+            try:
+                reactor.removeSystemEventTrigger(self.shutdown_event_handler)
+            except (KeyError, ValueError, TypeError):
+                pass
+            self.shutdown_event_handler = None
+        if reactor.running:
+            cb = functools.partial(self.call_threadsafe, self.stop_from_reactor_event)
+            self.shutdown_event_handler = reactor.addSystemEventTrigger("before", "shutdown", cb)
+
     def stop_from_reactor_event(self):
         logger.debug("stop called from reactor event")
         if self.options.get(
             "enable_delivery_confirmations", self._DEFAULT_OPTIONS["enable_delivery_confirmations"]
-        ) and len(self._deliveries):
+        ) and self.outstanding_confirms_count:
             self._current_graceful_stop_attempts_count += 1
             if self._current_graceful_stop_attempts_count < self._MAX_GRACEFUL_STOP_ATTEMPTS:
                 self.connection.ioloop.call_later(self._CHECK_DELIVERY_CONFIRMATION_DELAY, self.stop_from_reactor_event)
@@ -408,6 +835,7 @@ class PikaSelectConnection:
     def close_channel(self):
         if self._channel:
             logger.info("Closing the channel")
+            self._ack_batcher.flush()
             try:
                 self._channel.close()
             except ChannelWrongStateError as cwse:
@@ -418,10 +846,14 @@ class PikaSelectConnection:
 
     def close_connection(self):
         self._consuming = False
+        if self.connection_manager is not None:
+            # shared connection is closed by manager after the last channel is detached
+            self.connection_manager.detach(self.channel_name)
+            return
         if self.connection is not None:
             logger.info("Closing connection")
             try:
                 self.connection.close()
             except ConnectionWrongStateError as cwse:
                 logger.error(repr(cwse))
-                self.connection.ioloop.stop()
+                self._stop_ioloop()
@@ -1,5 +1,3 @@
-import json
-
 import scrapy
 from scrapy.core.downloader.handlers.http11 import TunnelError
 
@@ -29,7 +27,7 @@ class SingleInheritor(TaskToSingleResultSpider):
         self.result_queue_name = f"{self.name}_result_queue"
 
     def next_request(self, _delivery_tag, msg_body):
-        data = json.loads(msg_body)
+        data = msg_body
         return scrapy.Request(data["url"], callback=self.parse)
 
     @rmq_callback
@@ -1 +1,2 @@
+from .adaptive_prefetch_controller import AdaptivePrefetchController
 from .rpc_task_consumer import RPCTaskConsumer
@@ -0,0 +1,141 @@
+import logging
+import math
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from rmq.extensions.rpc_task_consumer import RPCTaskConsumer
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePrefetchController:
+    """Adjusts prefetch (number of unacked tasks) of RPCTaskConsumer at runtime to keep downloader utilization
+    close to target.
+
+    Every interval it samples active downloads, scheduler queue size and average outstanding requests per task and
+    calculates how many tasks are required to fill the downloader. Tasks which fan out into many requests (categories)
+    lower the prefetch, so tasks are not hoarded unacked while downloader is saturated, single page tasks raise it,
+    so downloader is not starved. Adjustment is limited by max step and bounds, every adjustment is written to stats.
+    Enabled with RMQ_ADAPTIVE_PREFETCH_ENABLED setting.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("RMQ_ADAPTIVE_PREFETCH_ENABLED", False):
+            raise NotConfigured
+        o = cls(crawler)
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        settings = crawler.settings
+
+        self.min_prefetch = max(settings.getint("RMQ_ADAPTIVE_PREFETCH_MIN", 1), 1)
+        self.max_prefetch = max(settings.getint("RMQ_ADAPTIVE_PREFETCH_MAX", 64), self.min_prefetch)
+        self.max_step = max(settings.getint("RMQ_ADAPTIVE_PREFETCH_MAX_STEP", 4), 1)
+        self.target_utilization = settings.getfloat("RMQ_ADAPTIVE_PREFETCH_TARGET_UTILIZATION", 0.8)
+        self.interval = settings.getfloat("RMQ_ADAPTIVE_PREFETCH_INTERVAL", 5)
+
+        self.prefetch_count = None
+        # prefetch is seeded from values applied to queues by RPCTaskConsumer on the first adjustment
+        self._seeded = False
+        self.spider = None
+        self._task_consumer = None
+        self._sampler = None
+
+    def spider_opened(self, spider):
+        self.spider = spider
+        self.prefetch_count = min(
+            max(spider.settings.getint("CONCURRENT_REQUESTS", 1), self.min_prefetch), self.max_prefetch
+        )
+        self.stats.set_value("rmq/adaptive_prefetch/prefetch_count", self.prefetch_count, spider=spider)
+        self._start_sampler()
+
+    def spider_closed(self, spider):
+        self.spider = None
+        if self._sampler is not None and self._sampler.running:
+            self._sampler.stop()
+
+    def _start_sampler(self):
+        self._sampler = task.LoopingCall(self.adjust)
+        self._sampler.start(self.interval, now=False).addErrback(self._on_adjust_error)
+
+    def _on_adjust_error(self, failure):
+        # LoopingCall is stopped by exception, so adjustment is restarted unless spider is closed
+        logger.error(f"Prefetch adjustment failed: {failure.getTraceback()}")
+        if self.spider is not None:
+            self._start_sampler()
+
+    def _get_task_consumer(self):
+        if self._task_consumer is None:
+            for extension in self.crawler.extensions.middlewares:
+                if isinstance(extension, RPCTaskConsumer):
+                    self._task_consumer = extension
+                    break
+        return self._task_consumer
+
+    def sample(self):
+        """Returns (downloader utilization, scheduler queue size, average outstanding requests per task)"""
+        engine = self.crawler.engine
+        downloader = engine.downloader
+        capacity = max(downloader.total_concurrency, 1)
+        utilization = len(downloader.active) / capacity
+
+        scheduler_size = 0
+        if engine.slot is not None and engine.slot.scheduler is not None:
+            scheduler_size = len(engine.slot.scheduler)
+
+        outstanding_requests = []
+        for current_task in self.spider.processing_tasks.get_all().values():
+            outstanding_requests.append(max(current_task.scheduled_requests - current_task.total_responses(), 0))
+        avg_outstanding = sum(outstanding_requests) / len(outstanding_requests) if outstanding_requests else 0.0
+        return utilization, scheduler_size, avg_outstanding
+
+    def calculate_prefetch_count(self, utilization, scheduler_size, avg_outstanding):
+        capacity = max(self.crawler.engine.downloader.total_concurrency, 1)
+        if scheduler_size >= capacity:
+            # downloader has enough queued work, do not hoard tasks which will wait in scheduler
+            desired = self.prefetch_count - self.max_step
+        elif utilization < self.target_utilization:
+            # tasks required to fill downloader up to target with current fan-out of task
+            desired = math.ceil(capacity * self.target_utilization / max(avg_outstanding, 1.0))
+            desired = max(desired, self.prefetch_count + 1)
+        else:
+            desired = self.prefetch_count
+        step = max(min(desired - self.prefetch_count, self.max_step), -self.max_step)
+        return min(max(self.prefetch_count + step, self.min_prefetch), self.max_prefetch)
+
+    def adjust(self):
+        task_consumer = self._get_task_consumer()
+        if task_consumer is None or self.spider is None:
+            return
+        if not self._seeded:
+            applied_prefetch_count = task_consumer.get_prefetch_count()
+            if applied_prefetch_count > 0:
+                self.prefetch_count = applied_prefetch_count
+                self.stats.set_value("rmq/adaptive_prefetch/prefetch_count", applied_prefetch_count, spider=self.spider)
+            self._seeded = True
+        utilization, scheduler_size, avg_outstanding = self.sample()
+        self.stats.set_value("rmq/adaptive_prefetch/utilization", round(utilization, 3), spider=self.spider)
+
+        prefetch_count = self.calculate_prefetch_count(utilization, scheduler_size, avg_outstanding)
+        if prefetch_count == self.prefetch_count:
+            return
+        logger.info(
+            f"Prefetch {self.prefetch_count} -> {prefetch_count} (utilization: {utilization:.2f}, "
+            f"scheduler: {scheduler_size}, outstanding per task: {avg_outstanding:.1f})"
+        )
+        direction = "increased" if prefetch_count > self.prefetch_count else "decreased"
+        self.prefetch_count = prefetch_count
+        task_consumer.set_prefetch_count(prefetch_count)
+
+        self.stats.inc_value("rmq/adaptive_prefetch/adjustments", spider=self.spider)
+        self.stats.inc_value(f"rmq/adaptive_prefetch/adjustments/{direction}", spider=self.spider)
+        self.stats.set_value("rmq/adaptive_prefetch/prefetch_count", prefetch_count, spider=self.spider)
+        self.stats.max_value("rmq/adaptive_prefetch/prefetch_count_max", prefetch_count, spider=self.spider)
+        self.stats.min_value("rmq/adaptive_prefetch/prefetch_count_min", prefetch_count, spider=self.spider)
@@ -1,7 +1,6 @@
 import functools
 import json
 import logging
-from copy import deepcopy
 from enum import IntEnum
 from typing import Union
 
@@ -17,15 +16,30 @@ from twisted.internet.error import DNSLookupError, TCPTimedOutError, TimeoutErro
 from twisted.python.failure import Failure
 
 # import rmq module specific
-from rmq.connections import PikaSelectConnection
-from rmq.signals import callback_completed, errback_completed, item_scheduled
+from rmq.codecs import CodecRegistry, pack_message_batch, set_default_codec_registry
+from rmq.completion_strategies import (
+    AckOnFirstDurableResultStrategy,
+    CompletionEvents,
+    CompletionStrategy,
+    RequestsBasedStrategy,
+    StrongItemsBasedStrategy,
+    WeakItemsBasedStrategy,
+    get_completion_strategy,
+)
+from rmq.connections import PikaConnectionManager, PikaSelectConnection
+from rmq.middlewares import TaskCancellationDownloaderMiddleware, TaskCheckpointSpiderMiddleware
+from rmq.signals import callback_completed, errback_completed, item_published, item_scheduled, request_cancelled
 from rmq.utils import (
     RMQConstants,
+    ReplyBatcher,
     RMQDefaultOptions,
     Task,
+    TaskCheckpointStore,
     TaskObserver,
+    TaskQueue,
     TaskStatusCodes,
     extract_delivery_tag_from_failure,
+    load_connection_class,
 )
 from rmq.utils.decorators import call_once, rmq_callback, rmq_errback
 
@@ -37,9 +51,19 @@ class RPCTaskConsumer(object):
         REQUESTS_BASED = 0
         WEAK_ITEMS_BASED = 1
         STRONG_ITEMS_BASED = 2
+        ACK_ON_FIRST_DURABLE_RESULT = 3
         DEFAULT = REQUESTS_BASED
 
+    # spiders may declare completion_strategy with enum member, registered strategy name or strategy instance
+    _COMPLETION_STRATEGY_NAMES = {
+        CompletionStrategies.REQUESTS_BASED: RequestsBasedStrategy.name,
+        CompletionStrategies.WEAK_ITEMS_BASED: WeakItemsBasedStrategy.name,
+        CompletionStrategies.STRONG_ITEMS_BASED: StrongItemsBasedStrategy.name,
+        CompletionStrategies.ACK_ON_FIRST_DURABLE_RESULT: AckOnFirstDurableResultStrategy.name,
+    }
+
     _RELIEVE_DELAY = 3
+    _DEFAULT_WATCHDOG_INTERVAL = 10
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -55,12 +79,14 @@ class RPCTaskConsumer(object):
         crawler.signals.connect(o.on_callback_completed, signal=callback_completed)
         crawler.signals.connect(o.on_errback_completed, signal=errback_completed)
         crawler.signals.connect(o.on_spider_error, signal=signals.spider_error)
+        crawler.signals.connect(o.on_request_cancelled, signal=request_cancelled)
 
         """Subscribe to signals which controls item processing"""
         crawler.signals.connect(o.on_item_scheduled, signal=item_scheduled)
         crawler.signals.connect(o.on_item_scraped, signal=signals.item_scraped)
         crawler.signals.connect(o.on_item_dropped, signal=signals.item_dropped)
         crawler.signals.connect(o.on_item_error, signal=signals.item_error)
+        crawler.signals.connect(o.on_item_published, signal=item_published)
 
         return o
 
@@ -69,14 +95,32 @@ class RPCTaskConsumer(object):
         self.crawler = crawler
         self.__spider = None
 
-        self.completion_strategy = RPCTaskConsumer.CompletionStrategies.DEFAULT
+        self.completion_strategy: CompletionStrategy = RequestsBasedStrategy()
         self.delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
         self.msg_body_meta_key = RMQConstants.MSG_BODY_META_KEY.value
-
+        # compatibility with next_request(delivery_tag, msg_body) handlers which mutate msg_body or read it from
+        # request meta, disabled it passes read-only TaskPayload and requests carry only the delivery tag
+        self.msg_body_compat = crawler.settings.getbool("RMQ_TASK_MSG_BODY_COMPAT_ENABLED", True)
+
+        self.connection_class = load_connection_class(crawler.settings)
+        self.connection_manager = PikaConnectionManager.for_owner(crawler.settings, self.connection_class)
+        self.codec_registry = CodecRegistry.from_settings(crawler.settings)
+        # tasks are decoded with codecs configured in settings
+        set_default_codec_registry(self.codec_registry)
+        # connection of the first (primary) task queue, it is used to publish replies
         self.rmq_connection = None
+        self.task_queues: list[TaskQueue] = []
         self._can_interact = False
         self._can_get_next_message = False
         self._relieve_task = None
+        self._watchdog_task = None
+        self.reply_batcher = None
+        self._reply_flush_task = None
+        self.checkpoint_store = None
+        if crawler.settings.getbool("RMQ_TASK_CHECKPOINT_ENABLED", False):
+            self.checkpoint_store = TaskCheckpointStore.from_settings(crawler.settings)
+        # tasks which could not be settled when they were finalized (connection was not ready), task is kept
+        # because it is removed from observer right after finalization
         self.pending_relieve = {"ack": [], "nack": []}
 
     def spider_opened(self, spider):
@@ -86,23 +130,33 @@ class RPCTaskConsumer(object):
 
         """Check spider for correct declared callbacks/errbacks/methods/variables"""
         if self._validate_spider_has_attributes() is False:
-            raise CloseSpider("Attached spider has no configured task_queue_name and processing_tasks observer")
+            raise CloseSpider(
+                "Attached spider has no configured task_queue_name (or task_queues) and processing_tasks observer"
+            )
         if self._validate_spider_has_decorators() is False:
             raise CloseSpider("Attached spider has no properly decorated callbacks or errbacks")
-        self.completion_strategy = getattr(
-            self.__spider, "completion_strategy", RPCTaskConsumer.CompletionStrategies.DEFAULT
+        self.completion_strategy = self._load_completion_strategy(
+            getattr(self.__spider, "completion_strategy", RPCTaskConsumer.CompletionStrategies.DEFAULT)
         )
-        if not isinstance(self.completion_strategy, RPCTaskConsumer.CompletionStrategies):
-            self.completion_strategy = RPCTaskConsumer.CompletionStrategies.DEFAULT
+        if self.completion_strategy.requires_publish_confirms and not self.__spider.settings.getbool(
+            "RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED", False
+        ):
+            logger.warning(
+                f"Completion strategy {self.completion_strategy.name} requires RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED, "
+                f"items are considered durable once they are sent"
+            )
 
         """Configure loggers"""
         logger.setLevel(self.__spider.settings.get("LOG_LEVEL", "INFO"))
         logging.getLogger("pika").setLevel(self.__spider.settings.get("PIKA_LOG_LEVEL", "WARNING"))
 
-        """Declare/retrieve queue name from spider instance"""
-        task_queue_name = spider.task_queue_name
+        """Declare/retrieve queue names (with weights and prefetch) from spider instance"""
+        self._init_task_queues()
+
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.open()
 
-        """Build pika connection parameters and start connection in separate twisted thread"""
+        """Build pika connection parameters and start connection (in separate twisted thread if required)"""
         parameters = pika.ConnectionParameters(
             host=self.__spider.settings.get("RABBITMQ_HOST"),
             port=int(self.__spider.settings.get("RABBITMQ_PORT")),
@@ -113,17 +167,79 @@ class RPCTaskConsumer(object):
             ),
             heartbeat=RMQDefaultOptions.CONNECTION_HEARTBEAT.value,
         )
-        reactor.callInThread(self.connect, parameters, task_queue_name)
+        for task_queue in self.task_queues:
+            if self.connection_class.RUNS_IN_SEPARATE_THREAD:
+                reactor.callInThread(self.connect, parameters, task_queue)
+            else:
+                self.connect(parameters, task_queue)
+
+        """Account items and completed callbacks of rmq_callback/rmq_errback with direct calls instead of signals"""
+        if not self.__spider.settings.getbool("RMQ_TASK_ACCOUNTING_SIGNALS_ENABLED", False):
+            self.__spider.task_accounting = self
 
         """Declare fallback LoopingCall to ack/nack probably unacked messages (or before scheduled shutdown)"""
+        """Purge pending requests of cancelled tasks"""
+        self.__spider.processing_tasks.add_stop_listener(self.on_task_stopped)
+
         self._relieve_task = task.LoopingCall(self._relieve)
         self._relieve_task.start(self._RELIEVE_DELAY)
 
+        """Declare reply batcher and LoopingCall which flushes batches older than max delay"""
+        if self.__spider.settings.getbool("RMQ_REPLY_BATCHING_ENABLED", False):
+            self.reply_batcher = ReplyBatcher(
+                self._publish_reply_batch,
+                max_size=self.__spider.settings.getint("RMQ_REPLY_BATCH_MAX_SIZE", 100),
+                max_delay=self.__spider.settings.getfloat("RMQ_REPLY_BATCH_MAX_DELAY", 1.0),
+            )
+            self._reply_flush_task = task.LoopingCall(self.reply_batcher.flush_expired)
+            self._reply_flush_task.start(max(self.reply_batcher.max_delay / 2, 0.1), now=False)
+
+        """Declare watchdog LoopingCall to expire tasks which never complete (lost response or signal)"""
+        self.__spider.processing_tasks.set_deadlines(
+            max_lifetime=self.__spider.settings.getfloat("RMQ_TASK_MAX_LIFETIME", 0),
+            idle_timeout=self.__spider.settings.getfloat("RMQ_TASK_IDLE_TIMEOUT", 0),
+        )
+        if self.__spider.processing_tasks.has_deadlines():
+            self._watchdog_task = task.LoopingCall(self._expire_tasks)
+            self._watchdog_task.start(
+                self.__spider.settings.getfloat("RMQ_TASK_WATCHDOG_INTERVAL", self._DEFAULT_WATCHDOG_INTERVAL),
+                now=False,
+            )
+
+    def _load_completion_strategy(self, strategy) -> CompletionStrategy:
+        if isinstance(strategy, RPCTaskConsumer.CompletionStrategies):
+            strategy = self._COMPLETION_STRATEGY_NAMES[strategy]
+        try:
+            return get_completion_strategy(strategy)
+        except ValueError as e:
+            logger.error(f"{e}, {RequestsBasedStrategy.name} completion strategy is used instead")
+            return RequestsBasedStrategy()
+
     def spider_closed(self, spider):
+        if self._watchdog_task is not None and self._watchdog_task.running:
+            self._watchdog_task.stop()
+        if self.reply_batcher is not None:
+            if self._reply_flush_task is not None and self._reply_flush_task.running:
+                self._reply_flush_task.stop()
+            self.reply_batcher.flush()
+            self.crawler.stats.set_value(
+                "rmq/task_consumer/reply_batches", self.reply_batcher.batches_sent, spider=spider
+            )
+            self.crawler.stats.set_value(
+                "rmq/task_consumer/batched_replies", self.reply_batcher.replies_sent, spider=spider
+            )
         self._relieve()
-        if self.rmq_connection is not None and isinstance(self.rmq_connection, PikaSelectConnection):
-            if isinstance(self.rmq_connection.connection, pika.SelectConnection):
-                self.rmq_connection.connection.ioloop.add_callback_threadsafe(self.rmq_connection.stop)
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.close()
+        for task_queue in self.task_queues:
+            rmq_connection = task_queue.rmq_connection
+            if rmq_connection is None or not isinstance(rmq_connection, PikaSelectConnection):
+                continue
+            stats_prefix = "rmq/task_consumer" if len(self.task_queues) == 1 else f"rmq/task_consumer/{task_queue.name}"
+            for stat_key, stat_value in rmq_connection.get_stats().items():
+                self.crawler.stats.set_value(f"{stats_prefix}/{stat_key}", stat_value, spider=spider)
+            if isinstance(rmq_connection.connection, pika.connection.Connection):
+                rmq_connection.call_threadsafe(rmq_connection.stop)
 
     def spider_idle(self, spider):
         raise DontCloseSpider
@@ -141,22 +257,53 @@ class RPCTaskConsumer(object):
         if self.delivery_tag_meta_key in request.meta.keys():
             delivery_tag = request.meta.get(self.delivery_tag_meta_key)
             spider.processing_tasks.handle_response(delivery_tag, 600)
-            self._check_is_completed(spider, delivery_tag)
+            self._check_is_completed(spider, delivery_tag, CompletionEvents.RESPONSE)
+
+    def on_request_cancelled(self, request, spider):
+        delivery_tag = request.meta.get(self.delivery_tag_meta_key)
+        if delivery_tag is not None:
+            spider.processing_tasks.handle_request_cancelled(delivery_tag)
+            self._check_is_completed(spider, delivery_tag, CompletionEvents.REQUEST_CANCELLED)
+
+    def on_task_stopped(self, delivery_tag):
+        # deferred to let the caller finish task update (e.g. set exception after error status)
+        reactor.callLater(0, self._cancel_task, delivery_tag)
+
+    def _cancel_task(self, delivery_tag):
+        spider = self.__spider
+        if spider is None or spider.processing_tasks.get_task(delivery_tag) is None:
+            return
+        scheduler = self.crawler.engine.slot.scheduler if self.crawler.engine.slot is not None else None
+        purge_task = getattr(scheduler, "purge_task", None)
+        if callable(purge_task):
+            purged_count = purge_task(delivery_tag)
+            if purged_count:
+                logger.info(f"Task {delivery_tag} cancelled, {purged_count} pending request(s) purged")
+                spider.processing_tasks.handle_request_cancelled(delivery_tag, purged_count)
+                self.crawler.stats.inc_value("rmq/cancelled_requests", purged_count, spider=spider)
+        self._check_is_completed(spider, delivery_tag, CompletionEvents.TASK_STOPPED)
 
     def on_callback_completed(self, response=None, spider=None, delivery_tag=None):
         if response is not None and spider is not None:
             delivery_tag = response.meta.get(self.delivery_tag_meta_key, None) if delivery_tag is None else delivery_tag
             spider.processing_tasks.handle_response(delivery_tag, response.status)
-        self._check_is_completed(spider, delivery_tag)
+            if response.meta.get(TaskCheckpointSpiderMiddleware.CHECKPOINT_META_KEY):
+                self._record_checkpoint(spider, delivery_tag, response)
+        self._check_is_completed(spider, delivery_tag, CompletionEvents.RESPONSE)
 
     def on_errback_completed(self, failure=None, spider=None, delivery_tag=None):
         if failure is not None and spider is not None:
             delivery_tag = (
                 failure.request.meta.get(self.delivery_tag_meta_key, None) if delivery_tag is None else delivery_tag
             )
-            if spider.processing_tasks.get_task(delivery_tag).failed_responses == 0:
+            if failure.request.meta.get(TaskCancellationDownloaderMiddleware.CANCELLED_META_KEY):
+                # already counted as cancelled request
+                self._check_is_completed(spider, delivery_tag, CompletionEvents.REQUEST_CANCELLED)
+                return
+            current_task = spider.processing_tasks.get_task(delivery_tag)
+            if current_task is not None and current_task.failed_responses == 0:
                 spider.processing_tasks.handle_response(delivery_tag, 600)
-        self._check_is_completed(spider, delivery_tag)
+        self._check_is_completed(spider, delivery_tag, CompletionEvents.RESPONSE)
 
     def on_spider_error(self, failure, response, spider):
         delivery_tag = response.meta.get(self.delivery_tag_meta_key)
@@ -172,7 +319,7 @@ class RPCTaskConsumer(object):
                 spider.processing_tasks.set_status(delivery_tag, TaskStatusCodes.HARDWARE_ERROR)
             else:
                 spider.processing_tasks.set_status(delivery_tag, TaskStatusCodes.ERROR)
-            self._check_is_completed(spider, delivery_tag)
+            self._check_is_completed(spider, delivery_tag, CompletionEvents.SPIDER_ERROR)
 
     def on_item_scheduled(self, response: Union[Response, Failure], spider, delivery_tag):
         if response is not None and spider is not None:
@@ -184,16 +331,30 @@ class RPCTaskConsumer(object):
 
             if delivery_tag is not None:
                 current_task = spider.processing_tasks.get_task(delivery_tag)
-                if (
-                    not current_task
-                    and self.completion_strategy == RPCTaskConsumer.CompletionStrategies.WEAK_ITEMS_BASED
-                ):
+                if not current_task and self._ignores_unknown_task_item(spider, delivery_tag):
                     return
                 spider.processing_tasks.handle_item_scheduled(delivery_tag)
+                if isinstance(response, Response) and response.meta.get(
+                    TaskCheckpointSpiderMiddleware.CHECKPOINT_META_KEY
+                ):
+                    items_key = TaskCheckpointSpiderMiddleware.CHECKPOINT_ITEMS_META_KEY
+                    response.meta[items_key] = response.meta.get(items_key, 0) + 1
             else:
                 spider.logger.warning("Delivery tag not found [on_item_scheduled]")
         # self._check_is_completed(spider, delivery_tag)
 
+    def account_item_scheduled(self, delivery_tag, response=None):
+        """Direct accounting path of rmq_callback/rmq_errback decorators (replaces item_scheduled signal)"""
+        self.on_item_scheduled(response, self.__spider, delivery_tag)
+
+    def account_callback_completed(self, delivery_tag, response=None):
+        """Direct accounting path of rmq_callback decorator (replaces callback_completed signal)"""
+        self.on_callback_completed(response, self.__spider, delivery_tag)
+
+    def account_errback_completed(self, delivery_tag, failure=None):
+        """Direct accounting path of rmq_errback decorator (replaces errback_completed signal)"""
+        self.on_errback_completed(failure, self.__spider, delivery_tag)
+
     def on_item_scraped(self, item, response: Union[Response, Failure], spider):
         if response is not None and spider is not None:
             if isinstance(response, Failure):
@@ -206,12 +367,10 @@ class RPCTaskConsumer(object):
 
             if delivery_tag is not None:
                 current_task = spider.processing_tasks.get_task(delivery_tag)
-                if (
-                    not current_task
-                    and self.completion_strategy == RPCTaskConsumer.CompletionStrategies.WEAK_ITEMS_BASED
-                ):
+                if not current_task and self._ignores_unknown_task_item(spider, delivery_tag):
                     return
                 spider.processing_tasks.handle_item_scraped(delivery_tag)
+                self._check_is_completed(spider, delivery_tag, CompletionEvents.ITEM_SCRAPED)
             else:
                 spider.logger.warning("Delivery tag not found [on_item_scraped]")
 
@@ -222,12 +381,10 @@ class RPCTaskConsumer(object):
                 delivery_tag = getattr(item, self.delivery_tag_meta_key, None)
             if delivery_tag is not None:
                 current_task = spider.processing_tasks.get_task(delivery_tag)
-                if (
-                    not current_task
-                    and self.completion_strategy == RPCTaskConsumer.CompletionStrategies.WEAK_ITEMS_BASED
-                ):
+                if not current_task and self._ignores_unknown_task_item(spider, delivery_tag):
                     return
                 spider.processing_tasks.handle_item_dropped(delivery_tag)
+                self._check_is_completed(spider, delivery_tag, CompletionEvents.ITEM_DROPPED)
 
     def on_item_error(self, item, response, exception, spider):
         if response is not None and spider is not None:
@@ -236,88 +393,158 @@ class RPCTaskConsumer(object):
                 delivery_tag = getattr(item, self.delivery_tag_meta_key, None)
             if delivery_tag is not None:
                 current_task = spider.processing_tasks.get_task(delivery_tag)
-                if (
-                    not current_task
-                    and self.completion_strategy == RPCTaskConsumer.CompletionStrategies.WEAK_ITEMS_BASED
-                ):
+                if not current_task and self._ignores_unknown_task_item(spider, delivery_tag):
                     return
                 spider.processing_tasks.handle_item_error(delivery_tag)
+                self._check_is_completed(spider, delivery_tag, CompletionEvents.ITEM_ERROR)
+
+    def _ignores_unknown_task_item(self, spider, delivery_tag):
+        """Items of removed (discarded/invalidated) tasks are passed to observer, so their outstanding work drains"""
+        if not self.completion_strategy.ignores_unknown_task_items:
+            return False
+        processing_tasks = spider.processing_tasks
+        return not (processing_tasks.is_discarded(delivery_tag) or processing_tasks.is_invalidated(delivery_tag))
+
+    def on_item_published(self, item, spider, delivery_tag=None):
+        if delivery_tag is not None and spider is not None:
+            spider.processing_tasks.handle_item_published(delivery_tag)
+            self._check_is_completed(spider, delivery_tag, CompletionEvents.ITEM_PUBLISHED)
 
-    def _check_is_completed(self, spider=None, delivery_tag=None):
+    def _check_is_completed(self, spider=None, delivery_tag=None, event=None):
+        """Passes task event to completion strategy and finalizes task if it is completed (event None forces check)"""
         if spider is None:
             spider = self.__spider
-        if delivery_tag is not None and spider is not None:
-            current_task: Task = spider.processing_tasks.get_task(delivery_tag)
-            if not current_task and self.completion_strategy is RPCTaskConsumer.CompletionStrategies.WEAK_ITEMS_BASED:
-                return
-            is_completed = False
-            if self.completion_strategy == RPCTaskConsumer.CompletionStrategies.REQUESTS_BASED:
-                is_completed = current_task.is_requests_completed()
-                if is_completed:
-                    if current_task.status != TaskStatusCodes.ERROR:
-                        if (
-                            current_task.success_responses == 0
-                            and current_task.scheduled_requests > 0
-                            and current_task.scheduled_requests == current_task.failed_responses
-                        ):
-                            current_task.status = TaskStatusCodes.HARDWARE_ERROR
-                        elif current_task.scheduled_requests > 0 and current_task.failed_responses == 0:
-                            current_task.status = TaskStatusCodes.SUCCESS
-                        else:
-                            current_task.status = TaskStatusCodes.PARTIAL_SUCCESS
-            elif self.completion_strategy in [
-                RPCTaskConsumer.CompletionStrategies.STRONG_ITEMS_BASED,
-                RPCTaskConsumer.CompletionStrategies.WEAK_ITEMS_BASED,
-            ]:
-                if self.completion_strategy == RPCTaskConsumer.CompletionStrategies.WEAK_ITEMS_BASED:
-                    is_completed = current_task.is_items_completed()
-                if self.completion_strategy == RPCTaskConsumer.CompletionStrategies.STRONG_ITEMS_BASED:
-                    is_completed = current_task.is_items_completed() and current_task.is_requests_completed()
-                if is_completed:
-                    if current_task.status != TaskStatusCodes.ERROR:
-                        if (
-                            current_task.scraped_items == 0
-                            and current_task.scheduled_items > 0
-                            and current_task.scheduled_items == current_task.error_items
-                        ):
-                            current_task.status = TaskStatusCodes.HARDWARE_ERROR
-                        elif (
-                            current_task.scheduled_items > 0
-                            and (current_task.error_items + current_task.dropped_items) == 0
-                        ):
-                            current_task.status = TaskStatusCodes.SUCCESS
-                        else:
-                            current_task.status = TaskStatusCodes.PARTIAL_SUCCESS
-            if is_completed:
-                if current_task.reply_to is not None:
-                    payload = {**deepcopy(current_task.payload), **current_task.get_reply_payload()}
-                    if isinstance(self.rmq_connection.connection, pika.SelectConnection):
-                        cb = functools.partial(
-                            self.rmq_connection.publish_message,
-                            message=json.dumps(payload),
-                            queue_name=current_task.reply_to,
-                        )
-                    self.rmq_connection.connection.ioloop.add_callback_threadsafe(cb)
-
-                if self._can_interact and self.__spider is not None:
-                    if hasattr(self.__spider, "rmq_test_mode") and self.__spider.rmq_test_mode is True:
-                        logger.critical("TASK MUST BE ACKED HERE " * 4)
-                    else:
-                        current_task.ack()
-                else:
-                    # Note: possible deprecated to store delivery tags internally and LoopingCall: _relieve is redundant
-                    if delivery_tag not in self.pending_relieve["ack"]:
-                        self.pending_relieve["ack"].append(delivery_tag)
+        if delivery_tag is None or spider is None:
+            return
+        current_task: Task = spider.processing_tasks.get_task(delivery_tag)
+        if not current_task:
+            return
+        if self.completion_strategy.on_event(current_task, event):
+            self._finalize_task(spider, delivery_tag, current_task)
+            if self.completion_strategy.cancels_outstanding_work:
+                self._discard_task_work(spider, delivery_tag, current_task)
+
+    def _finalize_task(self, spider, delivery_tag, current_task: Task, requeue=False):
+        """Sends task reply and acks task (or nacks it with requeue without reply), then removes it from observer.
+        With reply batching task is acked after its reply batch is published
+        """
+        settle = functools.partial(self._settle_task, delivery_tag, current_task, requeue)
+        if self.checkpoint_store is not None and current_task.checkpoint_key is not None and not requeue:
+            self.checkpoint_store.delete(current_task.checkpoint_key)
+        if current_task.reply_to is not None and not requeue:
+            payload = {**current_task.payload, **current_task.get_reply_payload()}
+            if self.reply_batcher is not None:
+                self.reply_batcher.add(current_task.reply_to, payload, on_published=settle)
+                settle = None
+            elif isinstance(self.rmq_connection.connection, pika.connection.Connection):
+                message, properties = self.codec_registry.encode_message(payload, current_task.reply_to)
+                self.rmq_connection.call_threadsafe(
+                    self.rmq_connection.publish_message,
+                    message=message,
+                    queue_name=current_task.reply_to,
+                    properties=properties,
+                )
+        if settle is not None:
+            settle()
+
+        if hasattr(spider, "processing_tasks") and isinstance(spider.processing_tasks, TaskObserver):
+            spider.processing_tasks.remove_task(delivery_tag)
+
+    def _settle_task(self, delivery_tag, current_task: Task, requeue=False):
+        pending_relieve_key = "nack" if requeue else "ack"
+        if self._can_settle(current_task) and self.__spider is not None:
+            if hasattr(self.__spider, "rmq_test_mode") and self.__spider.rmq_test_mode is True:
+                logger.critical("TASK MUST BE ACKED HERE " * 4)
+            elif requeue:
+                current_task.nack()
+            else:
+                current_task.ack()
+        else:
+            if current_task not in self.pending_relieve[pending_relieve_key]:
+                self.pending_relieve[pending_relieve_key].append(current_task)
+
+    def _publish_reply_batch(self, reply_to, replies):
+        if self.rmq_connection is None or not isinstance(self.rmq_connection.connection, pika.connection.Connection):
+            logger.error(f"{len(replies)} batched replies to {reply_to} are lost, connection is not established")
+            return
+        envelope, properties = pack_message_batch(replies)
+        message, properties = self.codec_registry.encode_message(envelope, reply_to, properties)
+        self.rmq_connection.call_threadsafe(
+            self.rmq_connection.publish_message,
+            message=message,
+            queue_name=reply_to,
+            properties=properties,
+        )
 
-                if hasattr(spider, "processing_tasks") and isinstance(spider.processing_tasks, TaskObserver):
-                    spider.processing_tasks.remove_task(delivery_tag)
+    def _restore_checkpoint(self, current_task: Task, redelivered: bool = True):
+        get_task_checkpoint_key = getattr(self.__spider, "get_task_checkpoint_key", None)
+        if not callable(get_task_checkpoint_key):
+            return
+        checkpoint_key = get_task_checkpoint_key(current_task.payload)
+        if checkpoint_key is None:
+            return
+        # task delivered for the first time has no completed requests, store is not queried
+        checkpointed_requests = self.checkpoint_store.load(checkpoint_key) if redelivered else {}
+        current_task.restore_checkpoint(checkpoint_key, checkpointed_requests)
+        if checkpointed_requests:
+            logger.info(
+                f"Task {current_task.delivery_tag} resumed from checkpoint: "
+                f"{len(checkpointed_requests)} completed request(s) are skipped"
+            )
+            self.crawler.stats.inc_value("rmq/checkpoint/resumed_tasks", spider=self.__spider)
+
+    def _record_checkpoint(self, spider, delivery_tag, response):
+        current_task = spider.processing_tasks.get_task(delivery_tag)
+        if self.checkpoint_store is None or current_task is None or current_task.checkpoint_key is None:
+            return
+        if not 200 <= response.status < 300:
+            return
+        # recorded under url of emitted request (before redirects), it is compared with emitted urls on redelivery
+        checkpoint_url = response.meta.get(TaskCheckpointSpiderMiddleware.CHECKPOINT_META_KEY)
+        self.checkpoint_store.record(
+            current_task.checkpoint_key,
+            checkpoint_url if isinstance(checkpoint_url, str) else response.request.url,
+            response.meta.get(TaskCheckpointSpiderMiddleware.CHECKPOINT_ITEMS_META_KEY, 0),
+        )
+        self.crawler.stats.inc_value("rmq/checkpoint/recorded_requests", spider=spider)
+
+    def _discard_task_work(self, spider, delivery_tag, current_task: Task):
+        """Purges pending requests of finalized task, its late responses, items and requests are ignored"""
+        scheduler = self.crawler.engine.slot.scheduler if self.crawler.engine.slot is not None else None
+        purge_task = getattr(scheduler, "purge_task", None)
+        purged_count = purge_task(delivery_tag) if callable(purge_task) else 0
+        spider.processing_tasks.discard_task(current_task, purged_count or 0)
+
+    def _expire_tasks(self):
+        """Finalizes tasks which deadline is passed with EXPIRED status, so their prefetch slots are released"""
+        spider = self.__spider
+        if spider is None:
+            return
+        requeue = spider.settings.getbool("RMQ_TASK_EXPIRED_REQUEUE", False)
+        for current_task, reason in spider.processing_tasks.pop_expired_tasks():
+            delivery_tag = current_task.delivery_tag
+            logger.warning(f"Task {delivery_tag} expired ({reason}): {current_task}")
+            current_task.status = TaskStatusCodes.EXPIRED
+            current_task.exception = json.dumps(
+                {"message": f"Task expired ({reason} deadline exceeded)", "traceback": None}
+            )
+
+            self._finalize_task(spider, delivery_tag, current_task, requeue=requeue)
+            self._discard_task_work(spider, delivery_tag, current_task)
+
+            self.crawler.stats.inc_value("rmq/task_consumer/expired_tasks", spider=spider)
+            self.crawler.stats.inc_value(f"rmq/task_consumer/expired_tasks/{reason}", spider=spider)
 
     def _validate_spider_has_attributes(self):
         spider_attributes = [attr for attr in dir(self.__spider) if not callable(getattr(self.__spider, attr))]
-        if "task_queue_name" not in spider_attributes:
-            return False
-        if not isinstance(self.__spider.task_queue_name, str) or len(self.__spider.task_queue_name) == 0:
-            return False
+        if getattr(self.__spider, "task_queues", None):
+            if not isinstance(self.__spider.task_queues, (list, tuple)):
+                return False
+        else:
+            if "task_queue_name" not in spider_attributes:
+                return False
+            if not isinstance(self.__spider.task_queue_name, str) or len(self.__spider.task_queue_name) == 0:
+                return False
         if "processing_tasks" not in spider_attributes:
             return False
         if not isinstance(self.__spider.processing_tasks, TaskObserver):
@@ -345,14 +572,39 @@ class RPCTaskConsumer(object):
             return False
         return True
 
-    def set_connection_handle(self, connection):
-        self.rmq_connection = connection
-        self._can_interact = True
-        self._can_get_next_message = True
+    def _init_task_queues(self):
+        """Builds consumed queues from spider task_queues (or task_queue_name) and splits prefetch by weights.
 
-    def set_can_interact(self, can_interact):
-        self._can_interact = can_interact
-        self._can_get_next_message = can_interact
+        Queues without explicit prefetch_count share CONCURRENT_REQUESTS proportionally to their weights. Task weight
+        (used by TaskFairScheduler) compensates explicit prefetch, so downloader capacity is shared by queue weights
+        """
+        queue_configs = getattr(self.__spider, "task_queues", None) or [self.__spider.task_queue_name]
+        self.task_queues = [
+            TaskQueue.from_spider_config(self, queue_config, index=index)
+            for index, queue_config in enumerate(queue_configs)
+        ]
+        total_prefetch_count = self.__spider.settings.getint("CONCURRENT_REQUESTS", 1)
+        total_weight = sum(task_queue.weight for task_queue in self.task_queues) or 1
+        for task_queue in self.task_queues:
+            share = task_queue.weight / total_weight
+            if task_queue.prefetch_count is None:
+                task_queue.prefetch_count = max(round(total_prefetch_count * share), 1)
+            task_queue.task_weight = share * total_prefetch_count / task_queue.prefetch_count
+        # the lightest task weighs 1, so every task gets at least one request per round
+        min_task_weight = min(task_queue.task_weight for task_queue in self.task_queues)
+        for task_queue in self.task_queues:
+            task_queue.task_weight /= min_task_weight
+        if len(self.task_queues) > 1:
+            logger.info(f"Consuming task queues: {self.task_queues}")
+            if self.connection_manager is None and getattr(self.connection_class, "RUNS_IN_SEPARATE_THREAD", False):
+                # one channel per queue on one connection instead of connection (and ioloop thread) per queue
+                self.connection_manager = PikaConnectionManager.from_settings(self.__spider.settings)
+
+    def on_task_queue_interact_changed(self, task_queue: TaskQueue):
+        if task_queue.index == 0:
+            self.rmq_connection = task_queue.rmq_connection
+        self._can_interact = all(task_queue.can_interact for task_queue in self.task_queues)
+        self._can_get_next_message = self._can_interact
 
     def raise_close_spider(self):
         if self.crawler.engine.slot is None or self.crawler.engine.slot.closing:
@@ -360,76 +612,136 @@ class RPCTaskConsumer(object):
             return
         self.crawler.engine.close_spider(self.__spider)
 
-    def connect(self, parameters, queue_name):
-        c = PikaSelectConnection(
+    def connect(self, parameters, task_queue: TaskQueue):
+        prefetch_count = task_queue.prefetch_count
+        channel_prefetch_count = None
+        if self.__spider.settings.getbool("RMQ_ADAPTIVE_PREFETCH_ENABLED", False):
+            # consumer prefetch is upper bound, effective limit is channel prefetch adjusted at runtime
+            channel_prefetch_count = prefetch_count
+            prefetch_count = max(self.__spider.settings.getint("RMQ_ADAPTIVE_PREFETCH_MAX", 64), prefetch_count)
+        c = self.connection_class(
             parameters,
-            queue_name,
-            owner=self,
+            task_queue.name,
+            owner=task_queue,
             options={
+                "delivery_tag_namespace": task_queue.index,
                 "enable_delivery_confirmations": False,
-                "prefetch_count": self.__spider.settings.get("CONCURRENT_REQUESTS", 1),
+                "prefetch_count": prefetch_count,
+                "channel_prefetch_count": channel_prefetch_count,
+                "ack_batching": self.__spider.settings.getbool("RMQ_ACK_BATCHING_ENABLED", False),
+                "ack_max_delay": self.__spider.settings.getfloat("RMQ_ACK_MAX_DELAY", 0.5),
+                "resilient": self.__spider.settings.getbool("RMQ_RESILIENT_CONNECTION_ENABLED", False),
+                "reconnect_backoff_initial": self.__spider.settings.getfloat("RMQ_RECONNECT_BACKOFF_INITIAL", 1),
+                "reconnect_backoff_max": self.__spider.settings.getfloat("RMQ_RECONNECT_BACKOFF_MAX", 60),
             },
             is_consumer=True,
+            connection_manager=self.connection_manager,
+            channel_name="rpc_task_consumer" if task_queue.index == 0 else f"rpc_task_consumer:{task_queue.name}",
         )
         logger.info("Pika threaded event start")
         c.run()
         logger.info("Pika threaded event loop stopped and exited")
 
+    def set_prefetch_count(self, prefetch_count):
+        """Changes number of unacked tasks which broker delivers to spider (split between queues by weights)"""
+        total_weight = sum(task_queue.weight for task_queue in self.task_queues) or 1
+        for task_queue in self.task_queues:
+            rmq_connection = task_queue.rmq_connection
+            if rmq_connection is None or not isinstance(rmq_connection.connection, pika.connection.Connection):
+                continue
+            queue_prefetch_count = max(round(prefetch_count * task_queue.weight / total_weight), 1)
+            task_queue.prefetch_count = queue_prefetch_count
+            rmq_connection.call_threadsafe(rmq_connection.set_channel_prefetch_count, queue_prefetch_count)
+
+    def get_prefetch_count(self):
+        """Returns number of unacked tasks applied to channels of all queues"""
+        return sum(task_queue.prefetch_count or 0 for task_queue in self.task_queues)
+
+    def _can_settle(self, current_task: Task):
+        """Task is settled on channel of its own queue, so it does not wait for channels of other queues"""
+        for task_queue in self.task_queues:
+            if task_queue.name == current_task.queue_name:
+                return task_queue.can_interact
+        return self._can_interact
+
     def _relieve(self):
-        if self._can_interact:
-            pending_ack = self.pending_relieve["ack"]
-            pending_nack = self.pending_relieve["nack"]
-            if len(pending_ack) == 0 and len(pending_nack) == 0:
-                return
-            while len(pending_ack):
-                delivery_tag = pending_ack.pop(0)
-                self.__spider.processing_tasks.get_task(delivery_tag).ack()
-            while len(pending_nack):
-                delivery_tag = pending_nack.pop(0)
-                self.__spider.processing_tasks.get_task(delivery_tag).nack()
-
-    def on_basic_get_message(self, message):
+        for pending_relieve_key, pending_tasks in self.pending_relieve.items():
+            if len(pending_tasks) == 0:
+                continue
+            still_pending_tasks = []
+            for pending_task in pending_tasks:
+                if not self._can_settle(pending_task):
+                    still_pending_tasks.append(pending_task)
+                elif pending_relieve_key == "nack":
+                    pending_task.nack()
+                else:
+                    pending_task.ack()
+            pending_tasks[:] = still_pending_tasks
+
+    def on_deliveries_invalidated(self, delivery_tags):
+        """Drops tasks of deliveries of closed channel. Broker redelivers them, so they are processed again"""
+        if self.__spider is None:
+            return
+        invalidated_tasks = self.__spider.processing_tasks.invalidate_tasks(delivery_tags)
+        for pending_tasks in self.pending_relieve.values():
+            pending_tasks[:] = [
+                pending_task for pending_task in pending_tasks if pending_task.delivery_tag not in delivery_tags
+            ]
+        self.crawler.stats.inc_value(
+            "rmq/task_consumer/invalidated_tasks", len(invalidated_tasks), spider=self.__spider
+        )
+        logger.warning(f"{len(invalidated_tasks)} task(s) invalidated by channel close")
+
+    def on_basic_get_message(self, message, task_queue: TaskQueue | None = None):
+        """Creates task of delivery and schedules request built by queue handler (spider next_request by default)"""
+        if task_queue is None:
+            task_queue = self.task_queues[0]
+        rmq_connection = task_queue.rmq_connection
         delivery_tag = message.get("method").delivery_tag
         ack_cb = nack_cb = None
-        if isinstance(self.rmq_connection.connection, pika.SelectConnection):
+        if isinstance(rmq_connection.connection, pika.connection.Connection):
             ack_cb = call_once(
                 functools.partial(
-                    self.rmq_connection.connection.ioloop.add_callback_threadsafe,
-                    functools.partial(self.rmq_connection.acknowledge_message, delivery_tag=delivery_tag),
+                    rmq_connection.call_threadsafe,
+                    rmq_connection.acknowledge_message,
+                    delivery_tag=delivery_tag,
                 )
             )
             nack_cb = call_once(
                 functools.partial(
-                    self.rmq_connection.connection.ioloop.add_callback_threadsafe,
-                    functools.partial(self.rmq_connection.negative_acknowledge_message, delivery_tag=delivery_tag),
+                    rmq_connection.call_threadsafe,
+                    rmq_connection.negative_acknowledge_message,
+                    delivery_tag=delivery_tag,
                 )
             )
         # rmq_task: Task = Task(message, ack_cb, nack_cb)
         rmq_task: Task = self.__spider.task_type(message, ack_cb, nack_cb)
+        rmq_task.queue_name = task_queue.name
+        rmq_task.weight = task_queue.task_weight
+        if self.checkpoint_store is not None:
+            self._restore_checkpoint(rmq_task, getattr(message["method"], "redelivered", True))
         self.__spider.processing_tasks.add_task(rmq_task)
         # logger.debug(message["body"])
         # logger.critical(message)
         self._can_get_next_message = True
-        spider_next_request = getattr(self.__spider, "next_request", None)
+        spider_next_request = (
+            task_queue.handler if callable(task_queue.handler) else getattr(self.__spider, task_queue.handler, None)
+        )
         if callable(spider_next_request):
-            prepared_request = self.__spider.next_request(delivery_tag, message.get("body"))
+            # single mutable copy of payload is shared by handler and request meta, task keeps the original
+            msg_body = rmq_task.payload.to_dict() if self.msg_body_compat else rmq_task.payload
+            prepared_request = spider_next_request(delivery_tag, msg_body)
             if isinstance(prepared_request, scrapy.Request):
-                prepared_request_meta = deepcopy(prepared_request.meta)
-                should_replace_meta = False
-                if self.delivery_tag_meta_key not in prepared_request_meta.keys():
-                    prepared_request_meta[self.delivery_tag_meta_key] = delivery_tag
-                    should_replace_meta = True
-                if self.msg_body_meta_key not in prepared_request_meta.keys():
-                    prepared_request_meta[self.msg_body_meta_key] = json.loads(message.get("body"))
-                    should_replace_meta = True
-                if should_replace_meta:
-                    prepared_request = prepared_request.replace(meta=prepared_request_meta)
+                # request references task payload by delivery tag (see TaskBaseSpider.get_task_payload)
+                prepared_request.meta.setdefault(self.delivery_tag_meta_key, delivery_tag)
+                if self.msg_body_compat:
+                    prepared_request.meta.setdefault(self.msg_body_meta_key, msg_body)
                 if prepared_request.dont_filter is False:
                     prepared_request = prepared_request.replace(dont_filter=True)
             self.crawler.engine.crawl(prepared_request)
 
-    def on_message_consumed(self, message):
-        self.on_basic_get_message(message)
+    def on_message_consumed(self, message, task_queue: TaskQueue | None = None):
+        self.on_basic_get_message(message, task_queue)
 
     def on_basic_get_empty(self):
         logger.debug("got empty response")
@@ -1,2 +1,4 @@
 from .delivery_tag_spider_middleware import DeliveryTagSpiderMiddleware
+from .task_cancellation_downloader_middleware import TaskCancellationDownloaderMiddleware
+from .task_checkpoint_spider_middleware import TaskCheckpointSpiderMiddleware
 from .task_toss_spider_middleware import TaskTossSpiderMiddleware
@@ -0,0 +1,41 @@
+from scrapy.exceptions import IgnoreRequest
+
+from rmq.signals import request_cancelled
+from rmq.utils import RMQConstants
+
+
+class TaskCancellationDownloaderMiddleware:
+    """Drops requests (before download) and responses (before parsing) of cancelled tasks.
+
+    Dropped request is marked with 'rmq_cancelled' meta key and request_cancelled signal is sent, so task accounting
+    counts it as cancelled instead of failed response.
+    """
+
+    CANCELLED_META_KEY = "rmq_cancelled"
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
+
+    def process_request(self, request, spider):
+        self._drop_if_cancelled(request, spider)
+
+    def process_response(self, request, response, spider):
+        self._drop_if_cancelled(request, spider)
+        return response
+
+    def _drop_if_cancelled(self, request, spider):
+        delivery_tag = request.meta.get(self.delivery_tag_meta_key)
+        if delivery_tag is None or request.meta.get(self.CANCELLED_META_KEY):
+            return
+        processing_tasks = getattr(spider, "processing_tasks", None)
+        if processing_tasks is None or not processing_tasks.is_cancelled(delivery_tag):
+            return
+        request.meta[self.CANCELLED_META_KEY] = True
+        self.crawler.stats.inc_value("rmq/cancelled_requests", spider=spider)
+        self.crawler.signals.send_catch_log(signal=request_cancelled, request=request, spider=spider)
+        raise IgnoreRequest(f"Task {delivery_tag} is cancelled")
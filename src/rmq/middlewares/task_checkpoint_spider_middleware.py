@@ -0,0 +1,39 @@
+import scrapy
+from scrapy.exceptions import NotConfigured
+
+from rmq.utils import RMQConstants
+
+
+class TaskCheckpointSpiderMiddleware:
+    """Skips sub-requests of redelivered tasks which were completed before restart (see TaskCheckpointStore).
+
+    Other sub-requests of checkpointed tasks carry their emitted url in 'rmq_checkpoint' meta key, so RPCTaskConsumer
+    records them under that url (not the redirected one) when their callbacks complete.
+    Enabled with RMQ_TASK_CHECKPOINT_ENABLED setting.
+    """
+
+    CHECKPOINT_META_KEY = "rmq_checkpoint"
+    CHECKPOINT_ITEMS_META_KEY = "rmq_checkpoint_items"
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("RMQ_TASK_CHECKPOINT_ENABLED", False):
+            raise NotConfigured
+        return cls(crawler)
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
+
+    def process_spider_output(self, response, result, spider):
+        processing_tasks = getattr(spider, "processing_tasks", None)
+        for result_item in result:
+            if isinstance(result_item, scrapy.Request) and processing_tasks is not None:
+                delivery_tag = result_item.meta.get(self.delivery_tag_meta_key, None)
+                current_task = processing_tasks.get_task(delivery_tag) if delivery_tag is not None else None
+                if current_task is not None and current_task.checkpoint_key is not None:
+                    if result_item.url in current_task.checkpointed_requests:
+                        self.crawler.stats.inc_value("rmq/checkpoint/skipped_requests", spider=spider)
+                        continue
+                    result_item.meta[self.CHECKPOINT_META_KEY] = result_item.url
+            yield result_item
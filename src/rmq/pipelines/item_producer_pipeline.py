@@ -1,16 +1,18 @@
 import functools
-import json
 import logging
+import time
 
 import pika
 from scrapy import signals
 from scrapy.crawler import Crawler
-from scrapy.exceptions import CloseSpider, DontCloseSpider
-from twisted.internet import reactor
+from scrapy.exceptions import CloseSpider, DontCloseSpider, DropItem
+from twisted.internet import defer, reactor
 
-from rmq.connections import PikaSelectConnection
+from rmq.codecs import CodecRegistry
+from rmq.connections import PikaConnectionManager
 from rmq.items import RMQItem
-from rmq.utils import RMQConstants, RMQDefaultOptions
+from rmq.signals import item_published
+from rmq.utils import RMQConstants, RMQDefaultOptions, load_connection_class
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +20,10 @@ logger = logging.getLogger(__name__)
 class ItemProducerPipeline:
     """Pipeline for publishing items to rabbitmq.
 
-    Requires 'result_queue_name' attribute in spider class
+    Requires 'result_queue_name' attribute in spider class.
+    If RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED setting is set, item processing is finished only after broker confirms
+    the published message (item is dropped if broker nacks it). item_published signal is sent when item is confirmed
+    (or sent, if confirms are disabled)
     """
 
     _DEFAULT_HEARTBEAT = 300
@@ -39,10 +44,18 @@ class ItemProducerPipeline:
         self.delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
         self.msg_body_meta_key = RMQConstants.MSG_BODY_META_KEY.value
 
+        self.connection_class = load_connection_class(crawler.settings)
+        self.connection_manager = PikaConnectionManager.for_owner(crawler.settings, self.connection_class)
+        self.codec_registry = CodecRegistry.from_settings(crawler.settings)
         self.rmq_connection = None
         self._can_interact = False
+        self.publish_confirms_enabled = crawler.settings.getbool("RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED", False)
 
-        self.pending_items_buffer: list[RMQItem] = []
+        self.pending_items_buffer: list[tuple[RMQItem, defer.Deferred | None]] = []
+
+        # engine is paused while connection reports backpressure (broker flow control or full outbound buffers)
+        self.backpressure_paused = False
+        self._backpressure_paused_since = None
 
     def spider_opened(self, spider):
         """Check spider for correct declared callbacks/errbacks/methods/variables"""
@@ -56,7 +69,7 @@ class ItemProducerPipeline:
         """Declare/retrieve queue name from spider instance"""
         result_queue_name = spider.result_queue_name
 
-        """Build pika connection parameters and start connection in separate twisted thread"""
+        """Build pika connection parameters and start connection (in separate twisted thread if required)"""
         parameters = pika.ConnectionParameters(
             host=self.spider.settings.get("RABBITMQ_HOST"),
             port=int(self.spider.settings.get("RABBITMQ_PORT")),
@@ -67,18 +80,25 @@ class ItemProducerPipeline:
             ),
             heartbeat=RMQDefaultOptions.CONNECTION_HEARTBEAT.value,
         )
-        reactor.callInThread(self.connect, parameters, result_queue_name)
+        if self.connection_class.RUNS_IN_SEPARATE_THREAD:
+            reactor.callInThread(self.connect, parameters, result_queue_name)
+        else:
+            self.connect(parameters, result_queue_name)
 
     def spider_idle(self, spider):
         if len(self.pending_items_buffer):
             raise DontCloseSpider
 
     def spider_closed(self, spider):
+        if self.backpressure_paused:
+            self.on_backpressure_changed(False)
         if self.rmq_connection is not None:
             while len(self.pending_items_buffer) and self._can_interact:
-                self.send_message(self.pending_items_buffer.pop(0))
-            if isinstance(self.rmq_connection.connection, pika.SelectConnection):
-                self.rmq_connection.connection.ioloop.add_callback_threadsafe(self.rmq_connection.stop)
+                self.send_message(*self.pending_items_buffer.pop(0))
+            for stat_key, stat_value in self.rmq_connection.get_stats().items():
+                self.crawler.stats.set_value(f"rmq/item_producer/{stat_key}", stat_value, spider=spider)
+            if isinstance(self.rmq_connection.connection, pika.connection.Connection):
+                self.rmq_connection.call_threadsafe(self.rmq_connection.stop)
 
     def _validate_spider_has_attributes(self):
         spider_attributes = [attr for attr in dir(self.spider) if not callable(getattr(self.spider, attr))]
@@ -95,6 +115,32 @@ class ItemProducerPipeline:
     def set_can_interact(self, can_interact):
         self._can_interact = can_interact
 
+    def on_backpressure_changed(self, paused):
+        if paused == self.backpressure_paused:
+            return
+        self.backpressure_paused = paused
+        engine = self.crawler.engine
+        if paused:
+            logger.warning("Broker backpressure, pausing engine")
+            self._backpressure_paused_since = time.monotonic()
+            self.crawler.stats.inc_value("rmq/backpressure/paused_count", spider=self.spider)
+            if engine is not None:
+                engine.pause()
+        else:
+            logger.info("Broker backpressure released, resuming engine")
+            if self._backpressure_paused_since is not None:
+                self.crawler.stats.inc_value(
+                    "rmq/backpressure/blocked_seconds",
+                    time.monotonic() - self._backpressure_paused_since,
+                    start=0.0,
+                    spider=self.spider,
+                )
+                self._backpressure_paused_since = None
+            if engine is not None:
+                engine.unpause()
+                if engine.slot is not None:
+                    engine.slot.nextcall.schedule()
+
     def raise_close_spider(self):
         if self.crawler.engine.slot is None or self.crawler.engine.slot.closing:
             logger.critical("SPIDER ALREADY CLOSED")
@@ -102,35 +148,80 @@ class ItemProducerPipeline:
         self.crawler.engine.close_spider(self.spider)
 
     def connect(self, parameters, queue_name):
-        """Creates and runs pika select connection"""
-        c = PikaSelectConnection(
+        """Creates and runs pika connection"""
+        c = self.connection_class(
             parameters,
             queue_name,
             owner=self,
             options={
-                "enable_delivery_confirmations": False,
+                "enable_delivery_confirmations": self.publish_confirms_enabled,
                 "prefetch_count": self.spider.settings.get("CONCURRENT_REQUESTS", 1),
+                "resilient": self.spider.settings.getbool("RMQ_RESILIENT_CONNECTION_ENABLED", False),
+                "reconnect_backoff_initial": self.spider.settings.getfloat("RMQ_RECONNECT_BACKOFF_INITIAL", 1),
+                "reconnect_backoff_max": self.spider.settings.getfloat("RMQ_RECONNECT_BACKOFF_MAX", 60),
+                "outbound_buffer_high_watermark": self.spider.settings.getint(
+                    "RMQ_OUTBOUND_BUFFER_HIGH_WATERMARK", 8 * 1024 * 1024
+                ),
+                "outbound_buffer_low_watermark": self.spider.settings.getint(
+                    "RMQ_OUTBOUND_BUFFER_LOW_WATERMARK", 2 * 1024 * 1024
+                ),
             },
             is_consumer=False,
+            connection_manager=self.connection_manager,
+            channel_name="item_producer_pipeline",
         )
         c.run()
 
-    def send_message(self, item):
-        """Sends message to rabbitmq"""
-        if isinstance(self.rmq_connection.connection, pika.SelectConnection):
+    def send_message(self, item, confirmation: defer.Deferred | None = None):
+        """Sends message to rabbitmq. Passed deferred is fired on reactor thread with broker confirmation result"""
+        if isinstance(self.rmq_connection.connection, pika.connection.Connection):
             item_as_dictionary = dict(item)
             if self.delivery_tag_meta_key in item_as_dictionary:
                 del item_as_dictionary[self.delivery_tag_meta_key]
-            cb = functools.partial(self.rmq_connection.publish_message, message=json.dumps(item_as_dictionary))
-            self.rmq_connection.connection.ioloop.add_callback_threadsafe(cb)
+            message, properties = self.codec_registry.encode_message(
+                item_as_dictionary, self.rmq_connection.queue_name
+            )
+            confirm_callback = None
+            if confirmation is not None:
+                confirm_callback = functools.partial(reactor.callFromThread, confirmation.callback)
+            self.rmq_connection.call_threadsafe(
+                self.rmq_connection.publish_message,
+                message=message,
+                properties=properties,
+                confirm_callback=confirm_callback,
+            )
+            if confirmation is None:
+                self._send_item_published(item)
+        elif confirmation is not None:
+            confirmation.callback(False)
 
     def process_item(self, item, spider):
         """Invoked when item is processed"""
         if isinstance(item, RMQItem):
+            confirmation = None
+            if self.publish_confirms_enabled:
+                confirmation = defer.Deferred()
+                confirmation.addCallback(self._on_item_publish_confirmed, item)
             if self._can_interact:
                 while len(self.pending_items_buffer):
-                    self.send_message(self.pending_items_buffer.pop(0))
-                self.send_message(item)
+                    self.send_message(*self.pending_items_buffer.pop(0))
+                self.send_message(item, confirmation)
             else:
-                self.pending_items_buffer.append(item)
+                self.pending_items_buffer.append((item, confirmation))
+            if confirmation is not None:
+                return confirmation
         return item
+
+    def _on_item_publish_confirmed(self, is_acked, item):
+        if not is_acked:
+            raise DropItem("Item publishing was not confirmed by broker")
+        self._send_item_published(item)
+        return item
+
+    def _send_item_published(self, item):
+        self.crawler.signals.send_catch_log(
+            signal=item_published,
+            item=item,
+            spider=self.spider,
+            delivery_tag=item.get(self.delivery_tag_meta_key, None),
+        )
@@ -0,0 +1 @@
+from .task_fair_scheduler import TaskFairScheduler
@@ -0,0 +1,129 @@
+import logging
+from collections import Counter, deque
+
+from scrapy.core.scheduler import Scheduler
+
+from rmq.utils import RMQConstants
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFairScheduler(Scheduler):
+    """Scheduler which serves requests of consumed tasks (keyed by delivery tag meta key) in round-robin order.
+
+    Every task has its own in-memory priority queue, so a task which fans out into hundreds of requests (category
+    pagination) can not starve tasks consumed after it. Optional per-task concurrency cap
+    (RMQ_TASK_FAIR_SCHEDULER_TASK_CONCURRENCY) limits number of requests of a single task in downloader.
+    Requests without delivery tag share one queue. Disk queues (JOBDIR) are not supported.
+    Tasks are served by weighted (deficit) round robin: task with weight 2 (Task.weight, set from weight of consumed
+    queue) gets twice as many requests per round as task with weight 1.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        scheduler.task_concurrency = crawler.settings.getint("RMQ_TASK_FAIR_SCHEDULER_TASK_CONCURRENCY", 0)
+        return scheduler
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.task_concurrency = 0
+        self.delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
+        # delivery tag -> priority queue of task requests
+        self._task_queues = {}
+        # delivery tags of tasks with pending requests in serving order
+        self._round_robin = deque()
+        # delivery tag -> requests which task at the head of round can get before it is rotated
+        self._credits = {}
+        self._pending_count = 0
+
+    def open(self, spider):
+        if self.dqdir is not None:
+            logger.warning(f"{self.__class__.__name__} does not support JOBDIR, requests are kept in memory")
+            self.dqdir = None
+        return super().open(spider)
+
+    def enqueue_request(self, request) -> bool:
+        if not request.dont_filter and self.df.request_seen(request):
+            self.df.log(request, self.spider)
+            return False
+        delivery_tag = request.meta.get(self.delivery_tag_meta_key)
+        task_queue = self._task_queues.get(delivery_tag)
+        if task_queue is None:
+            task_queue = self._mq()
+            self._task_queues[delivery_tag] = task_queue
+            self._round_robin.append(delivery_tag)
+        task_queue.push(request)
+        self._pending_count += 1
+
+        self.stats.inc_value("scheduler/enqueued/memory", spider=self.spider)
+        self.stats.inc_value("scheduler/enqueued", spider=self.spider)
+        self.stats.max_value("scheduler/task_fair/max_task_queue_depth", len(task_queue), spider=self.spider)
+        self.stats.max_value("scheduler/task_fair/max_active_tasks", len(self._task_queues), spider=self.spider)
+        return True
+
+    def next_request(self):
+        in_flight = self._count_in_flight_requests() if self.task_concurrency > 0 else None
+        for _ in range(len(self._round_robin)):
+            delivery_tag = self._round_robin[0]
+            if in_flight is not None and delivery_tag is not None and in_flight[delivery_tag] >= self.task_concurrency:
+                self._round_robin.rotate(-1)
+                continue
+            credit = self._credits.get(delivery_tag, 0.0)
+            if credit < 1:
+                credit += self._get_task_weight(delivery_tag)
+            credit -= 1
+            task_queue = self._task_queues[delivery_tag]
+            request = task_queue.pop()
+            if not len(task_queue):
+                self._round_robin.popleft()
+                del self._task_queues[delivery_tag]
+                self._credits.pop(delivery_tag, None)
+            else:
+                self._credits[delivery_tag] = credit
+                if credit < 1:
+                    # credit of round is spent, the rest is carried to the next round
+                    self._round_robin.rotate(-1)
+            if request is None:
+                continue
+            self._pending_count -= 1
+            self.stats.inc_value("scheduler/dequeued/memory", spider=self.spider)
+            self.stats.inc_value("scheduler/dequeued", spider=self.spider)
+            return request
+        if self._round_robin:
+            # every task with pending requests reached concurrency cap
+            self.stats.inc_value("scheduler/task_fair/capped", spider=self.spider)
+        return None
+
+    def _get_task_weight(self, delivery_tag) -> float:
+        processing_tasks = getattr(self.spider, "processing_tasks", None)
+        if delivery_tag is None or processing_tasks is None:
+            return 1.0
+        task = processing_tasks.get_task(delivery_tag)
+        return max(task.weight, 1.0) if task is not None else 1.0
+
+    def __len__(self) -> int:
+        return self._pending_count
+
+    def _count_in_flight_requests(self) -> Counter:
+        downloader = self.crawler.engine.downloader
+        return Counter(request.meta.get(self.delivery_tag_meta_key) for request in downloader.active)
+
+    def get_task_queue_depths(self) -> dict:
+        """Returns number of pending requests per delivery tag"""
+        return {delivery_tag: len(task_queue) for delivery_tag, task_queue in self._task_queues.items()}
+
+    def purge_task(self, delivery_tag) -> int:
+        """Drops pending requests of task (e.g. task is cancelled), returns number of dropped requests"""
+        if delivery_tag is None:
+            return 0
+        task_queue = self._task_queues.pop(delivery_tag, None)
+        if task_queue is None:
+            return 0
+        self._round_robin.remove(delivery_tag)
+        self._credits.pop(delivery_tag, None)
+        purged_count = len(task_queue)
+        task_queue.close()
+        self._pending_count -= purged_count
+        self.stats.inc_value("scheduler/task_fair/purged", purged_count, spider=self.spider)
+        return purged_count
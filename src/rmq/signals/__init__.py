@@ -1,3 +1,5 @@
 from .callback_completed import callback_completed
 from .errback_completed import errback_completed
+from .item_published import item_published
 from .item_scheduled import item_scheduled
+from .request_cancelled import request_cancelled
@@ -0,0 +1 @@
+item_published = object()
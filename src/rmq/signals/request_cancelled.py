@@ -0,0 +1 @@
+request_cancelled = object()
@@ -2,10 +2,16 @@
 import json
 import traceback
 
-from rmq.extensions import RPCTaskConsumer
-from rmq.middlewares import DeliveryTagSpiderMiddleware, TaskTossSpiderMiddleware
+from rmq.extensions import AdaptivePrefetchController, RPCTaskConsumer
+from rmq.middlewares import (
+    DeliveryTagSpiderMiddleware,
+    TaskCancellationDownloaderMiddleware,
+    TaskCheckpointSpiderMiddleware,
+    TaskTossSpiderMiddleware,
+)
+from rmq.schedulers import TaskFairScheduler
 from rmq.spiders import HttpbinSpider
-from rmq.utils import Task, TaskObserver, TaskStatusCodes, get_import_full_name
+from rmq.utils import RMQConstants, Task, TaskObserver, TaskPayload, TaskStatusCodes, get_import_full_name
 from rmq.utils.decorators import rmq_errback
 
 
@@ -15,27 +21,66 @@ class TaskBaseSpider(HttpbinSpider):
         spider_middlewares = settings.getdict("SPIDER_MIDDLEWARES")
         spider_middlewares[get_import_full_name(TaskTossSpiderMiddleware)] = 140
         spider_middlewares[get_import_full_name(DeliveryTagSpiderMiddleware)] = 150
+        # enabled with RMQ_TASK_CHECKPOINT_ENABLED setting
+        spider_middlewares[get_import_full_name(TaskCheckpointSpiderMiddleware)] = 160
+
+        downloader_middlewares = settings.getdict("DOWNLOADER_MIDDLEWARES")
+        downloader_middlewares[get_import_full_name(TaskCancellationDownloaderMiddleware)] = 50
 
         spider_extensions = settings.getdict("EXTENSIONS")
         spider_extensions[get_import_full_name(RPCTaskConsumer)] = 20
+        # enabled with RMQ_ADAPTIVE_PREFETCH_ENABLED setting
+        spider_extensions[get_import_full_name(AdaptivePrefetchController)] = 30
 
         for custom_setting, value in (cls.custom_settings or {}).items():
             if custom_setting == "SPIDER_MIDDLEWARES":
                 spider_middlewares = {**spider_middlewares, **value}
             elif custom_setting == "EXTENSIONS":
                 spider_extensions = {**spider_extensions, **value}
+            elif custom_setting == "DOWNLOADER_MIDDLEWARES":
+                downloader_middlewares = {**downloader_middlewares, **value}
             else:
                 settings.set(custom_setting, value)
         settings.set("SPIDER_MIDDLEWARES", spider_middlewares)
         settings.set("EXTENSIONS", spider_extensions)
+        settings.set("DOWNLOADER_MIDDLEWARES", downloader_middlewares)
+        if settings.getbool("RMQ_TASK_FAIR_SCHEDULER_ENABLED", False):
+            settings.set("SCHEDULER", get_import_full_name(TaskFairScheduler))
 
     def __init__(self, *args, **kwargs):
         super(TaskBaseSpider, self).__init__(*args, **kwargs)
         self.task_type = Task
         self.processing_tasks = TaskObserver()
+        # direct items/callbacks accounting of rmq_callback/rmq_errback, set by RPCTaskConsumer
+        self.task_accounting = None
+
+    def get_task_payload(self, response) -> TaskPayload | None:
+        """Returns decoded payload of task which response (request, failure or delivery tag) belongs to"""
+        if isinstance(response, int):
+            delivery_tag = response
+        else:
+            request = response if hasattr(response, "meta") else getattr(response, "request", None)
+            if request is None:
+                return None
+            delivery_tag = request.meta.get(RMQConstants.DELIVERY_TAG_META_KEY.value)
+        task = self.processing_tasks.get_task(delivery_tag)
+        return task.payload if task is not None else None
+
+    def get_task_checkpoint_key(self, payload: TaskPayload) -> str | None:
+        """Returns task identity in checkpoint store (RMQ_TASK_CHECKPOINT_ENABLED) or None if task is not checkpointed.
+        Could be overridden if task payload has no task_id/session_id and url keys
+        """
+        task_id = payload.get("task_id", None)
+        session_id = payload.get("session_id", None)
+        url = payload.get("url", None)
+        if url is None or (task_id is None and session_id is None):
+            return None
+        return f"{self.name}:{task_id}:{session_id}:{url}"
 
     @rmq_errback
     def _errback(self, failure):
+        if failure.request.meta.get(TaskCancellationDownloaderMiddleware.CANCELLED_META_KEY):
+            return
         delivery_tag = failure.request.meta.get("delivery_tag")
         self._inject_soft_exception_to_task(
             delivery_tag, TaskStatusCodes.ERROR.value, "Failed to reach 200 response after retries"
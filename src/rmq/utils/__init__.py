@@ -1,7 +1,16 @@
+from .acknowledgement_batcher import AcknowledgementBatcher
+from .command_buffer import CommandBuffer
 from .constants import RMQConstants
+from .delivery_confirmation_tracker import DeliveryConfirmationTracker
 from .extract_delivery_tag_from_failure import extract_delivery_tag_from_failure
 from .import_full_name import get_import_full_name
+from .load_connection_class import load_connection_class
+from .queue_depth_controller import QueueDepthController
+from .reply_batcher import ReplyBatcher
 from .rmq_default_options import RMQDefaultOptions
 from .task import Task
+from .task_checkpoint_store import TaskCheckpointStore
 from .task_observer import TaskObserver
+from .task_payload import TaskPayload
+from .task_queue import TaskQueue
 from .task_status_codes import TaskStatusCodes
@@ -0,0 +1,91 @@
+from typing import Callable, Dict, Set, Tuple
+
+
+class AcknowledgementBatcher:
+    """Collects settled (acked/nacked) consumer delivery tags of a single channel and emits them in batches.
+
+    Consumer delivery tags are sequential per channel. Settled tags are only recorded, the owner calls
+    flush_contiguous() soon after (e.g. once per ioloop iteration) to emit tags contiguous with the low watermark as
+    a single Basic.Ack/Basic.Nack with multiple=True (one frame per run of the same kind). Tags settled out of order
+    wait for the gap to be filled and are emitted individually by flush() which the owner calls after configured
+    max delay, so acknowledgement latency stays bounded.
+    """
+
+    _ACK = (False, False)
+
+    def __init__(
+        self,
+        basic_ack: Callable[[int, bool], None],
+        basic_nack: Callable[[int, bool, bool], None],
+    ):
+        # basic_ack(delivery_tag, multiple) and basic_nack(delivery_tag, multiple, requeue) send frames to channel
+        self._basic_ack = basic_ack
+        self._basic_nack = basic_nack
+
+        self.frames_sent = 0
+        self.messages_settled = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets all tags (e.g. channel was reopened and delivery tags are not valid anymore)"""
+        self._watermark = 0
+        # delivery tag -> (is_nack, requeue) of settled but not emitted tags above watermark
+        self._pending: Dict[int, Tuple[bool, bool]] = {}
+        self._emitted_above_watermark: Set[int] = set()
+
+    def ack(self, delivery_tag: int):
+        self._settle(delivery_tag, self._ACK)
+
+    def nack(self, delivery_tag: int, requeue: bool = True):
+        self._settle(delivery_tag, (True, requeue))
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def flush_contiguous(self):
+        """Emits all settled tags which are contiguous with the low watermark"""
+        tag = self._watermark + 1
+        run_kind = None
+        run_end = None
+        run_size = 0
+        while True:
+            if tag in self._pending:
+                kind = self._pending.pop(tag)
+                if run_kind is not None and kind != run_kind:
+                    self._emit(run_end, run_kind, run_size > 1)
+                    run_size = 0
+                run_kind = kind
+                run_end = tag
+                run_size += 1
+            elif tag in self._emitted_above_watermark:
+                # already emitted individually, is not outstanding on broker side anymore
+                self._emitted_above_watermark.discard(tag)
+            else:
+                break
+            tag += 1
+        if run_kind is not None:
+            self._emit(run_end, run_kind, run_size > 1)
+        self._watermark = tag - 1
+
+    def flush(self):
+        """Emits all settled tags: contiguous runs as multiple frames and out-of-order gaps individually"""
+        self.flush_contiguous()
+        for tag in sorted(self._pending):
+            self._emit(tag, self._pending[tag], False)
+            self._emitted_above_watermark.add(tag)
+        self._pending.clear()
+
+    def _settle(self, delivery_tag, kind):
+        if delivery_tag <= self._watermark or delivery_tag in self._emitted_above_watermark:
+            return
+        self._pending[delivery_tag] = kind
+        self.messages_settled += 1
+
+    def _emit(self, delivery_tag, kind, multiple):
+        is_nack, requeue = kind
+        self.frames_sent += 1
+        if is_nack:
+            self._basic_nack(delivery_tag, multiple, requeue)
+        else:
+            self._basic_ack(delivery_tag, multiple)
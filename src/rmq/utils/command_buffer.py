@@ -0,0 +1,102 @@
+import logging
+import time
+from collections import deque
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CommandBuffer:
+    """Cross-thread command buffer which is drained in batches by the consuming (pika ioloop) thread.
+
+    Producing threads append commands to a deque (append/popleft are atomic) and request a wakeup only when no drain
+    is pending yet, so a burst of commands costs a single wakeup. The drain flag is released before the buffer is
+    drained, so a command appended concurrently with drain is either drained in the current batch or triggers the next
+    wakeup. Benign races between producers may cause an extra (empty) wakeup but never a lost command.
+    """
+
+    def __init__(self, wakeup: Callable[[Callable[[], None]], None]):
+        # wakeup is called with drain callable and must schedule it on the consuming thread
+        self._wakeup = wakeup
+        self._commands = deque()
+        self._drain_pending = False
+        self._first_pending_at = None
+
+        self.enqueued_count = 0
+        self.drained_count = 0
+        self.wakeups_count = 0
+        self.drains_count = 0
+        self.max_depth = 0
+        self.max_drain_size = 0
+        self.last_drain_latency = 0.0
+        self.max_drain_latency = 0.0
+        self.total_drain_latency = 0.0
+
+    def push(self, command: Callable, *args, **kwargs):
+        self._commands.append((command, args, kwargs))
+        self.enqueued_count += 1
+        depth = len(self._commands)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if not self._drain_pending:
+            self._drain_pending = True
+            self._first_pending_at = time.monotonic()
+            self.wakeups_count += 1
+            self._wakeup(self.drain)
+
+    def drain(self):
+        first_pending_at = self._first_pending_at
+        self._first_pending_at = None
+        self._drain_pending = False
+        if first_pending_at is not None:
+            latency = time.monotonic() - first_pending_at
+            self.last_drain_latency = latency
+            self.total_drain_latency += latency
+            if latency > self.max_drain_latency:
+                self.max_drain_latency = latency
+        drained = 0
+        while True:
+            try:
+                command, args, kwargs = self._commands.popleft()
+            except IndexError:
+                break
+            drained += 1
+            try:
+                command(*args, **kwargs)
+            except Exception as e:
+                logger.exception(f"Buffered command {command} failed: {e!r}")
+        self.drains_count += 1
+        self.drained_count += drained
+        if drained > self.max_drain_size:
+            self.max_drain_size = drained
+
+    def clear(self) -> list:
+        """Drops pending commands (e.g. commands bound to the closed connection) and returns them as
+        (command, args, kwargs), so the owner could resolve their callbacks
+        """
+        dropped = []
+        while True:
+            try:
+                dropped.append(self._commands.popleft())
+            except IndexError:
+                break
+        self._drain_pending = False
+        self._first_pending_at = None
+        return dropped
+
+    def __len__(self):
+        return len(self._commands)
+
+    def get_stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued_count,
+            "drained": self.drained_count,
+            "depth": len(self._commands),
+            "max_depth": self.max_depth,
+            "wakeups": self.wakeups_count,
+            "drains": self.drains_count,
+            "max_drain_size": self.max_drain_size,
+            "last_drain_latency": self.last_drain_latency,
+            "max_drain_latency": self.max_drain_latency,
+            "avg_drain_latency": self.total_drain_latency / self.drains_count if self.drains_count else 0.0,
+        }
@@ -3,9 +3,10 @@ import inspect
 
 import scrapy
 
-from rmq.signals import callback_completed, item_scheduled
 from rmq.utils import RMQConstants
 
+from .task_accounting import account_callback_completed, account_item_scheduled, get_task_accounting
+
 
 def rmq_callback(callback_method):
     @functools.wraps(callback_method)
@@ -13,6 +14,7 @@ def rmq_callback(callback_method):
         delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
         callback_result = callback_method(self, *args, **kwargs)
         if isinstance(self, scrapy.Spider):
+            accounting = get_task_accounting(self)
             if len(args) > 0:
                 response = args[0]
                 if isinstance(response, scrapy.http.Response):
@@ -21,31 +23,21 @@ def rmq_callback(callback_method):
                         iter(callback_result)
                         for callback_result_item in callback_result:
                             if isinstance(callback_result_item, scrapy.Item):
-                                self.crawler.signals.send_catch_log(
-                                    signal=item_scheduled,
-                                    response=response,
-                                    spider=self,
-                                    delivery_tag=delivery_tag,
-                                )
+                                account_item_scheduled(accounting, self, response, delivery_tag)
                             yield callback_result_item
                     except TypeError:
                         pass
-                    self.crawler.signals.send_catch_log(
-                        signal=callback_completed,
-                        response=response,
-                        spider=self,
-                        delivery_tag=delivery_tag,
-                    )
+                    account_callback_completed(accounting, self, response, delivery_tag)
             else:
                 try:
                     iter(callback_result)
                     for callback_result_item in callback_result:
                         if isinstance(callback_result_item, scrapy.Item):
-                            self.crawler.signals.send_catch_log(signal=item_scheduled, spider=self)
+                            account_item_scheduled(accounting, self, None, None)
                         yield callback_result_item
                 except TypeError:
                     pass
-                self.crawler.signals.send_catch_log(signal=callback_completed, spider=self)
+                account_callback_completed(accounting, self)
         else:
             try:
                 iter(callback_result)
@@ -4,9 +4,10 @@ import inspect
 import scrapy
 from twisted.python.failure import Failure
 
-from rmq.signals import errback_completed, item_scheduled
 from rmq.utils import RMQConstants
 
+from .task_accounting import account_errback_completed, account_item_scheduled, get_task_accounting
+
 
 def rmq_errback(errback_method):
     @functools.wraps(errback_method)
@@ -14,6 +15,7 @@ def rmq_errback(errback_method):
         delivery_tag_meta_key = RMQConstants.DELIVERY_TAG_META_KEY.value
         errback_result = errback_method(self, *args, **kwargs)
         if isinstance(self, scrapy.Spider):
+            accounting = get_task_accounting(self)
             if len(args) > 0:
                 response_or_failure = args[0]
                 if isinstance(response_or_failure, scrapy.http.Response):
@@ -22,20 +24,12 @@ def rmq_errback(errback_method):
                         iter(errback_result)
                         for errback_result_item in errback_result:
                             if isinstance(errback_result_item, scrapy.Item):
-                                self.crawler.signals.send_catch_log(
-                                    signal=item_scheduled,
-                                    response=response_or_failure,
-                                    spider=self,
-                                    delivery_tag=delivery_tag,
-                                )
+                                account_item_scheduled(accounting, self, response_or_failure, delivery_tag)
                             yield errback_result_item
                     except TypeError:
                         pass
-                    self.crawler.signals.send_catch_log(
-                        signal=errback_completed,
-                        response=response_or_failure,
-                        spider=self,
-                        delivery_tag=delivery_tag,
+                    account_errback_completed(
+                        accounting, self, delivery_tag=delivery_tag, response=response_or_failure
                     )
                 if isinstance(response_or_failure, Failure):
                     if hasattr(response_or_failure, "request"):
@@ -44,20 +38,12 @@ def rmq_errback(errback_method):
                             iter(errback_result)
                             for errback_result_item in errback_result:
                                 if isinstance(errback_result_item, scrapy.Item):
-                                    self.crawler.signals.send_catch_log(
-                                        signal=item_scheduled,
-                                        response=response_or_failure,
-                                        spider=self,
-                                        delivery_tag=delivery_tag,
-                                    )
+                                    account_item_scheduled(accounting, self, response_or_failure, delivery_tag)
                                 yield errback_result_item
                         except TypeError:
                             pass
-                        self.crawler.signals.send_catch_log(
-                            signal=errback_completed,
-                            failure=response_or_failure,
-                            spider=self,
-                            delivery_tag=delivery_tag,
+                        account_errback_completed(
+                            accounting, self, failure=response_or_failure, delivery_tag=delivery_tag
                         )
             else:
                 try:
@@ -67,15 +53,10 @@ def rmq_errback(errback_method):
                             isinstance(errback_result_item, scrapy.Item)
                             and delivery_tag_meta_key in errback_result_item.keys()
                         ):
-                            self.crawler.signals.send_catch_log(
-                                signal=item_scheduled,
-                                response=None,
-                                spider=self,
-                                delivery_tag=errback_result_item[delivery_tag_meta_key],
-                            )
+                            account_item_scheduled(accounting, self, None, errback_result_item[delivery_tag_meta_key])
                 except TypeError:
                     pass
-                self.crawler.signals.send_catch_log(signal=errback_completed)
+                account_errback_completed(accounting, self)
         else:
             try:
                 iter(errback_result)
@@ -84,11 +65,8 @@ def rmq_errback(errback_method):
                         isinstance(errback_result_item, scrapy.Item)
                         and delivery_tag_meta_key in errback_result_item.keys()
                     ):
-                        self.crawler.signals.send_catch_log(
-                            signal=item_scheduled,
-                            response=None,
-                            spider=self,
-                            delivery_tag=errback_result_item[delivery_tag_meta_key],
+                        account_item_scheduled(
+                            get_task_accounting(self), self, None, errback_result_item[delivery_tag_meta_key]
                         )
             except TypeError:
                 pass
@@ -0,0 +1,57 @@
+"""Accounting of items and completed callbacks of rmq_callback/rmq_errback decorated methods.
+
+If spider has task_accounting object (RPCTaskConsumer sets itself), counters are updated with direct calls.
+Otherwise (RMQ_TASK_ACCOUNTING_SIGNALS_ENABLED is set) events are sent as signals.
+Errors of direct calls are logged and not propagated to decorated callback, like send_catch_log does for signals.
+"""
+
+import logging
+
+from rmq.signals import callback_completed, errback_completed, item_scheduled
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_task_accounting(spider):
+    return getattr(spider, "task_accounting", None)
+
+
+def _call_accounting(spider, handler, *args):
+    try:
+        handler(*args)
+    except Exception:
+        logger.error(f"Error caught on task accounting {handler.__name__}", exc_info=True, extra={"spider": spider})
+
+
+def account_item_scheduled(accounting, spider, response, delivery_tag):
+    if accounting is not None:
+        _call_accounting(spider, accounting.account_item_scheduled, delivery_tag, response)
+    else:
+        spider.crawler.signals.send_catch_log(
+            signal=item_scheduled, response=response, spider=spider, delivery_tag=delivery_tag
+        )
+
+
+def account_callback_completed(accounting, spider, response=None, delivery_tag=None):
+    if accounting is not None:
+        _call_accounting(spider, accounting.account_callback_completed, delivery_tag, response)
+    elif response is not None:
+        spider.crawler.signals.send_catch_log(
+            signal=callback_completed, response=response, spider=spider, delivery_tag=delivery_tag
+        )
+    else:
+        spider.crawler.signals.send_catch_log(signal=callback_completed, spider=spider)
+
+
+def account_errback_completed(accounting, spider, failure=None, delivery_tag=None, response=None):
+    if accounting is not None:
+        _call_accounting(spider, accounting.account_errback_completed, delivery_tag, failure)
+    elif failure is not None:
+        spider.crawler.signals.send_catch_log(
+            signal=errback_completed, failure=failure, spider=spider, delivery_tag=delivery_tag
+        )
+    else:
+        spider.crawler.signals.send_catch_log(
+            signal=errback_completed, response=response, spider=spider, delivery_tag=delivery_tag
+        )
@@ -0,0 +1,80 @@
+from typing import Callable, Dict, Optional, Set
+
+
+class DeliveryConfirmationTracker:
+    """Tracks publisher confirms of a single channel.
+
+    Published delivery tags are sequential, so every tag lower or equal to the watermark is confirmed and only
+    out-of-order confirms above the watermark are stored in a sparse set. Each tag is settled exactly once, so both
+    single and multiple (Basic.Ack/Basic.Nack with multiple=True) confirms are handled in amortized O(1).
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.published = 0
+        self.acked = 0
+        self.nacked = 0
+
+        self._watermark = 0
+        self._confirmed_above_watermark: Set[int] = set()
+        self._callbacks: Dict[int, Callable[[bool], None]] = {}
+
+    def register(self, confirm_callback: Optional[Callable[[bool], None]] = None) -> int:
+        """Registers next published message and returns its delivery tag.
+
+        Args:
+            confirm_callback (Callable[[bool], None]): Invoked with True on broker ack and False on nack or reset.
+
+        Returns:
+            int: Delivery tag assigned by the broker to the published message.
+
+        """
+        self.published += 1
+        if confirm_callback is not None:
+            self._callbacks[self.published] = confirm_callback
+        return self.published
+
+    def confirm(self, delivery_tag: int, multiple: bool = False, is_ack: bool = True):
+        if multiple:
+            delivery_tag = min(delivery_tag, self.published)
+            tag = self._watermark + 1
+            while tag <= delivery_tag:
+                if tag in self._confirmed_above_watermark:
+                    self._confirmed_above_watermark.discard(tag)
+                else:
+                    self._settle(tag, is_ack)
+                tag += 1
+            self._watermark = max(self._watermark, delivery_tag)
+        else:
+            if delivery_tag <= self._watermark or delivery_tag in self._confirmed_above_watermark:
+                return
+            self._settle(delivery_tag, is_ack)
+            self._confirmed_above_watermark.add(delivery_tag)
+        self._advance_watermark()
+
+    def reset(self):
+        """Forgets all published messages, pending confirm callbacks are resolved as not confirmed"""
+        callbacks = self._callbacks
+        self._clear()
+        for callback in callbacks.values():
+            callback(False)
+
+    @property
+    def outstanding_count(self) -> int:
+        return self.published - self._watermark - len(self._confirmed_above_watermark)
+
+    def _settle(self, delivery_tag, is_ack):
+        if is_ack:
+            self.acked += 1
+        else:
+            self.nacked += 1
+        callback = self._callbacks.pop(delivery_tag, None)
+        if callback is not None:
+            callback(is_ack)
+
+    def _advance_watermark(self):
+        while (self._watermark + 1) in self._confirmed_above_watermark:
+            self._watermark += 1
+            self._confirmed_above_watermark.discard(self._watermark)
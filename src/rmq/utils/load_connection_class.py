@@ -0,0 +1,9 @@
+from scrapy.settings import BaseSettings
+from scrapy.utils.misc import load_object
+
+DEFAULT_CONNECTION_CLASS = "rmq.connections.PikaSelectConnection"
+
+
+def load_connection_class(settings: BaseSettings | dict):
+    """Returns connection class configured with RMQ_CONNECTION_CLASS setting (import path or class)"""
+    return load_object(settings.get("RMQ_CONNECTION_CLASS") or DEFAULT_CONNECTION_CLASS)
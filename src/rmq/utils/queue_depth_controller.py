@@ -0,0 +1,87 @@
+import time
+from typing import Optional
+
+
+class QueueDepthController:
+    """Keeps depth (ready messages count) of produced queue near target depth.
+
+    Drain rate of consumers is measured from successive depth samples and number of messages published between them:
+    drained = previous depth + published - depth, rate is smoothed with exponential moving average.
+    Below target, the deficit is produced at once (limited by chunk size bounds) and queue is sampled again right
+    after publishing. Above target, the next sample is delayed by the time consumers need to drain the excess,
+    limited by poll interval bounds.
+    """
+
+    def __init__(
+        self,
+        target_depth: int,
+        min_chunk_size: int = 1,
+        max_chunk_size: int = 100,
+        min_interval: float = 1.0,
+        max_interval: float = 300.0,
+        smoothing: float = 0.3,
+    ):
+        self.target_depth = max(target_depth, 0)
+        self.min_chunk_size = max(min_chunk_size, 1)
+        self.max_chunk_size = max(max_chunk_size, self.min_chunk_size)
+        self.min_interval = max(min_interval, 0.0)
+        self.max_interval = max(max_interval, self.min_interval)
+        self.smoothing = min(max(smoothing, 0.0), 1.0)
+
+        # messages per second, None until two samples are taken
+        self.drain_rate: Optional[float] = None
+        self.depth: Optional[int] = None
+        self.chunk_size = 0
+        self.interval = 0.0
+        self.decisions = 0
+
+        self._sampled_at: Optional[float] = None
+        self._published_since_sample = 0
+
+    def record_published(self, count: int):
+        self._published_since_sample += count
+
+    def update(self, depth: int, now: Optional[float] = None) -> tuple[int, float]:
+        """Takes depth sample and returns (chunk size to produce, seconds to wait before producing).
+        Chunk size 0 means nothing should be produced and queue should be sampled again after returned interval
+        """
+        if now is None:
+            now = time.monotonic()
+        if self._sampled_at is not None and now > self._sampled_at:
+            drained = self.depth + self._published_since_sample - depth
+            rate = max(drained, 0) / (now - self._sampled_at)
+            if self.drain_rate is None:
+                self.drain_rate = rate
+            else:
+                self.drain_rate = self.smoothing * rate + (1 - self.smoothing) * self.drain_rate
+        self.depth = depth
+        self._sampled_at = now
+        self._published_since_sample = 0
+
+        deficit = self.target_depth - depth
+        if deficit > 0:
+            self.chunk_size = min(max(deficit, self.min_chunk_size), self.max_chunk_size)
+            self.interval = 0.0
+        else:
+            self.chunk_size = 0
+            if self.drain_rate is None:
+                # rate is unknown yet, the next sample measures it
+                self.interval = self.min_interval
+            elif self.drain_rate <= 0:
+                self.interval = self.max_interval
+            else:
+                # time to drain the excess and one chunk below target
+                excess = -deficit + self.min_chunk_size
+                self.interval = min(max(excess / self.drain_rate, self.min_interval), self.max_interval)
+        self.decisions += 1
+        return self.chunk_size, self.interval
+
+    def get_stats(self) -> dict:
+        return {
+            "target_depth": self.target_depth,
+            "depth": self.depth,
+            "drain_rate": round(self.drain_rate, 3) if self.drain_rate is not None else None,
+            "chunk_size": self.chunk_size,
+            "interval": round(self.interval, 3),
+            "decisions": self.decisions,
+        }
@@ -0,0 +1,56 @@
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class ReplyBatcher:
+    """Accumulates task replies per reply_to queue and emits them as a single batch message.
+
+    Batch of queue is emitted when it reaches max size, the owner calls flush_expired() periodically to emit batches
+    older than max delay, so reply latency stays bounded. Callbacks passed with replies (e.g. task ack) are invoked
+    right after their batch is emitted, so task is never settled before its reply is published.
+    """
+
+    def __init__(self, publish: Callable[[str, list], None], max_size: int = 100, max_delay: float = 1.0):
+        # publish(reply_to, replies) sends batch to the queue
+        self._publish = publish
+        self.max_size = max(max_size, 1)
+        self.max_delay = max_delay
+
+        # reply_to -> (monotonic time of the first reply, replies, callbacks)
+        self._batches: Dict[str, tuple[float, List[dict], List[Callable]]] = {}
+        self.batches_sent = 0
+        self.replies_sent = 0
+
+    @property
+    def pending_count(self) -> int:
+        return sum(len(replies) for _, replies, _ in self._batches.values())
+
+    def add(self, reply_to: str, reply: dict, on_published: Optional[Callable[[], None]] = None):
+        batch = self._batches.get(reply_to)
+        if batch is None:
+            batch = self._batches[reply_to] = (time.monotonic(), [], [])
+        _, replies, callbacks = batch
+        replies.append(reply)
+        if on_published is not None:
+            callbacks.append(on_published)
+        if len(replies) >= self.max_size:
+            self._emit(reply_to)
+
+    def flush_expired(self, now: Optional[float] = None):
+        if now is None:
+            now = time.monotonic()
+        for reply_to, (created_at, _, _) in list(self._batches.items()):
+            if now - created_at >= self.max_delay:
+                self._emit(reply_to)
+
+    def flush(self):
+        for reply_to in list(self._batches.keys()):
+            self._emit(reply_to)
+
+    def _emit(self, reply_to):
+        _, replies, callbacks = self._batches.pop(reply_to)
+        self._publish(reply_to, replies)
+        self.batches_sent += 1
+        self.replies_sent += len(replies)
+        for callback in callbacks:
+            callback()
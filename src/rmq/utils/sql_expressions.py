@@ -1,6 +1,67 @@
+import threading
+from collections import OrderedDict
+
 from sqlalchemy.dialects import mysql
 from sqlalchemy.engine import Dialect
 from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.compiler import Compiled
+
+
+class CompiledStatementCache:
+    """LRU cache of compiled SQLAlchemy statements keyed on statement shape.
+
+    Key is SQLAlchemy cache key of expression (structure without bound values) and dialect, so statements which
+    differ only in bound values (e.g. ids of IN clause) share one compiled template and only their parameters are
+    extracted on every call. Expressions without cache key are compiled every time and counted as misses.
+    """
+
+    def __init__(self, max_size: int = 500):
+        self.max_size = max(max_size, 1)
+        self.hits = 0
+        self.misses = 0
+        self._compiled: OrderedDict = OrderedDict()
+        # statements are compiled in db thread pool
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+    def compile(self, expression: ClauseElement, dialect: Dialect) -> tuple[Compiled | None, list | None]:
+        """Returns compiled template of expression and bound parameters of expression to construct it with,
+        or (None, None) if expression could not be cached
+        """
+        cache_key = expression._generate_cache_key()
+        if cache_key is None:
+            with self._lock:
+                self.misses += 1
+            return None, None
+        key = (dialect, cache_key.key)
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                self.hits += 1
+                return compiled, cache_key.bindparams
+        compiled = expression.compile(dialect=dialect, cache_key=cache_key)
+        with self._lock:
+            self.misses += 1
+            self._compiled[key] = compiled
+            if len(self._compiled) > self.max_size:
+                self._compiled.popitem(last=False)
+        return compiled, cache_key.bindparams
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._compiled), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+compiled_statement_cache = CompiledStatementCache()
 
 
 def stringify_expression(expression: ClauseElement, dialect: Dialect = mysql.dialect()) -> str:
@@ -18,17 +79,35 @@ def stringify_expression(expression: ClauseElement, dialect: Dialect = mysql.dia
     return str(expression_compiled)
 
 
-def compile_expression(expression: ClauseElement, dialect: Dialect = mysql.dialect()) -> tuple[str, tuple]:
+def compile_expression(
+    expression: ClauseElement, dialect: Dialect = mysql.dialect(), use_cache: bool = True
+) -> tuple[str, tuple]:
     """Complies SQLAlchemy expression without binds parameters.
 
     Args:
         expression (ClauseElement): Source SQLAlchemy expression.
         dialect (Dialect): Specific sql dialect. Default mysql.
+        use_cache (bool): Reuse compiled template of the same statement shape (compiled_statement_cache).
 
     Returns:
         tuple[str, tuple[...]]: Complied and stringified expression and tuple of parameters.
 
     """
+    if not use_cache:
+        return _compile_expression(expression, dialect)
+    compiled, extracted_parameters = compiled_statement_cache.compile(expression, dialect)
+    if compiled is None:
+        return _compile_expression(expression, dialect)
+    # expanding parameters (IN clause) are rendered for actual number of values
+    expanded_state = compiled.construct_expanded_state(
+        compiled.construct_params(extracted_parameters=extracted_parameters)
+    )
+    if expanded_state.positiontup is not None:
+        return expanded_state.statement, tuple(expanded_state.positional_parameters)
+    return expanded_state.statement, tuple(expanded_state.parameters.values())
+
+
+def _compile_expression(expression: ClauseElement, dialect: Dialect) -> tuple[str, tuple]:
     expression_compiled = expression.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
     params = tuple(expression_compiled.params.values())
     if position_tup := getattr(expression_compiled, "positiontup", []):
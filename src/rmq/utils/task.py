@@ -1,9 +1,43 @@
 import json
+import time
 
+from rmq.codecs import get_default_codec_registry
 from rmq.exceptions import ConsumedDataCorrupted
 
+from .task_payload import TaskPayload
+from .task_status_codes import TaskStatusCodes
+
 
 class Task:
+    # consumed frame is not retained after construction, slots keep per-task footprint small with large prefetch
+    __slots__ = (
+        "payload",
+        "delivery_tag",
+        "reply_to",
+        "_status",
+        "exception",
+        "reply_extras",
+        "__ack_callback",
+        "__nack_callback",
+        "scheduled_requests",
+        "success_responses",
+        "failed_responses",
+        "cancelled_requests",
+        "scheduled_items",
+        "scraped_items",
+        "dropped_items",
+        "error_items",
+        "published_items",
+        "should_stop",
+        "created_at",
+        "last_event_at",
+        "_status_listener",
+        "checkpoint_key",
+        "checkpointed_requests",
+        "queue_name",
+        "weight",
+    )
+
     def __init__(self, consumed_data, ack_callback=None, nack_callback=None):
         if not isinstance(consumed_data, dict):
             raise ConsumedDataCorrupted("Consumed data is not a dict")
@@ -13,13 +47,23 @@ class Task:
             raise ConsumedDataCorrupted('Consumed data has no "properties" key')
         if consumed_data.get("body", None) is None:
             raise ConsumedDataCorrupted('Consumed data has no "body" key')
-        self.__consumed_data = consumed_data
 
-        self.payload = json.loads(self.__consumed_data.get("body"))
-        self.delivery_tag = self.__consumed_data.get("method").delivery_tag
-        self.reply_to = self.__consumed_data.get("properties").reply_to
-        self.status = 1
+        # body is decoded once (by content_type/content_encoding message properties) and shared read-only
+        body = consumed_data.get("body")
+        try:
+            self.payload = TaskPayload(
+                get_default_codec_registry().decode_message(body, consumed_data.get("properties")), raw=body
+            )
+        except (TypeError, ValueError) as e:
+            raise ConsumedDataCorrupted(f"Consumed data body could not be decoded: {e}")
+        self.delivery_tag = consumed_data.get("method").delivery_tag
+        self.reply_to = consumed_data.get("properties").reply_to
+        # called with (task, old status) on status change (TaskObserver keeps index by status)
+        self._status_listener = None
+        self._status = TaskStatusCodes.IN_QUEUE
         self.exception = None
+        # additional values returned with task reply (payload itself is read-only)
+        self.reply_extras = {}
 
         self.__ack_callback = (
             ack_callback if ack_callback is not None and callable(ack_callback) else self.__empty_callback
@@ -31,14 +75,41 @@ class Task:
         self.scheduled_requests = 0
         self.success_responses = 0
         self.failed_responses = 0
+        # requests purged from scheduler or dropped before download because task was cancelled
+        self.cancelled_requests = 0
 
         self.scheduled_items = 0
         self.scraped_items = 0
         self.dropped_items = 0
         self.error_items = 0
+        # items which publishing to result queue is confirmed by broker
+        self.published_items = 0
 
         self.should_stop = False
 
+        # monotonic timestamps for deadlines tracking (see TaskObserver.pop_expired_tasks)
+        self.created_at = time.monotonic()
+        self.last_event_at = self.created_at
+
+        # consumed queue of task and weight of task in TaskFairScheduler (see TaskQueue)
+        self.queue_name = None
+        self.weight = 1.0
+
+        # identity of task in checkpoint store (None if task is not checkpointed) and sub-requests completed before
+        self.checkpoint_key = None
+        self.checkpointed_requests = {}
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, status):
+        old_status = self._status
+        self._status = status
+        if self._status_listener is not None and old_status != status:
+            self._status_listener(self, old_status)
+
     def __empty_callback(self):
         pass
 
@@ -54,6 +125,20 @@ class Task:
         self.__nack_callback()
         self.__disable_callbacks()
 
+    def restore_checkpoint(self, checkpoint_key, checkpointed_requests: dict):
+        """Restores counters of sub-requests (url -> emitted items) completed before task was redelivered"""
+        self.checkpoint_key = checkpoint_key
+        self.checkpointed_requests = checkpointed_requests
+        restored_requests = len(checkpointed_requests)
+        restored_items = sum(checkpointed_requests.values())
+        self.scheduled_requests += restored_requests
+        self.success_responses += restored_requests
+        self.scheduled_items += restored_items
+        self.scraped_items += restored_items
+
+    def touch(self):
+        self.last_event_at = time.monotonic()
+
     def request_scheduled(self):
         self.scheduled_requests += 1
 
@@ -63,6 +148,13 @@ class Task:
     def fail_response_received(self):
         self.failed_responses += 1
 
+    def request_cancelled(self, count=1):
+        self.cancelled_requests += count
+
+    def is_cancelled(self):
+        """Task is cancelled when it is asked to stop or got terminal (error) status"""
+        return self.should_stop or self.status == TaskStatusCodes.ERROR
+
     def total_responses(self):
         return self.success_responses + self.failed_responses
 
@@ -78,6 +170,9 @@ class Task:
     def item_error_received(self):
         self.error_items += 1
 
+    def item_published_received(self):
+        self.published_items += 1
+
     def total_items(self):
         return self.scraped_items + self.dropped_items + self.error_items
 
@@ -89,10 +184,14 @@ class Task:
     def is_requests_completed(self, ignore_zero=True):
         if ignore_zero is True and self.scheduled_requests == 0:
             return False
-        return self.scheduled_requests == (self.success_responses + self.failed_responses)
+        return self.scheduled_requests == (self.success_responses + self.failed_responses + self.cancelled_requests)
+
+    def set_reply_value(self, key, value):
+        self.reply_extras[key] = value
 
     def get_reply_payload(self):
         return {
+            **self.reply_extras,
             "status": self.status,
             "exception": self.exception,
         }
@@ -104,6 +203,7 @@ class Task:
                 "total_responses": self.total_responses(),
                 "success_requests": self.success_responses,
                 "failed_reqiests": self.failed_responses,
+                "cancelled_requests": self.cancelled_requests,
                 "scheduled_items": self.scheduled_items,
                 "total_items": self.total_items(),
                 "success_items": self.scraped_items,
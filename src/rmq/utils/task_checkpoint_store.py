@@ -0,0 +1,79 @@
+import logging
+import os
+import sqlite3
+import time
+
+from scrapy.settings import BaseSettings
+
+logger = logging.getLogger(__name__)
+
+
+class TaskCheckpointStore:
+    """Durable record of completed sub-requests of consumed tasks (SQLite database in WAL mode).
+
+    Checkpoints are keyed by task identity (see TaskBaseSpider.get_task_checkpoint_key), each completed sub-request
+    is stored with number of items emitted by its callback. When task is redelivered after restart, completed
+    sub-requests are skipped and task counters are restored. Checkpoint is deleted once task is acked, stale
+    checkpoints (tasks which were never completed) are removed after ttl. Used from reactor thread only.
+    """
+
+    DEFAULT_TTL = 7 * 24 * 60 * 60
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._connection = None
+
+    @classmethod
+    def from_settings(cls, settings: BaseSettings):
+        return cls(
+            settings.get("RMQ_TASK_CHECKPOINT_PATH"),
+            ttl=settings.getfloat("RMQ_TASK_CHECKPOINT_TTL", cls.DEFAULT_TTL),
+        )
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        # WAL with synchronous=NORMAL survives process crash (committed transactions are not lost) with cheap commits
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS task_checkpoints ("
+            "task_key TEXT NOT NULL, "
+            "request_url TEXT NOT NULL, "
+            "items INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL NOT NULL, "
+            "PRIMARY KEY (task_key, request_url))"
+        )
+        with self._connection:
+            deleted = self._connection.execute(
+                "DELETE FROM task_checkpoints WHERE updated_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        if deleted:
+            logger.info(f"{deleted} stale task checkpoint record(s) removed")
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def load(self, task_key: str) -> dict[str, int]:
+        """Returns completed sub-requests of task: url -> number of emitted items"""
+        rows = self._connection.execute(
+            "SELECT request_url, items FROM task_checkpoints WHERE task_key = ?", (task_key,)
+        ).fetchall()
+        return dict(rows)
+
+    def record(self, task_key: str, request_url: str, items: int = 0):
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO task_checkpoints (task_key, request_url, items, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (task_key, request_url, items, time.time()),
+            )
+
+    def delete(self, task_key: str):
+        with self._connection:
+            self._connection.execute("DELETE FROM task_checkpoints WHERE task_key = ?", (task_key,))
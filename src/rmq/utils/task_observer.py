@@ -1,15 +1,108 @@
+import heapq
+import itertools
+import time
+
 from .task import Task
 
 
 class TaskObserver:
+    # seconds after which removed tasks are forgotten even if their outstanding work is never reported
+    RETIRED_TAGS_TTL = 3600
+
     def __init__(self):
+        # tasks by delivery tag in order of receiving (the first one is the oldest task)
         self.__tasks = {}
+        # delivery tags of tasks by status, kept up to date by task status listener
+        self.__status_index = {}
+        # delivery tag -> [outstanding requests, outstanding items, monotonic time of removal] of tasks removed with
+        # outstanding work, their late events are ignored. Entries are pruned when outstanding work is drained (or
+        # after RETIRED_TAGS_TTL): tasks which deliveries were invalidated (channel closed) and tasks discarded
+        # after they are finalized (completion strategy cancels outstanding work, task expired)
+        self.__invalidated_tags = {}
+        self.__discarded_tags = {}
+        # callables invoked with delivery tag when task is cancelled (should_stop or terminal status is set)
+        self.__stop_listeners = []
+
+        # deadlines (seconds, 0 - disabled): absolute since task is received and idle since the last task event
+        self.max_lifetime = 0
+        self.idle_timeout = 0
+        # heap of (deadline, seq, delivery tag). Entries are lazy: removed tasks are skipped and entries of touched
+        # tasks are pushed back with new deadline when popped, so events cost no heap operations
+        self.__deadlines = []
+        self.__deadlines_seq = itertools.count()
+
+    def set_deadlines(self, max_lifetime=0, idle_timeout=0):
+        self.max_lifetime = max(max_lifetime or 0, 0)
+        self.idle_timeout = max(idle_timeout or 0, 0)
+        self.__deadlines = []
+        for task in self.__tasks.values():
+            self.__push_deadline(task)
+
+    def has_deadlines(self):
+        return bool(self.max_lifetime or self.idle_timeout)
+
+    def _get_deadline(self, task: Task):
+        """Returns (deadline, reason) of the earliest task deadline or (None, None) if deadlines are disabled"""
+        deadlines = []
+        if self.max_lifetime:
+            deadlines.append((task.created_at + self.max_lifetime, "lifetime"))
+        if self.idle_timeout:
+            deadlines.append((task.last_event_at + self.idle_timeout, "idle"))
+        if not deadlines:
+            return None, None
+        return min(deadlines)
+
+    def __push_deadline(self, task: Task):
+        deadline, _ = self._get_deadline(task)
+        if deadline is not None:
+            heapq.heappush(self.__deadlines, (deadline, next(self.__deadlines_seq), task.delivery_tag))
+
+    def pop_expired_tasks(self, now=None):
+        """Returns list of (task, reason) of tasks which deadline is passed. Reason is "lifetime" or "idle".
+        Expired tasks stay in observer, caller is responsible to finalize and remove them
+        """
+        if now is None:
+            now = time.monotonic()
+        expired = []
+        while self.__deadlines and self.__deadlines[0][0] <= now:
+            _, _, delivery_tag = heapq.heappop(self.__deadlines)
+            task = self.__tasks.get(delivery_tag, None)
+            if task is None:
+                continue
+            deadline, reason = self._get_deadline(task)
+            if deadline is None:
+                continue
+            if deadline > now:
+                # task got events since entry was pushed
+                heapq.heappush(self.__deadlines, (deadline, next(self.__deadlines_seq), delivery_tag))
+                continue
+            expired.append((task, reason))
+        return expired
 
     def add_task(self, task: Task):
         delivery_tag = task.delivery_tag
         if delivery_tag in self.__tasks.keys():
             raise ValueError(f"Delivery tag {delivery_tag} is already exists")
         self.__tasks[delivery_tag] = task
+        self.__status_index.setdefault(task.status, set()).add(delivery_tag)
+        task._status_listener = self._on_task_status_changed
+        self.__push_deadline(task)
+
+    def _on_task_status_changed(self, task: Task, old_status):
+        delivery_tags = self.__status_index.get(old_status)
+        if delivery_tags is not None:
+            delivery_tags.discard(task.delivery_tag)
+            if not delivery_tags:
+                del self.__status_index[old_status]
+        self.__status_index.setdefault(task.status, set()).add(task.delivery_tag)
+
+    def __unindex_task(self, task: Task):
+        task._status_listener = None
+        delivery_tags = self.__status_index.get(task.status)
+        if delivery_tags is not None:
+            delivery_tags.discard(task.delivery_tag)
+            if not delivery_tags:
+                del self.__status_index[task.status]
 
     def get_task(self, delivery_tag):
         return self.__tasks.get(delivery_tag, None)
@@ -18,56 +111,184 @@ class TaskObserver:
         return self.__tasks
 
     def remove_task(self, delivery_tag):
-        try:
-            del self.__tasks[delivery_tag]
-        except KeyError:
-            pass
+        task = self.__tasks.pop(delivery_tag, None)
+        if task is not None:
+            self.__unindex_task(task)
+
+    def invalidate_tasks(self, delivery_tags):
+        """Drops tasks of invalidated deliveries (they are redelivered by broker with new delivery tags)"""
+        invalidated_tasks = []
+        for delivery_tag in delivery_tags:
+            task = self.__tasks.pop(delivery_tag, None)
+            if task is not None:
+                self.__unindex_task(task)
+                invalidated_tasks.append(task)
+                self.__retire(self.__invalidated_tags, task)
+        return invalidated_tasks
+
+    def discard_task(self, task: Task, purged_requests=0):
+        """Ignores late events of finalized task until its outstanding requests and items are drained"""
+        self.remove_task(task.delivery_tag)
+        self.__retire(self.__discarded_tags, task, purged_requests)
+
+    def is_invalidated(self, delivery_tag):
+        return delivery_tag in self.__invalidated_tags
+
+    def is_discarded(self, delivery_tag):
+        return delivery_tag in self.__discarded_tags
+
+    def __is_retired(self, delivery_tag):
+        return delivery_tag in self.__invalidated_tags or delivery_tag in self.__discarded_tags
+
+    def __retire(self, retired_tags, task: Task, purged_requests=0):
+        now = time.monotonic()
+        # entries are in order of removal
+        while retired_tags:
+            delivery_tag, (_, _, retired_at) = next(iter(retired_tags.items()))
+            if now - retired_at < self.RETIRED_TAGS_TTL:
+                break
+            del retired_tags[delivery_tag]
+        outstanding_requests = (
+            task.scheduled_requests - task.total_responses() - task.cancelled_requests - purged_requests
+        )
+        outstanding_items = task.scheduled_items - task.total_items()
+        if outstanding_requests > 0 or outstanding_items > 0:
+            retired_tags[task.delivery_tag] = [max(outstanding_requests, 0), max(outstanding_items, 0), now]
+
+    def __handle_retired_event(self, delivery_tag, requests=0, items=0):
+        """Returns True if event belongs to removed task (it is ignored), updates its outstanding work"""
+        for retired_tags in (self.__invalidated_tags, self.__discarded_tags):
+            outstanding = retired_tags.get(delivery_tag)
+            if outstanding is None:
+                continue
+            outstanding[0] += requests
+            outstanding[1] += items
+            if outstanding[0] <= 0 and outstanding[1] <= 0:
+                del retired_tags[delivery_tag]
+            return True
+        return False
+
+    def add_stop_listener(self, listener):
+        self.__stop_listeners.append(listener)
+
+    def _notify_stopped(self, delivery_tag):
+        for listener in self.__stop_listeners:
+            listener(delivery_tag)
+
+    def is_cancelled(self, delivery_tag):
+        if self.__is_retired(delivery_tag):
+            return True
+        task = self.__tasks.get(delivery_tag, None)
+        return task is not None and task.is_cancelled()
 
     def current_processing_count(self):
-        return len(self.__tasks.keys())
+        return len(self.__tasks)
+
+    def count_by_status(self, status):
+        delivery_tags = self.__status_index.get(status)
+        return len(delivery_tags) if delivery_tags is not None else 0
+
+    def get_status_counts(self):
+        return {status: len(delivery_tags) for status, delivery_tags in self.__status_index.items()}
+
+    def get_oldest_task(self):
+        return next(iter(self.__tasks.values()), None)
+
+    def get_oldest_task_age(self, now=None):
+        """Returns seconds since the oldest processing task is received (0 if there are no tasks)"""
+        task = self.get_oldest_task()
+        if task is None:
+            return 0
+        return (time.monotonic() if now is None else now) - task.created_at
+
+    def snapshot(self):
+        """Returns aggregated state for monitoring (tasks are not copied)"""
+        oldest_task = self.get_oldest_task()
+        return {
+            "processing": len(self.__tasks),
+            "by_status": self.get_status_counts(),
+            "oldest_delivery_tag": oldest_task.delivery_tag if oldest_task is not None else None,
+            "oldest_age": round(self.get_oldest_task_age(), 3),
+            "invalidated": len(self.__invalidated_tags),
+            "discarded": len(self.__discarded_tags),
+        }
 
     def is_empty(self):
         return self.current_processing_count() == 0
 
     def handle_request(self, delivery_tag):
+        if self.__handle_retired_event(delivery_tag, requests=1):
+            return
         if delivery_tag not in self.__tasks.keys():
             raise ValueError(f"Delivery tag {delivery_tag} is not exists in observer")
+        self.__tasks[delivery_tag].touch()
         self.__tasks[delivery_tag].request_scheduled()
 
     def handle_response(self, delivery_tag, response_code=200):
         try:
+            task = self.__tasks[delivery_tag]
+        except KeyError:
+            self.__handle_retired_event(delivery_tag, requests=-1)
+        else:
+            task.touch()
             if 200 <= response_code < 300:
-                self.__tasks[delivery_tag].success_response_received()
+                task.success_response_received()
             else:
-                self.__tasks[delivery_tag].fail_response_received()
+                task.fail_response_received()
+
+    def handle_request_cancelled(self, delivery_tag, count=1):
+        try:
+            self.__tasks[delivery_tag].request_cancelled(count)
         except KeyError:
-            pass
+            self.__handle_retired_event(delivery_tag, requests=-count)
 
     def handle_item_scheduled(self, delivery_tag):
+        if self.__handle_retired_event(delivery_tag, items=1):
+            return
         if delivery_tag not in self.__tasks.keys():
             raise ValueError(f"Delivery tag {delivery_tag} is not exists in observer")
+        self.__tasks[delivery_tag].touch()
         self.__tasks[delivery_tag].item_scheduled()
 
     def handle_item_scraped(self, delivery_tag):
+        if self.__handle_retired_event(delivery_tag, items=-1):
+            return
         if delivery_tag not in self.__tasks.keys():
             raise ValueError(f"Delivery tag {delivery_tag} is not exists in observer")
+        self.__tasks[delivery_tag].touch()
         self.__tasks[delivery_tag].item_scraped_received()
 
     def handle_item_dropped(self, delivery_tag):
+        if self.__handle_retired_event(delivery_tag, items=-1):
+            return
         if delivery_tag not in self.__tasks.keys():
             raise ValueError(f"Delivery tag {delivery_tag} is not exists in observer")
+        self.__tasks[delivery_tag].touch()
         self.__tasks[delivery_tag].item_dropped_received()
 
     def handle_item_error(self, delivery_tag):
+        if self.__handle_retired_event(delivery_tag, items=-1):
+            return
         if delivery_tag not in self.__tasks.keys():
             raise ValueError(f"Delivery tag {delivery_tag} is not exists in observer")
+        self.__tasks[delivery_tag].touch()
         self.__tasks[delivery_tag].item_error_received()
 
+    def handle_item_published(self, delivery_tag):
+        task = self.__tasks.get(delivery_tag, None)
+        if task is not None:
+            task.touch()
+            task.item_published_received()
+
     def set_status(self, delivery_tag, status):
         try:
-            self.__tasks[delivery_tag].status = status
+            task = self.__tasks[delivery_tag]
         except KeyError:
-            pass
+            return
+        was_cancelled = task.is_cancelled()
+        task.status = status
+        if not was_cancelled and task.is_cancelled():
+            self._notify_stopped(delivery_tag)
 
     def set_exception(self, delivery_tag, exception):
         try:
@@ -77,6 +298,10 @@ class TaskObserver:
 
     def set_should_stop(self, delivery_tag, value):
         try:
-            self.__tasks[delivery_tag].should_stop = value
+            task = self.__tasks[delivery_tag]
         except KeyError:
-            pass
+            return
+        was_cancelled = task.is_cancelled()
+        task.should_stop = value
+        if not was_cancelled and task.is_cancelled():
+            self._notify_stopped(delivery_tag)
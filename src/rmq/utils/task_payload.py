@@ -0,0 +1,37 @@
+from collections.abc import Mapping
+from copy import deepcopy
+from types import MappingProxyType
+
+
+class TaskPayload(Mapping):
+    """Read-only view of decoded task message body. Created once per delivery and owned by Task.
+
+    Requests reference payload by delivery tag (see TaskBaseSpider.get_task_payload) instead of carrying copies.
+    With RMQ_TASK_MSG_BODY_COMPAT_ENABLED spider next_request and "msg_body" request meta get a mutable copy instead.
+    Top level keys can not be changed, values are shared and must not be mutated in place, use to_dict() to get
+    a private mutable copy. Values to return with task reply are set with Task.set_reply_value().
+    """
+
+    __slots__ = ("_data", "raw")
+
+    def __init__(self, data, raw: bytes | None = None):
+        if not isinstance(data, dict):
+            raise TypeError(f"Task payload must be decoded to dict, got {type(data).__name__}")
+        self._data = MappingProxyType(data)
+        # raw (encoded) message body
+        self.raw = raw
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"TaskPayload({dict(self._data)!r})"
+
+    def to_dict(self) -> dict:
+        return deepcopy(dict(self._data))
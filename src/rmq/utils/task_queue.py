@@ -0,0 +1,63 @@
+class TaskQueue:
+    """Task queue consumed by RPCTaskConsumer with its own channel (connection owner of that channel).
+
+    Connection callbacks are forwarded to consumer with the queue, so deliveries are routed to queue handler
+    (spider method which builds request from task). Weight defines share of prefetch and downloader capacity
+    between queues of a single spider.
+    """
+
+    def __init__(self, consumer, name: str, index: int = 0, weight: float = 1, prefetch_count=None, handler=None):
+        self.consumer = consumer
+        self.name = name
+        # namespace of delivery tags of queue channel (delivery tags are channel scoped)
+        self.index = index
+        self.weight = weight
+        self.prefetch_count = prefetch_count
+        # name of spider method (or callable) which returns request for task of this queue
+        self.handler = handler or "next_request"
+        # relative weight of a single task of queue in TaskFairScheduler, see RPCTaskConsumer._init_task_queues
+        self.task_weight = 1.0
+
+        self.rmq_connection = None
+        self.can_interact = False
+
+    @classmethod
+    def from_spider_config(cls, consumer, config, index=0):
+        """Builds queue from spider task_queues entry: queue name or dict with name, weight, prefetch_count, handler"""
+        if isinstance(config, str):
+            return cls(consumer, config, index=index)
+        return cls(
+            consumer,
+            config["name"],
+            index=index,
+            weight=config.get("weight", 1),
+            prefetch_count=config.get("prefetch_count", None),
+            handler=config.get("handler", None),
+        )
+
+    def set_connection_handle(self, connection):
+        self.rmq_connection = connection
+        self.can_interact = True
+        self.consumer.on_task_queue_interact_changed(self)
+
+    def set_can_interact(self, can_interact):
+        self.can_interact = can_interact
+        self.consumer.on_task_queue_interact_changed(self)
+
+    def on_message_consumed(self, message):
+        self.consumer.on_basic_get_message(message, self)
+
+    def on_basic_get_message(self, message):
+        self.consumer.on_basic_get_message(message, self)
+
+    def on_basic_get_empty(self):
+        self.consumer.on_basic_get_empty()
+
+    def on_deliveries_invalidated(self, delivery_tags):
+        self.consumer.on_deliveries_invalidated(delivery_tags)
+
+    def raise_close_spider(self):
+        self.consumer.raise_close_spider()
+
+    def __repr__(self):
+        return f"TaskQueue({self.name!r}, weight={self.weight}, prefetch_count={self.prefetch_count})"
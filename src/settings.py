@@ -137,6 +137,102 @@ RABBITMQ_USERNAME = os.getenv("RABBITMQ_USERNAME", "guest")
 RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
 RABBITMQ_VIRTUAL_HOST = os.getenv("RABBITMQ_VIRTUAL_HOST", "/")
 
+# Connection implementation used by rmq extensions, pipelines and commands:
+#  - rmq.connections.PikaSelectConnection runs pika SelectConnection ioloop in separate thread
+#  - rmq.connections.PikaAsyncioConnection runs on asyncio loop of AsyncioSelectorReactor
+RMQ_CONNECTION_CLASS = os.getenv("RMQ_CONNECTION_CLASS", "rmq.connections.PikaSelectConnection")
+
+# Open channels of RPCTaskConsumer and ItemProducerPipeline on one per-process connection (heartbeat, ioloop thread)
+# instead of connection per component. Applies to thread based connection classes only
+RMQ_SHARED_CONNECTION_ENABLED = strtobool(os.getenv("RMQ_SHARED_CONNECTION_ENABLED", "False"))
+
+# Reconnect/reopen channel with exponential backoff (seconds) on broker connection loss instead of closing spider.
+# Unacked tasks of lost channel are dropped from TaskObserver and redelivered by broker
+RMQ_RESILIENT_CONNECTION_ENABLED = strtobool(os.getenv("RMQ_RESILIENT_CONNECTION_ENABLED", "False"))
+RMQ_RECONNECT_BACKOFF_INITIAL = 1
+RMQ_RECONNECT_BACKOFF_MAX = 60
+
+# Publishers (ItemProducerPipeline pauses engine, Producer stops pulling db chunks) are paused when broker blocks
+# connection (memory/disk alarm) or connection write buffer exceeds high watermark (bytes) until it drops below low one
+RMQ_OUTBOUND_BUFFER_HIGH_WATERMARK = 8 * 1024 * 1024
+RMQ_OUTBOUND_BUFFER_LOW_WATERMARK = 2 * 1024 * 1024
+
+# Producer claims chunk atomically (SELECT ... FOR UPDATE SKIP LOCKED, MySQL 8+) and marks it IN_QUEUE with claim token
+# before publishing, so several producers could share one task table without duplicates
+RMQ_PRODUCER_CLAIM_ENABLED = strtobool(os.getenv("RMQ_PRODUCER_CLAIM_ENABLED", "False"))
+# Producer marks tasks IN_QUEUE only when broker confirms their messages, messages which are not confirmed within
+# timeout (seconds) are considered lost and their tasks are returned to NOT_PROCESSED
+RMQ_PRODUCER_CONFIRM_TIMEOUT = 60
+# Producer keeps task queue depth (ready messages) near target: chunk size (up to --chunk_size) and poll interval
+# (seconds) are calculated from drain rate of consumers measured between queue depth samples
+RMQ_PRODUCER_TARGET_QUEUE_DEPTH = 5000
+RMQ_PRODUCER_MIN_POLL_INTERVAL = 1
+RMQ_PRODUCER_MAX_POLL_INTERVAL = 300
+# Interval (seconds) of producer/consumer commands stats log line (also logged at shutdown)
+RMQ_COMMAND_STATS_INTERVAL = 60
+
+# Message body codec: json (stdlib), orjson or msgpack (optional packages). Bodies larger than threshold (bytes) are
+# compressed with RMQ_MESSAGE_COMPRESSION: gzip or zstd (optional package). Consumers decode by message properties.
+# Per queue overrides, e.g. {CATEGORY_RESULTS: {"codec": "msgpack", "compression": "zstd"}}
+RMQ_MESSAGE_CODEC = os.getenv("RMQ_MESSAGE_CODEC", "json")
+RMQ_MESSAGE_COMPRESSION = os.getenv("RMQ_MESSAGE_COMPRESSION", None)
+RMQ_MESSAGE_COMPRESSION_THRESHOLD = 4096
+RMQ_QUEUE_CODECS = {}
+
+# Adjust prefetch of RPCTaskConsumer at runtime (within bounds, by max step per interval in seconds)
+# to keep downloader utilization close to target
+RMQ_ADAPTIVE_PREFETCH_ENABLED = strtobool(os.getenv("RMQ_ADAPTIVE_PREFETCH_ENABLED", "False"))
+RMQ_ADAPTIVE_PREFETCH_MIN = 1
+RMQ_ADAPTIVE_PREFETCH_MAX = 64
+RMQ_ADAPTIVE_PREFETCH_MAX_STEP = 4
+RMQ_ADAPTIVE_PREFETCH_TARGET_UTILIZATION = 0.8
+RMQ_ADAPTIVE_PREFETCH_INTERVAL = 5
+
+# Serve requests of consumed tasks in round-robin order (TaskBaseSpider spiders), optionally limiting
+# number of requests of a single task in downloader (0 - unlimited)
+RMQ_TASK_FAIR_SCHEDULER_ENABLED = strtobool(os.getenv("RMQ_TASK_FAIR_SCHEDULER_ENABLED", "False"))
+RMQ_TASK_FAIR_SCHEDULER_TASK_CONCURRENCY = 0
+
+# Expire consumed tasks which are not completed within RMQ_TASK_MAX_LIFETIME seconds since received or got no
+# events (requests, responses, items) for RMQ_TASK_IDLE_TIMEOUT seconds (0 - disabled). Expired tasks are replied
+# with EXPIRED status and acked, or nacked with requeue (without reply) if RMQ_TASK_EXPIRED_REQUEUE is set
+RMQ_TASK_MAX_LIFETIME = 0
+RMQ_TASK_IDLE_TIMEOUT = 0
+RMQ_TASK_WATCHDOG_INTERVAL = 10
+RMQ_TASK_EXPIRED_REQUEUE = strtobool(os.getenv("RMQ_TASK_EXPIRED_REQUEUE", "False"))
+
+# Publish task replies per reply_to queue as batch messages of up to RMQ_REPLY_BATCH_MAX_SIZE replies, batches are
+# published at least every RMQ_REPLY_BATCH_MAX_DELAY seconds. Tasks are acked after their batch is published.
+# Consumer command unpacks batches transparently
+RMQ_REPLY_BATCHING_ENABLED = strtobool(os.getenv("RMQ_REPLY_BATCHING_ENABLED", "False"))
+RMQ_REPLY_BATCH_MAX_SIZE = 100
+RMQ_REPLY_BATCH_MAX_DELAY = 1.0
+
+# Send item_scheduled/callback_completed/errback_completed signals from rmq_callback/rmq_errback decorators
+# (e.g. for custom listeners) instead of updating task counters of RPCTaskConsumer with direct calls
+RMQ_TASK_ACCOUNTING_SIGNALS_ENABLED = strtobool(os.getenv("RMQ_TASK_ACCOUNTING_SIGNALS_ENABLED", "False"))
+
+# Record completed sub-requests of consumed tasks (SQLite database), so redelivered tasks (after restart or crash)
+# skip already crawled pages. Records of tasks which were never completed are removed after RMQ_TASK_CHECKPOINT_TTL
+RMQ_TASK_CHECKPOINT_ENABLED = strtobool(os.getenv("RMQ_TASK_CHECKPOINT_ENABLED", "False"))
+RMQ_TASK_CHECKPOINT_PATH = os.getenv(
+    "RMQ_TASK_CHECKPOINT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "task_checkpoints.db"),
+)
+RMQ_TASK_CHECKPOINT_TTL = 7 * 24 * 60 * 60
+
+# Pass mutable copy of decoded task payload to spider next_request(delivery_tag, msg_body) and put it into
+# "msg_body" request meta. Disable to pass read-only TaskPayload and read it with TaskBaseSpider.get_task_payload
+RMQ_TASK_MSG_BODY_COMPAT_ENABLED = strtobool(os.getenv("RMQ_TASK_MSG_BODY_COMPAT_ENABLED", "True"))
+
+# Send acks/nacks of consumed tasks as multiple=True frames when delivery tags are contiguous,
+# out-of-order tags are sent individually after RMQ_ACK_MAX_DELAY seconds
+RMQ_ACK_BATCHING_ENABLED = strtobool(os.getenv("RMQ_ACK_BATCHING_ENABLED", "False"))
+RMQ_ACK_MAX_DELAY = 0.5
+
+# Wait for broker publisher confirms before item is considered processed by ItemProducerPipeline
+RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED = False
+
 CATEGORY_VIKING_TASK = "category.viking.task"
 CATEGORY_QUILL_TASK = "category.quill.task"
 CATEGORY_RESULTS = "category.result"
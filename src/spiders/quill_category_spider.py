@@ -1,4 +1,3 @@
-import json
 import re
 from math import ceil
 from typing import List
@@ -51,7 +50,7 @@ class CategorySpiderQuill(TaskToMultipleResultsSpider):
 
 
     def next_request(self, _delivery_tag, msg_body):
-        data = json.loads(msg_body)
+        data = msg_body
         url = data["url"]
         self.logger.debug(f"New task received: {url}")
         return scrapy.Request(
@@ -60,7 +59,6 @@ class CategorySpiderQuill(TaskToMultipleResultsSpider):
             errback=self._errback,
             meta={
                     RMQConstants.DELIVERY_TAG_META_KEY.value: _delivery_tag,
-                    "msg_body": data,
                 },
             )
 
@@ -118,7 +116,7 @@ class CategorySpiderQuill(TaskToMultipleResultsSpider):
         
         task_obj = self.processing_tasks.get_task(delivery_tag)
         if task_obj:
-            task_obj.payload["item_count"] = task_obj.scheduled_items
+            task_obj.set_reply_value("item_count", task_obj.scheduled_items)
 
 
     @rmq_callback
@@ -128,12 +126,11 @@ class CategorySpiderQuill(TaskToMultipleResultsSpider):
         page = 1
         page_count = 1
         first_page = True
-        task = response.meta.get("msg_body")
+        task = self.get_task_payload(response) or {}
         task_id = task.get("task_id", None)
         session_id = task.get("session_id", None)
         meta = {
             RMQConstants.DELIVERY_TAG_META_KEY.value: delivery_tag,
-            "msg_body": task,
         }
         try:
             product_urls = self._extract_product_urls(response)
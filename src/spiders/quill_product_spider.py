@@ -25,6 +25,8 @@ class QuillProductSpider(TaskToSingleResultSpider):
         "ITEM_PIPELINES": {
             get_import_full_name(ItemProducerPipeline): 310,
         },
+        # task is acked as soon as broker confirms its product item
+        "RMQ_ITEM_PUBLISH_CONFIRMS_ENABLED": True,
     }
 
     def __init__(self, *args, **kwargs):
@@ -35,7 +37,7 @@ class QuillProductSpider(TaskToSingleResultSpider):
         self.result_queue_name = settings.get('RMQ_QUEUE_RESULTS')
         self.replies_queue_name = settings.get('RMQ_QUEUE_REPLIES')
 
-        self.completion_strategy = RPCTaskConsumer.CompletionStrategies.REQUESTS_BASED
+        self.completion_strategy = RPCTaskConsumer.CompletionStrategies.ACK_ON_FIRST_DURABLE_RESULT
 
     def start_requests(self):
         if False:
@@ -46,7 +48,7 @@ class QuillProductSpider(TaskToSingleResultSpider):
         Consumes a message from the task queue.
         """
         try:
-            message = json.loads(msg_body)
+            message = msg_body
             task_id = message.get('task_id')
             url = message.get('url')
             session_id = message.get('session_id')
@@ -62,7 +64,6 @@ class QuillProductSpider(TaskToSingleResultSpider):
                     'session_id': session_id,
                     'original_url': url,
                     'delivery_tag': _delivery_tag, 
-                    'msg_body': msg_body,
                 },
                 dont_filter=True
             )
@@ -179,8 +180,7 @@ class QuillProductSpider(TaskToSingleResultSpider):
         task_id = response.meta['task_id']
         session_id = response.meta['session_id']
         original_url = response.meta['original_url']
-        msg_body = response.meta.get('msg_body', {})
-        msg_body_dict = json.loads(msg_body)
+        msg_body_dict = self.get_task_payload(response) or {}
         position = msg_body_dict.get('position', None)
         json_data = self._extract_json_schema(response)
 
@@ -0,0 +1,68 @@
+"""Microbenchmark of compile_expression cost per statement with and without compiled statement cache.
+
+Statements are built per call like in Producer/Consumer interactions, only their bound values differ.
+Run from repository root: python tests/benchmark_compile_expression.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, insert, select, update  # noqa: E402
+
+from rmq.utils import TaskStatusCodes  # noqa: E402
+from rmq.utils.sql_expressions import compile_expression, compiled_statement_cache  # noqa: E402
+
+CALLS = 2000
+REPEAT = 3
+CHUNK_SIZE = 100
+
+tasks = Table(
+    "tasks",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("status", Integer),
+    Column("priority", Integer),
+    Column("url", String(255)),
+)
+
+
+def build_statements(i):
+    ids = list(range(i, i + CHUNK_SIZE))
+    return {
+        "select chunk": select(tasks)
+        .where(tasks.c.status == TaskStatusCodes.NOT_PROCESSED.value)
+        .order_by(tasks.c.priority.desc(), tasks.c.id.asc())
+        .limit(CHUNK_SIZE + i % 10),
+        "bulk status update": update(tasks).where(tasks.c.id.in_(ids)).values({"status": i % 5}),
+        "insert reply": insert(tasks).values({"id": i, "status": i % 5, "url": f"https://example.com/{i}"}),
+    }
+
+
+def run(name, use_cache):
+    # statements are built beforehand, building is not part of compile cost
+    statements = [build_statements(i)[name] for i in range(CALLS)]
+
+    def compile_statements():
+        for statement in statements:
+            compile_expression(statement, use_cache=use_cache)
+
+    seconds = min(timeit.repeat(compile_statements, number=1, repeat=REPEAT))
+    return seconds / CALLS * 1e6
+
+
+if __name__ == "__main__":
+    for i in range(5):
+        statements = build_statements(i)
+        for statement in statements.values():
+            assert compile_expression(statement) == compile_expression(statement, use_cache=False)
+    compiled_statement_cache.clear()
+
+    print(f"{CALLS} calls per statement")
+    for name in build_statements(0):
+        uncached = run(name, use_cache=False)
+        cached = run(name, use_cache=True)
+        print(f"{name:20} uncached: {uncached:7.1f} us, cached: {cached:6.1f} us, speedup: {uncached / cached:.1f}x")
+    print(f"cache hits: {compiled_statement_cache.hits}, misses: {compiled_statement_cache.misses}")
@@ -0,0 +1,95 @@
+"""Microbenchmark of per-item accounting overhead of rmq_callback decorated callbacks.
+
+Compares item_scheduled/callback_completed signals dispatch with direct task accounting of RPCTaskConsumer.
+Run from repository root: python tests/benchmark_task_accounting.py
+"""
+
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import scrapy  # noqa: E402
+from scrapy.http import HtmlResponse, Request  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+
+from rmq.extensions import RPCTaskConsumer  # noqa: E402
+from rmq.signals import callback_completed, item_scheduled  # noqa: E402
+from rmq.utils import Task, TaskObserver  # noqa: E402
+from rmq.utils.decorators import rmq_callback  # noqa: E402
+
+ITEMS_PER_RESPONSE = 24
+RESPONSES = 2000
+REPEAT = 3
+DELIVERY_TAG = 1
+
+
+class BenchmarkItem(scrapy.Item):
+    value = scrapy.Field()
+
+
+class BenchmarkSpider(scrapy.Spider):
+    name = "benchmark"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.processing_tasks = TaskObserver()
+        self.task_accounting = None
+
+    @rmq_callback
+    def parse(self, response):
+        for i in range(ITEMS_PER_RESPONSE):
+            yield BenchmarkItem(value=i)
+
+
+def build(direct_accounting):
+    crawler = get_crawler(BenchmarkSpider)
+    spider = BenchmarkSpider.from_crawler(crawler)
+    crawler.spider = spider
+    consumer = RPCTaskConsumer(crawler)
+    consumer._RPCTaskConsumer__spider = spider
+    if direct_accounting:
+        spider.task_accounting = consumer
+    else:
+        crawler.signals.connect(consumer.on_item_scheduled, signal=item_scheduled)
+        crawler.signals.connect(consumer.on_callback_completed, signal=callback_completed)
+
+    spider.processing_tasks.add_task(
+        Task(
+            {
+                "method": SimpleNamespace(delivery_tag=DELIVERY_TAG),
+                "properties": SimpleNamespace(reply_to=None, content_type=None, content_encoding=None),
+                "body": b"{}",
+            }
+        )
+    )
+    # task is never completed: response is counted while no request is scheduled
+    response = HtmlResponse(
+        "https://example.com", body=b"", request=Request("https://example.com", meta={"delivery_tag": DELIVERY_TAG})
+    )
+    # signals hold weak references to receivers, consumer is returned to keep it alive
+    return spider, response, consumer
+
+
+def run(direct_accounting):
+    spider, response, _consumer = build(direct_accounting)
+
+    def consume():
+        for _ in spider.parse(response):
+            pass
+
+    seconds = min(timeit.repeat(consume, number=RESPONSES, repeat=REPEAT))
+    scheduled_items = spider.processing_tasks.get_task(DELIVERY_TAG).scheduled_items
+    assert scheduled_items == ITEMS_PER_RESPONSE * RESPONSES * REPEAT, scheduled_items
+    return seconds / (RESPONSES * ITEMS_PER_RESPONSE) * 1e6
+
+
+if __name__ == "__main__":
+    signals_overhead = run(direct_accounting=False)
+    direct_overhead = run(direct_accounting=True)
+    print(f"{ITEMS_PER_RESPONSE} items per response, {RESPONSES} responses")
+    print(f"signals dispatch:  {signals_overhead:.2f} us per item")
+    print(f"direct accounting: {direct_overhead:.2f} us per item")
+    print(f"speedup: {signals_overhead / direct_overhead:.1f}x")